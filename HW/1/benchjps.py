@@ -0,0 +1,106 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import sys, pygame, math, numpy, random, time, copy
+from pygame.locals import *
+
+from constants import *
+from utils import *
+from core import *
+from gridnavigator import *
+
+############################
+### How to use this file
+###
+### Compares Jump Point Search (jumpPointSearch) against A* over every cell (gridAStar) on 8-connected grids: the grids of the
+### rungreedygridnavigator maps and generated grids of random rectangular obstacles up to 1024 x 1024 cells. For each grid it
+### reports the time per query and the cells expanded per query for both, and checks that both find paths of the same length.
+### Queries are between random pairs of traversable cells that A* finds a path between.
+### python benchjps.py [queries per grid]
+
+### The grid of a run script's world, made by running the script without its game loop
+def runScriptGrid(filename):
+	source = open(filename).read().replace('world.run()', '')
+	script = {'__name__': 'benchjps'}
+	exec source in script
+	nav = script['nav']
+	return nav.grid, nav.dimensions
+
+### A columns x rows grid with rectangles of up to size x size cells blocked until about density of the cells are blocked
+def generateGrid(r, columns, rows, density, size):
+	grid = [[True] * rows for x in xrange(columns)]
+	blocked = 0
+	while blocked < density * columns * rows:
+		width = r.randint(1, size)
+		height = r.randint(1, size)
+		left = r.randint(0, columns - width)
+		top = r.randint(0, rows - height)
+		for x in xrange(left, left + width):
+			for y in xrange(top, top + height):
+				if grid[x][y]:
+					grid[x][y] = False
+					blocked = blocked + 1
+	return grid, (columns, rows)
+
+### The length of a path of cells, each in a straight or diagonal line from the one before
+def cellPathLength(path):
+	return sum([octileDistance(a, b) for a, b in zip(path, path[1:])])
+
+### Returns (A* ms per query, A* expanded per query, JPS ms per query, JPS expanded per query, queries with different lengths)
+def compare(queries, grid, dimensions):
+	flat = [0.0, 0]
+	jps = [0.0, 0]
+	different = 0
+	for start, goal in queries:
+		t = time.time()
+		expected, expanded = gridAStar(start, goal, grid, dimensions)
+		flat[0] = flat[0] + (time.time() - t)
+		flat[1] = flat[1] + expanded
+		t = time.time()
+		path, expanded = jumpPointSearch(start, goal, grid, dimensions)
+		jps[0] = jps[0] + (time.time() - t)
+		jps[1] = jps[1] + expanded
+		if abs(cellPathLength(path) - cellPathLength(expected)) > EPSILON:
+			different = different + 1
+	n = float(len(queries))
+	return flat[0] * 1000.0 / n, flat[1] / n, jps[0] * 1000.0 / n, jps[1] / n, different
+
+
+if __name__ == '__main__':
+	num = 50
+	if len(sys.argv) > 1:
+		num = int(sys.argv[1])
+	grids = []
+	for i in xrange(1, 5):
+		grids.append(('greedy%d' % i, runScriptGrid('rungreedygridnavigator%d.py' % i)))
+	r = random.Random(SEED)
+	for cells, density in [(256, 0.1), (256, 0.3), (1024, 0.1), (1024, 0.3)]:
+		grids.append(('gen%d-%d' % (cells, int(density * 100)), generateGrid(r, cells, cells, density, cells / 16)))
+	print "grid           size  a*(ms)  a* expanded  jps(ms)  jps expanded  speedup  different"
+	for name, (grid, dimensions) in grids:
+		free = [(x, y) for x in xrange(dimensions[0]) for y in xrange(dimensions[1]) if grid[x][y]]
+		queries = []
+		while len(queries) < num:
+			start, goal = r.choice(free), r.choice(free)
+			if start != goal and len(gridAStar(start, goal, grid, dimensions)[0]) > 0:
+				queries.append((start, goal))
+		flat, flatExpanded, jps, jpsExpanded, different = compare(queries, grid, dimensions)
+		print "%-12s  %4dx%-4d  %6.2f  %11.1f  %7.2f  %12.1f  %6.1fx  %9d" % (name, dimensions[0], dimensions[1], flat, flatExpanded, jps, jpsExpanded, flat / max(jps, 1e-9), different)
@@ -60,3 +60,5 @@ DODGERATE = 10
 INFINITY = float("inf")
 EPSILON = 0.000001
 
+GRIDSAMPLES = 5
+
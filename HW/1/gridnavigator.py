@@ -16,7 +16,7 @@
  * limitations under the License.
 '''
 
-import sys, pygame, math, numpy, random, time, copy
+import sys, pygame, math, numpy, random, time, copy, heapq
 from pygame.locals import * 
 
 from constants import *
@@ -194,22 +194,57 @@ class GreedyGridNavigator(GridNavigator):
 
 
 
+################
+### JPSGridNavigator
+###
+### The JPSGridNavigator dynamically creates a grid with 8-connectivity and finds shortest paths through it with Jump Point Search.
+### Jump Point Search is A* that skips the cells a shortest path has no reason to turn at: from each cell it only looks in the
+### directions a shortest path could go, and jumps straight or diagonally until it reaches a cell where the path might turn (a jump
+### point) or an obstacle. Only jump points are put on the open list, so it expands far fewer cells than A* on open maps, and the
+### path is just its jump points, which the agent walks between in straight lines.
+### A diagonal move needs both cells beside it to be traversable, so the agent never cuts the corner of an obstacle.
+
+class JPSGridNavigator(GridNavigator):
+
+	def __init__(self):
+		GridNavigator.__init__(self)
+
+
+
+	### Finds the shortest path from the source to the destination. It should minimally set the path.
+	### self: the navigator object
+	### source: the place the agent is starting from (i.e., its current location)
+	### dest: the place the agent is told to go to
+	def computePath(self, source, dest):
+		if self.agent != None and self.world != None and self.grid != None:
+			self.source = source
+			self.destination = dest
+			self.agent.moveToTarget(dest)
+			start = findClosestCell(source, self.grid, self.cellSize)
+			end = findClosestCell(dest, self.grid, self.cellSize)
+			path, expanded = jumpPointSearch(start, end, self.grid, self.dimensions)
+			if len(path) == 0:
+				print "No path found."
+				return
+			self.setPath(translatePathToCoordinates(path, self.cellSize))
+			self.source = source
+			self.destination = translateCellToCoordinates(end, self.cellSize) #stop at the closest cell to the destination
+			first = self.path.pop(0)
+			if first is not None:
+				self.agent.moveToTarget(first)
+
+
+
 ###############
 ### HELPERS
 
 def translateCoordinatesToCell(point, grid, cellsize):
-	# I could do this mathematically, but I am lazy.
-	best = None
-	dist = 0.0
-	for x in xrange(len(grid)):
-		for y in xrange(len(grid[x])):
-			centery = (y * cellsize) + (cellsize/2.0)
-			centerx = (x * cellsize) + (cellsize/2.0)
-			d = distance(point, (centerx, centery))
-			if best is None or d < dist:
-				best = (x, y)
-				dist = d
-	return best
+	# The cell the point is in, or the nearest cell if the point is off the grid
+	if len(grid) == 0 or len(grid[0]) == 0:
+		return None
+	x = min(max(int(math.floor(point[0] / cellsize)), 0), len(grid) - 1)
+	y = min(max(int(math.floor(point[1] / cellsize)), 0), len(grid[x]) - 1)
+	return (x, y)
 
 def translateCellToCoordinates(cell, cellsize):
 	return ( (cell[0]*cellsize) + (cellsize/2.0), (cell[1]*cellsize) + (cellsize/2.0) )
@@ -237,4 +272,147 @@ def translatePathToCoordinates(path, cellsize):
 		newpath.append(translateCellToCoordinates(cell, cellsize))
 	return newpath
 
+# True if cell (x, y) is on the grid and traversable
+def cellTraversable(x, y, grid, dimensions):
+	return x >= 0 and y >= 0 and x < dimensions[0] and y < dimensions[1] and grid[x][y]
+
+# The length of the shortest 8-connected path between two cells if nothing is in the way
+def octileDistance(cell1, cell2):
+	dx = abs(cell1[0] - cell2[0])
+	dy = abs(cell1[1] - cell2[1])
+	return max(dx, dy) + (math.sqrt(2.0) - 1.0) * min(dx, dy)
+
+# The 8-connected neighbors of cell that can be moved to. A diagonal move needs both cells beside it to be traversable.
+def getDiagonalCellSuccessors(cell, grid, dimensions):
+	x, y = cell
+	successors = []
+	for dx, dy in ((1, 0), (-1, 0), (0, 1), (0, -1)):
+		if cellTraversable(x + dx, y + dy, grid, dimensions):
+			successors.append((x + dx, y + dy))
+	for dx, dy in ((1, 1), (1, -1), (-1, 1), (-1, -1)):
+		if cellTraversable(x + dx, y + dy, grid, dimensions) and cellTraversable(x + dx, y, grid, dimensions) and cellTraversable(x, y + dy, grid, dimensions):
+			successors.append((x + dx, y + dy))
+	return successors
 
+# The cells from start to end following parent
+def traceCells(end, parent):
+	path = []
+	cell = end
+	while cell is not None:
+		path.append(cell)
+		cell = parent[cell]
+	path.reverse()
+	return path
+
+# A* over every cell of the 8-connected grid. Returns the cells of a shortest path from start to end (including both, empty if
+# there is none) and the number of cells expanded.
+def gridAStar(start, end, grid, dimensions):
+	if start is None or end is None or not cellTraversable(end[0], end[1], grid, dimensions):
+		return [], 0
+	cost = {start: 0}
+	parent = {start: None}
+	heap = [(octileDistance(start, end), start)]
+	closed = set()
+	while len(heap) > 0:
+		f, current = heapq.heappop(heap)
+		if current in closed:
+			continue
+		if current == end:
+			return traceCells(end, parent), len(closed)
+		closed.add(current)
+		for successor in getDiagonalCellSuccessors(current, grid, dimensions):
+			if successor in closed:
+				continue
+			g = cost[current] + octileDistance(current, successor)
+			if successor not in cost or g < cost[successor]:
+				cost[successor] = g
+				parent[successor] = current
+				heapq.heappush(heap, (g + octileDistance(successor, end), successor))
+	return [], len(closed)
+
+# Jump Point Search over the 8-connected grid (see JPSGridNavigator). Returns the jump points of a shortest path from start to end
+# (including both, empty if there is none); consecutive jump points are in a straight or diagonal line of traversable cells.
+# Also returns the number of jump points expanded.
+def jumpPointSearch(start, end, grid, dimensions):
+	if start is None or end is None or not cellTraversable(end[0], end[1], grid, dimensions):
+		return [], 0
+	def free(x, y):
+		return x >= 0 and y >= 0 and x < dimensions[0] and y < dimensions[1] and grid[x][y]
+	# The first jump point going straight from (x, y) in direction (dx, dy), or None if an obstacle comes first.
+	# A cell is a jump point if a cell beside it is traversable but the cell behind that one isn't: a shortest path might turn there.
+	# This is where most of the time goes, so the cells are read from the grid directly.
+	columns, rows = dimensions
+	def jumpStraight(x, y, dx, dy):
+		if dy == 0:
+			while True:
+				x = x + dx
+				if x < 0 or x >= columns or not grid[x][y]:
+					return None
+				if (x == end[0] and y == end[1]) or (y > 0 and grid[x][y - 1] and not grid[x - dx][y - 1]) or (y < rows - 1 and grid[x][y + 1] and not grid[x - dx][y + 1]):
+					return (x, y)
+		column = grid[x]
+		left = grid[x - 1] if x > 0 else None
+		right = grid[x + 1] if x < columns - 1 else None
+		while True:
+			y = y + dy
+			if y < 0 or y >= rows or not column[y]:
+				return None
+			if (x == end[0] and y == end[1]) or (left is not None and left[y] and not left[y - dy]) or (right is not None and right[y] and not right[y - dy]):
+				return (x, y)
+	# The first jump point going diagonally from (x, y). A cell is a jump point if there is one straight from it along either
+	# part of the diagonal.
+	def jumpDiagonal(x, y, dx, dy):
+		while True:
+			if not (free(x + dx, y) and free(x, y + dy)):
+				return None
+			x = x + dx
+			y = y + dy
+			if not free(x, y):
+				return None
+			if (x, y) == end or jumpStraight(x, y, dx, 0) is not None or jumpStraight(x, y, 0, dy) is not None:
+				return (x, y)
+	# The directions worth searching from cell, reached from parent: straight on, and the ways a shortest path could turn
+	def directions(cell, parent):
+		x, y = cell
+		if parent is None:
+			return [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1) if (dx, dy) != (0, 0)]
+		dx = cmp(x - parent[0], 0)
+		dy = cmp(y - parent[1], 0)
+		result = []
+		if dx != 0 and dy != 0:
+			result = [(dx, 0), (0, dy), (dx, dy)]
+		elif dx != 0:
+			result = [(dx, 0)]
+			for side in (-1, 1):
+				if free(x, y + side):
+					result = result + [(0, side), (dx, side)]
+		else:
+			result = [(0, dy)]
+			for side in (-1, 1):
+				if free(x + side, y):
+					result = result + [(side, 0), (side, dy)]
+		return result
+	cost = {start: 0}
+	parent = {start: None}
+	heap = [(octileDistance(start, end), start)]
+	closed = set()
+	while len(heap) > 0:
+		f, current = heapq.heappop(heap)
+		if current in closed:
+			continue
+		if current == end:
+			return traceCells(end, parent), len(closed)
+		closed.add(current)
+		for dx, dy in directions(current, parent[current]):
+			if dx != 0 and dy != 0:
+				point = jumpDiagonal(current[0], current[1], dx, dy)
+			else:
+				point = jumpStraight(current[0], current[1], dx, dy)
+			if point is None or point in closed:
+				continue
+			g = cost[current] + octileDistance(current, point)
+			if point not in cost or g < cost[point]:
+				cost[point] = g
+				parent[point] = current
+				heapq.heappush(heap, (g + octileDistance(point, end), point))
+	return [], len(closed)
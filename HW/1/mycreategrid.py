@@ -28,7 +28,78 @@ def myCreateGrid(world, cellsize):
 	grid = None
 	dimensions = (0, 0)
 	### YOUR CODE GOES BELOW HERE ###
-
+	worldDimensions = world.getDimensions()
+	# Only whole cells, so an agent at the center of any cell is at least cellsize/2 from the edges of the world
+	dimensions = (int(worldDimensions[0] / cellsize), int(worldDimensions[1] / cellsize))
+	# The obstacles are sampled GRIDSAMPLES times per cell side. A sample can be up to about one spacing from the edge of the
+	# obstacle it marks, so a cell is traversable if no marked sample is within cellsize/2 plus one spacing of its center.
+	spacing = cellsize / float(GRIDSAMPLES)
+	limit = (cellsize / 2.0) / spacing + 1.0
+	# Samples around the grid too, so that obstacles just outside it are seen
+	pad = int(math.ceil(limit))
+	origin = (-pad * spacing, -pad * spacing)
+	obstacles = [obstacle.getPoints() for obstacle in world.getObstacles()]
+	occupied = rasterizePolygons(obstacles, origin, dimensions[0] * GRIDSAMPLES + 2 * pad, dimensions[1] * GRIDSAMPLES + 2 * pad, spacing)
+	clearance = distanceTransform(occupied, limit)
+	# The sample at the center of each cell
+	centers = clearance[pad + GRIDSAMPLES / 2::GRIDSAMPLES, pad + GRIDSAMPLES / 2::GRIDSAMPLES][:dimensions[0], :dimensions[1]]
+	grid = (centers > limit).tolist()
 	### YOUR CODE GOES ABOVE HERE ###
 	return grid, dimensions
 
+# Rasterizes polygons (lists of points) into a numpy array of booleans of shape (columns, rows). Sample (i, j) is the point
+# (origin[0] + (i + 0.5) * spacing, origin[1] + (j + 0.5) * spacing), and is True if it is inside a polygon (even-odd rule) or is
+# the nearest sample to a point on a polygon's edge, so polygons thinner than a sample aren't lost.
+# Polygons are filled a scanline (row of samples) at a time, between pairs of the points where their edges cross the scanline.
+def rasterizePolygons(polygons, origin, columns, rows, spacing):
+	occupied = numpy.zeros((columns, rows), dtype=bool)
+	for polygon in polygons:
+		starts = (numpy.array(polygon, dtype=numpy.float64).reshape((-1, 2)) - origin) / spacing - 0.5
+		if len(starts) == 0:
+			continue
+		ends = numpy.roll(starts, -1, axis=0)
+		# Scanlines, in sample units
+		top = max(0, int(math.ceil(starts[:, 1].min())))
+		bottom = min(rows - 1, int(math.floor(starts[:, 1].max())))
+		for j in xrange(top, bottom + 1):
+			# Edges crossing the scanline. Each edge includes its lower end only, so a vertex on the scanline is counted once.
+			crossing = (starts[:, 1] <= j) != (ends[:, 1] <= j)
+			a = starts[crossing]
+			b = ends[crossing]
+			xs = numpy.sort(a[:, 0] + (j - a[:, 1]) * (b[:, 0] - a[:, 0]) / (b[:, 1] - a[:, 1]))
+			for k in xrange(0, len(xs) - 1, 2):
+				first = max(0, int(math.ceil(xs[k])))
+				last = min(columns - 1, int(math.floor(xs[k + 1])))
+				if first <= last:
+					occupied[first:last + 1, j] = True
+		# Points every half sample along each edge
+		for a, b in zip(starts, ends):
+			steps = max(1, int(math.ceil(numpy.hypot(b[0] - a[0], b[1] - a[1]) * 2.0)))
+			t = numpy.linspace(0.0, 1.0, steps + 1)
+			i = numpy.rint(a[0] + t * (b[0] - a[0])).astype(int)
+			j = numpy.rint(a[1] + t * (b[1] - a[1])).astype(int)
+			inside = (i >= 0) & (i < columns) & (j >= 0) & (j < rows)
+			occupied[i[inside], j[inside]] = True
+	return occupied
+
+# The distance (in samples) from every sample to the nearest True sample of occupied, or INFINITY if that is more than limit.
+# Separable: first the distance to the nearest True sample in the same row, then the nearest of those over the rows within limit,
+# so it takes time proportional to the number of samples times limit.
+def distanceTransform(occupied, limit):
+	columns, rows = occupied.shape
+	reach = int(math.floor(limit))
+	# Distance along the row
+	across = numpy.where(occupied, 0.0, INFINITY)
+	for d in xrange(1, min(reach, columns - 1) + 1):
+		across[d:, :] = numpy.minimum(across[d:, :], numpy.where(occupied[:-d, :], float(d), INFINITY))
+		across[:-d, :] = numpy.minimum(across[:-d, :], numpy.where(occupied[d:, :], float(d), INFINITY))
+	# Squared distance over the nearby rows
+	across = across * across
+	squared = across.copy()
+	for d in xrange(1, min(reach, rows - 1) + 1):
+		squared[:, d:] = numpy.minimum(squared[:, d:], across[:, :-d] + d * d)
+		squared[:, :-d] = numpy.minimum(squared[:, :-d], across[:, d:] + d * d)
+	dist = numpy.sqrt(squared)
+	dist[dist > limit] = INFINITY
+	return dist
+
@@ -0,0 +1,182 @@
+# USAGE:
+# extract "bulk_downloads.zip", make sure root directory, "grades.csv" file, and this script are in root of "bulk_downloads" folder
+# python bulkgrader.py [number of workers]
+#
+# Grades every submission in its own process, several at a time. A submission that runs longer than the timeout
+# in autogradersettings.py is killed. Grades are appended to graded.csv as they finish; if the script is
+# interrupted, running it again skips every student already in graded.csv. When all students are graded,
+# graded.csv is rewritten in the same order as grades.csv.
+# Autograders that return (grade, comment) get the comment written to comments.txt in the student's directory,
+# where the bulk download keeps feedback comments.
+
+import csv, sys, os, time, signal, traceback, multiprocessing
+
+from autogradersettings import *
+
+ERRORGRADE = "ERROR"
+TIMEOUTGRADE = "TIMEOUT"
+
+# Rows of grades.csv before the first student
+HEADERROWS = 3
+
+gradesCSVPath = os.path.join(root, "grades.csv")
+gradedCSVPath = os.path.join(root, "graded.csv")
+
+# Map "last,first" to the student's submission directory
+def findSubmissions():
+	submissions = {}
+	for dirName, subdirs, files in os.walk(root):
+		for subdir in subdirs:
+			student = subdir
+			truncateIndex = subdir.find('(')
+			if truncateIndex > 0:
+				student = subdir[0:truncateIndex]
+			submissions[student] = subdir
+		break
+	return submissions
+
+# The directory holding the student's submitted files, or None if nothing was submitted
+def findSubmission(submissions, columns):
+	last_name = columns[2]
+	first_name = columns[3]
+	student_dir = submissions[last_name + "," + first_name]
+	student_path = os.path.join(root, student_dir, "Submission attachment(s)")
+	for dirName, subdirs, files in os.walk(student_path):
+		if len(files) > 0:
+			return student_path
+		break
+	return None
+
+# Runs in the submission's own process. The autograder is only imported here, so every submission gets a fresh
+# pygame with its own dummy display and a fresh copy of the student's module.
+def gradeProcess(student_path, conn):
+	if disablePrint:
+		f = open(os.devnull, 'w')
+		sys.stdout = f
+	try:
+		from autograder2 import AutoGrader
+		grade = AutoGrader().runAutoGrader(student_path)
+		comment = None
+		# Some autograders return (grade, comment)
+		if isinstance(grade, tuple):
+			grade, comment = grade
+		result = ("" + str(round(grade, 1)), comment)
+	except BaseException:
+		result = (ERRORGRADE, traceback.format_exc())
+	conn.send(result)
+	conn.close()
+
+def writeRow(columns):
+	with open(gradedCSVPath, "ab") as gradeFile:
+		writer = csv.writer(gradeFile)
+		writer.writerow(columns)
+
+# Replace the feedback comments of the student whose submission is in student_path
+def writeComments(student_path, comment):
+	with open(os.path.join(os.path.dirname(student_path), "comments.txt"), "wb") as commentFile:
+		commentFile.write(str(comment) + "\n")
+
+def finishStudent(columns, grade, message = None):
+	print "Student: " + columns[2] + "," + columns[3]
+	if message is not None:
+		print message
+	print "Grade: " + grade
+	columns[4] = grade
+	writeRow(columns)
+
+def main():
+	workers = multiprocessing.cpu_count()
+	if len(sys.argv) > 1:
+		workers = int(sys.argv[1])
+
+	source = open(gradesCSVPath, "rb")
+	rows = list(csv.reader(source))
+	source.close()
+
+	# Resume: students already in graded.csv are not graded again
+	graded = {}
+	if os.path.exists(gradedCSVPath):
+		partial = open(gradedCSVPath, "rb")
+		for columns in list(csv.reader(partial))[HEADERROWS:]:
+			if len(columns) > 4:
+				graded[columns[0]] = columns
+		partial.close()
+		print "Resuming:", len(graded), "students already graded"
+	else:
+		for columns in rows[:HEADERROWS]:
+			writeRow(columns)
+
+	submissions = findSubmissions()
+	pending = []
+	for columns in rows[HEADERROWS:]:
+		if columns[0] in graded:
+			continue
+		student_path = findSubmission(submissions, columns)
+		if student_path is None:
+			# no submission?
+			finishStudent(list(columns), "0")
+		else:
+			pending.append((columns, student_path))
+
+	running = []
+	while pending or running:
+		while pending and len(running) < workers:
+			columns, student_path = pending.pop(0)
+			receiver, sender = multiprocessing.Pipe(False)
+			p = multiprocessing.Process(target = gradeProcess, args = (student_path, sender))
+			p.daemon = True
+			p.start()
+			sender.close()
+			running.append((p, receiver, columns, student_path, time.time()))
+		stillRunning = []
+		for p, receiver, columns, student_path, started in running:
+			result = None
+			if receiver.poll():
+				try:
+					result = receiver.recv()
+				except EOFError:
+					result = (ERRORGRADE, "Grader process died (exit code " + str(p.exitcode) + ").")
+			elif not p.is_alive():
+				# The grade may have been sent between poll() and is_alive()
+				p.join()
+				try:
+					if receiver.poll():
+						result = receiver.recv()
+				except EOFError:
+					pass
+				if result is None:
+					result = (ERRORGRADE, "Grader process died (exit code " + str(p.exitcode) + ").")
+			elif timeout and time.time() - started > timeout:
+				# pygame catches SIGTERM, so use SIGKILL
+				os.kill(p.pid, signal.SIGKILL)
+				result = (TIMEOUTGRADE, "Submission timed out.")
+			if result is None:
+				stillRunning.append((p, receiver, columns, student_path, started))
+			else:
+				p.join(1)
+				receiver.close()
+				grade, message = result
+				if grade == ERRORGRADE and message is not None:
+					message = "Error in submission.\n" + message
+				elif grade != TIMEOUTGRADE and message is not None:
+					writeComments(student_path, message)
+				finishStudent(list(columns), grade, message)
+		running = stillRunning
+		if running:
+			time.sleep(0.1)
+
+	# Every student is graded: put graded.csv back in the order of grades.csv
+	partial = open(gradedCSVPath, "rb")
+	for columns in list(csv.reader(partial))[HEADERROWS:]:
+		graded[columns[0]] = columns
+	partial.close()
+	ordered = rows[:HEADERROWS] + [graded.get(columns[0], columns) for columns in rows[HEADERROWS:]]
+	temp = gradedCSVPath + ".tmp"
+	with open(temp, "wb") as gradeFile:
+		writer = csv.writer(gradeFile)
+		for columns in ordered:
+			writer.writerow(columns)
+	os.rename(temp, gradedCSVPath)
+
+if __name__ == "__main__":
+	main()
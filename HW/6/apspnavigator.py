@@ -0,0 +1,230 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import sys, pygame, math, numpy, random, time, copy, heapq, multiprocessing
+from pygame.locals import *
+
+from constants import *
+from utils import *
+from core import *
+from astarnavigator import *
+
+###############################
+### APSPNavigator
+###
+### Creates a path node network and pre-computes the shortest paths between every pair of path nodes, so that finding a path
+### is a walk through the next table instead of a search.
+### The tables are kept in the navigation context and stored in the nav mesh cache with the path network. They are never
+### modified afterwards, so every navigator on the map shares them.
+### Gates aren't part of the tables: if a gate blocks an edge of the table's path, the path is found with A* instead.
+
+class APSPNavigator(AStarNavigator):
+
+    ### nodeIndex, dist, next: the shortest path tables (kept in the context, see APSPNavigationContext)
+
+    nodeIndex = property(lambda self: self.context.nodeIndex)
+    dist = property(lambda self: self.context.dist)
+    next = property(lambda self: self.context.next)
+
+    def createContext(self):
+        return APSPNavigationContext()
+
+    ### Create the pathnode network and pre-compute all shortest paths along the network.
+    ### self: the navigator object
+    ### world: the world object
+    def createPathNetwork(self, world):
+        AStarNavigator.createPathNetwork(self, world)
+        self.setTables(*allPairsShortestPaths(self.pathnodes, self.pathnetwork))
+        return None
+
+    ### Use dist and next as the shortest path tables for the path nodes. The arrays are made read-only.
+    def setTables(self, dist, next):
+        dist.flags.writeable = False
+        next.flags.writeable = False
+        self.setContextValue('dist', dist)
+        self.setContextValue('next', next)
+        self.setContextValue('nodeIndex', dict((node, i) for i, node in enumerate(self.pathnodes)))
+
+    def getCacheTables(self):
+        if self.dist is None:
+            return {}
+        return {'dist': self.dist, 'next': self.next}
+
+    def setCacheTables(self, tables):
+        n = len(self.pathnodes)
+        if 'dist' not in tables or 'next' not in tables or tables['dist'].shape != (n, n) or tables['next'].shape != (n, n):
+            return False
+        self.setTables(tables['dist'], tables['next'])
+        return True
+
+    ### Paths read from the tables are found right away, so only A* paths are planned on the world's PathScheduler
+    def canSchedulePath(self, start, end):
+        return self.next is None and AStarNavigator.canSchedulePath(self, start, end)
+
+    ### The path from path node start to path node end (not including start), read from the next table.
+    ### A* is used if the tables don't have both nodes or a gate blocks the table's path.
+    def findPath(self, start, end):
+        if self.next is None or start not in self.nodeIndex or end not in self.nodeIndex:
+            return AStarNavigator.findPath(self, start, end)
+        path = tablePath(self.nodeIndex[start], self.nodeIndex[end], self.next, self.pathnodes)
+        if isinstance(self.world, GatedWorld):
+            network = self.getUnobstructedNetwork()
+            if self.context.edgeMask.blocked.any():
+                previous = start
+                for node in path:
+                    if node not in network.getNeighbors(previous):
+                        return AStarNavigator.findPath(self, start, end)
+                    previous = node
+        return path
+
+###############################
+### APSPNavigationContext
+###
+### The NavigationContext of an APSPNavigator: also keeps the shortest path tables.
+
+class APSPNavigationContext(AStarNavigationContext):
+
+    ### nodeIndex: dictionary from path node to its row (and column) in dist and next
+    ### dist: numpy array; dist[i, j] is the length of the shortest path from path node i to path node j (INFINITY if there is none)
+    ### next: numpy array; next[i, j] is the index of the path node after i on the shortest path from i to j (-1 if there is none)
+
+    def __init__(self):
+        AStarNavigationContext.__init__(self)
+        self.nodeIndex = None
+        self.dist = None
+        self.next = None
+
+### Shortest path tables for a path network. Returns (dist, next) (see APSPNavigationContext).
+### Floyd-Warshall takes time cubic in the number of nodes, so networks with more than APSPDIJKSTRANODES nodes run Dijkstra from
+### every node instead (path networks have few edges per node), spread over a pool of processes.
+def allPairsShortestPaths(nodes, edges):
+    if len(nodes) <= APSPDIJKSTRANODES:
+        return floydWarshall(nodes, edges)
+    return repeatedDijkstra(nodes, edges, apspWorkers())
+
+### How many processes repeatedDijkstra uses. Process pools need the main script to be import-safe on Windows, which the
+### run scripts aren't, so there it only uses one unless APSPWORKERS says otherwise.
+def apspWorkers():
+    if APSPWORKERS > 0:
+        return APSPWORKERS
+    if sys.platform.startswith('win'):
+        return 1
+    return multiprocessing.cpu_count()
+
+### Shortest path tables for a path network with the Floyd-Warshall algorithm. Returns (dist, next) (see APSPNavigationContext).
+### Each step of the outer loop updates every pair at once with numpy, so it takes time quadratic in the number of nodes
+### instead of running Python code for every (i, j, k).
+def floydWarshall(nodes, edges):
+    n = len(nodes)
+    index = dict((node, i) for i, node in enumerate(nodes))
+    dist = numpy.empty((n, n), dtype=numpy.float64)
+    dist.fill(INFINITY)
+    next = numpy.empty((n, n), dtype=numpy.int32)
+    next.fill(-1)
+    diagonal = numpy.arange(n)
+    dist[diagonal, diagonal] = 0
+    next[diagonal, diagonal] = diagonal
+    for edge in edges:
+        if edge[0] not in index or edge[1] not in index:
+            continue
+        i = index[edge[0]]
+        j = index[edge[1]]
+        d = distance(edge[0], edge[1])
+        if d < dist[i, j]:
+            dist[i, j] = dist[j, i] = d
+            next[i, j] = j
+            next[j, i] = i
+    for k in xrange(n):
+        # Going through node k is shorter for these pairs
+        through = dist[:, k:k+1] + dist[k:k+1, :]
+        shorter = through < dist
+        dist = numpy.where(shorter, through, dist)
+        next = numpy.where(shorter, next[:, k:k+1], next)
+    return dist, next
+
+### The path nodes from node start to node end (indices into nodes), not including start, following the next table.
+### Empty if there is no path.
+def tablePath(start, end, next, nodes):
+    path = []
+    current = start
+    while current != end:
+        current = int(next[current, end])
+        if current < 0:
+            return []
+        path.append(nodes[current])
+    return path
+
+### For each node (by index), a list of (neighbor index, edge length)
+def networkAdjacency(nodes, edges):
+    index = dict((node, i) for i, node in enumerate(nodes))
+    adjacency = [[] for node in nodes]
+    for edge in edges:
+        if edge[0] not in index or edge[1] not in index:
+            continue
+        i = index[edge[0]]
+        j = index[edge[1]]
+        d = distance(edge[0], edge[1])
+        adjacency[i].append((j, d))
+        adjacency[j].append((i, d))
+    return adjacency
+
+### Shortest path tables for a path network with Dijkstra's algorithm from every node, in workers processes.
+def repeatedDijkstra(nodes, edges, workers = 1):
+    adjacency = networkAdjacency(nodes, edges)
+    sources = range(len(nodes))
+    if workers > 1:
+        pool = multiprocessing.Pool(workers, initDijkstraWorker, (adjacency,))
+        try:
+            rows = pool.map(dijkstraWorker, sources, max(1, len(sources) / (workers * 4)))
+        finally:
+            pool.close()
+            pool.join()
+    else:
+        rows = [dijkstra(adjacency, source) for source in sources]
+    dist = numpy.array([row[0] for row in rows], dtype=numpy.float64).reshape((len(nodes), len(nodes)))
+    next = numpy.array([row[1] for row in rows], dtype=numpy.int32).reshape((len(nodes), len(nodes)))
+    return dist, next
+
+### The adjacency lists of the network a pool worker is working on
+workerAdjacency = None
+
+def initDijkstraWorker(adjacency):
+    global workerAdjacency
+    workerAdjacency = adjacency
+
+def dijkstraWorker(source):
+    return dijkstra(workerAdjacency, source)
+
+### Dijkstra's algorithm from node source. Returns the distance to every node and the first node after source on the way there
+### (lists indexed by node, INFINITY and -1 for nodes that can't be reached).
+def dijkstra(adjacency, source):
+    dist = [INFINITY] * len(adjacency)
+    first = [-1] * len(adjacency)
+    dist[source] = 0
+    first[source] = source
+    heap = [(0, source)]
+    while heap:
+        d, current = heapq.heappop(heap)
+        if d > dist[current]:
+            continue
+        for neighbor, length in adjacency[current]:
+            if d + length < dist[neighbor]:
+                dist[neighbor] = d + length
+                first[neighbor] = neighbor if current == source else first[current]
+                heapq.heappush(heap, (d + length, neighbor))
+    return dist, first
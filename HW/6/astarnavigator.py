@@ -16,7 +16,7 @@
  * limitations under the License.
 '''
 
-import sys, pygame, math, numpy, random, time, copy
+import sys, pygame, math, numpy, random, time, copy, heapq, collections
 from pygame.locals import *
 
 from constants import *
@@ -28,12 +28,22 @@ from mynavigatorhelpers import *
 ###############################
 ### AStarNavigator
 ###
-### Creates a path node network and implements the FloydWarshall all-pairs shortest-path algorithm to create a path to the given destination.
+### Creates a path node network and uses A* to create a path to the given destination.
 
 class AStarNavigator(NavMeshNavigator):
 
+    ### clearVersion: the world's gate version when every leg of the current path was known to be clear, or None
+    ### request: the PathRequest the navigator is waiting on, or None
+    ### requestVersion: the world's gate version when request was made
+
     def __init__(self):
         NavMeshNavigator.__init__(self)
+        self.clearVersion = None
+        self.request = None
+        self.requestVersion = None
+
+    def createContext(self):
+        return AStarNavigationContext()
 
 
     ### Create the pathnode network and pre-compute all shortest paths along the network.
@@ -52,6 +62,8 @@ class AStarNavigator(NavMeshNavigator):
         if self.agent != None and self.world != None:
             self.source = source
             self.destination = dest
+            self.clearVersion = None
+            self.cancelRequest()
             ### Step 1: If the agent has a clear path from the source to dest, then go straight there.
             ###   Determine if there are no obstacles between source and destination (hint: cast rays against world.getLines(), check for clearance).
             ###   Tell the agent to move to dest
@@ -60,25 +72,85 @@ class AStarNavigator(NavMeshNavigator):
             ###   Create the path by traversing the self.next matrix until the pathnode closes to the destination is reached
             ###   Store the path by calling self.setPath()
             ###   Tell the agent to move to the first node in the path (and pop the first node off the path)
-            if clearShot(source, dest, self.world.getLines(), self.world.getPoints(), self.agent):
+            if clearShot(source, dest, self.world.getLineArray(), self.world.getPoints(), self.agent):
+                self.clearVersion = gateVersion(self.world)
                 self.agent.moveToTarget(dest)
             else:
-                start = findClosestUnobstructed(source, self.pathnodes, self.world.getLinesWithoutBorders())
-                end = findClosestUnobstructed(dest, self.pathnodes, self.world.getLinesWithoutBorders())
+                start = self.findClosestNode(source, self.world.getLineArrayWithoutBorders())
+                end = self.findClosestNode(dest, self.world.getLineArrayWithoutBorders())
                 if start != None and end != None:
-                    print len(self.pathnetwork)
-                    newnetwork = unobstructedNetwork(self.pathnetwork, self.world.getGates())
-                    print len(newnetwork)
-                    closedlist = []
-                    path, closedlist = astar(start, end, newnetwork)
-                    if path is not None and len(path) > 0:
-                        path = shortcutPath(source, dest, path, self.world, self.agent)
-                        self.setPath(path)
-                        if self.path is not None and len(self.path) > 0:
-                            first = self.path.pop(0)
-                            self.agent.moveToTarget(first)
+                    if ASYNCPATHPLANNING and self.canSchedulePath(start, end):
+                        self.schedulePath(start, end)
+                    else:
+                        self.followPath(source, self.findPath(start, end))
         return None
 
+    ### Smooth path (path nodes leading from source to the destination) and start the agent on it
+    def followPath(self, source, path):
+        if path is not None and len(path) > 0:
+            path = shortcutPath(source, self.destination, path, self.world, self.agent)
+            self.setPath(path)
+            if self.path is not None and len(self.path) > 0:
+                first = self.path.pop(0)
+                self.agent.moveToTarget(first)
+
+    ### True if the path from path node start to path node end should be planned on the world's PathScheduler rather than
+    ### right away: it isn't in the path cache.
+    def canSchedulePath(self, start, end):
+        return start != end and not self.context.getPathCache().contains(start, end, gateVersion(self.world))
+
+    ### Ask the world's PathScheduler for the path from path node start to path node end. Agents going between the same nodes
+    ### share one search. Until the path comes in (see pathPlanned), the agent heads for start: start is in the same nav mesh
+    ### polygon as the agent, so the way there is clear, which the way to the destination isn't.
+    def schedulePath(self, start, end):
+        network = self.getUnobstructedNetwork()
+        request = PathRequest(AStarSearch(start, end, network), self.pathPlanned, (start, end, network))
+        self.request = self.world.getPathScheduler().submit(request)
+        self.requestVersion = gateVersion(self.world)
+        self.agent.moveToTarget(start)
+
+    ### Callback from the PathScheduler when the path the navigator asked for has been found
+    def pathPlanned(self, request):
+        if request is not self.request:
+            return
+        self.request = None
+        search = request.search
+        if self.requestVersion != gateVersion(self.world):
+            # The gates moved while the path was being planned
+            self.computePath(self.agent.getLocation(), self.destination)
+            return
+        self.context.getPathCache().put(search.init, search.goal, self.requestVersion, search.path)
+        if len(search.path) > 0:
+            # The agent may not have reached start yet
+            self.followPath(self.agent.getLocation(), [search.init] + list(search.path))
+
+    ### Stop waiting for the path asked for (if any)
+    def cancelRequest(self):
+        if self.request is not None:
+            self.world.getPathScheduler().cancel(self.request, self.pathPlanned)
+            self.request = None
+
+    ### The path from path node start to path node end (not including start) along the edges no gate blocks.
+    ### Paths are remembered in the context's PathCache until the gates change.
+    def findPath(self, start, end):
+        cache = self.context.getPathCache()
+        version = gateVersion(self.world)
+        path = cache.get(start, end, version)
+        if path is None:
+            path, closedlist = astar(start, end, self.getUnobstructedNetwork())
+            cache.put(start, end, version, path)
+        return list(path)
+
+    ### Hits, misses and size of the path cache shared by the navigators on this map
+    def getPathCacheStats(self):
+        return self.context.getPathCache().getStats()
+
+    ### Returns the path network without the edges blocked by gates, indexed for A*.
+    ### Nothing is ray cast unless the world's gate version changed since the last call, and then only the edges near the gates that changed.
+    ### Every navigator sharing the context shares the result.
+    def getUnobstructedNetwork(self):
+        return self.context.getUnobstructedNetwork(self.world)
+
     ### Called when the agent gets to a node in the path.
     ### self: the navigator object
     def checkpoint(self):
@@ -93,58 +165,311 @@ class AStarNavigator(NavMeshNavigator):
     def update(self, delta):
         myUpdate(self, delta)
 
+###############################
+### AStarNavigationContext
+###
+### The NavigationContext of an AStarNavigator: also keeps which path network edges the world's gates block.
+
+class AStarNavigationContext(NavigationContext):
+
+    ### edgeMask: which edges of the path network are blocked by which gates
+    ### networkIndex: the path network minus the edges blocked by gates, indexed for A*
+    ### networkVersion: the world's gate version networkIndex was computed for
+    ### pathCache: PathCache of the paths A* found on the path network (made when first asked for)
+
+    def __init__(self):
+        NavigationContext.__init__(self)
+        self.edgeMask = None
+        self.networkIndex = None
+        self.networkVersion = None
+        self.pathCache = None
+
+    ### The copy starts with an empty path cache, since its path network may be replaced
+    def copy(self):
+        context = NavigationContext.copy(self)
+        context.pathCache = None
+        return context
+
+    ### The PathCache for the path network. Emptied if the path network was replaced.
+    def getPathCache(self):
+        if self.pathCache is None:
+            self.pathCache = PathCache()
+        if self.pathCache.network is not self.pathnetwork:
+            self.pathCache.clear()
+            self.pathCache.network = self.pathnetwork
+        return self.pathCache
+
+    ### The path network without the edges blocked by the world's gates (if it has any), indexed for A*
+    def getUnobstructedNetwork(self, world):
+        version = gateVersion(world)
+        if self.edgeMask is None or self.edgeMask.network is not self.pathnetwork:
+            self.edgeMask = EdgeMask(self.pathnetwork)
+            self.networkIndex = None
+        if self.networkIndex is None or self.networkVersion != version:
+            self.edgeMask.setGates(world.getGates() if isinstance(world, GatedWorld) else [])
+            self.networkIndex = PathNetworkIndex(self.edgeMask.getUnblocked())
+            self.networkVersion = version
+        return self.networkIndex
+
 def unobstructedNetwork(network, worldLines):
     newnetwork = []
-    for l in network:
-        hit = rayTraceWorld(l[0], l[1], worldLines)
+    hits = rayTraceWorldBatch([l[0] for l in network], [l[1] for l in network], worldLines)
+    for l, hit in zip(network, hits):
         if hit == None:
             newnetwork.append(l)
     return newnetwork
 
-def astar(init, goal, network):
-    path = []
-    open = [init]
-    closed = []
-
-    distances = {init: 0}
-    heuristics = {init: distance(init, goal)}
-    prevList = {}
-
-    while open:
-        toSort = [(vertex, heuristics[vertex]) for vertex in open]
-        toSort.sort(key=lambda x: x[1])
-        open = [vertex[0] for vertex in toSort]
-
-        current = open[0]
-        if current == goal:
-            while current != init:
-                path = [current] + path
-                current = prevList[current]
-            break
-
-        neighbors = []
+###############################
+### EdgeMask
+###
+### Keeps track of which edges of a path network are blocked by gates.
+### Each gate remembers the edges it blocks, so when the gates change only the gates that were added have to be ray cast,
+### and only against the edges whose bounding box overlaps the gate.
+
+class EdgeMask(object):
+
+    ### network: the edges
+    ### starts, ends: numpy arrays of the edge endpoints
+    ### blocked: for each edge, the number of gates blocking it
+    ### gates: list of (gate line, indices of the edges it blocks)
+
+    def __init__(self, network):
+        self.network = network
+        self.starts = numpy.array([e[0] for e in network], dtype=numpy.float64).reshape((-1, 2))
+        self.ends = numpy.array([e[1] for e in network], dtype=numpy.float64).reshape((-1, 2))
+        self.mins = numpy.minimum(self.starts, self.ends)
+        self.maxs = numpy.maximum(self.starts, self.ends)
+        self.blocked = numpy.zeros(len(network), dtype=numpy.int32)
+        self.gates = []
+
+    ### Indices of the edges that intersect gate
+    def edgesBlockedBy(self, gate):
+        lo = numpy.minimum(gate[0], gate[1])
+        hi = numpy.maximum(gate[0], gate[1])
+        # Only edges whose bounding box overlaps the gate's can intersect it (calculateIntersectPoint allows EPSILON on each side)
+        near = numpy.nonzero(numpy.all(self.mins <= hi + 2*EPSILON, axis=1) & numpy.all(self.maxs >= lo - 2*EPSILON, axis=1))[0]
+        if len(near) == 0:
+            return near
+        hits = rayTraceWorldBatch([self.network[i][0] for i in near], [self.network[i][1] for i in near], [gate])
+        return near[numpy.array([hit is not None for hit in hits], dtype=numpy.bool_)]
+
+    ### Update the mask for a new set of gate lines
+    def setGates(self, gates):
+        remaining = list(gates)
+        kept = []
+        for gate, indices in self.gates:
+            if gate in remaining:
+                remaining.remove(gate)
+                kept.append((gate, indices))
+            else:
+                self.blocked[indices] -= 1
+        for gate in remaining:
+            indices = self.edgesBlockedBy(gate)
+            self.blocked[indices] += 1
+            kept.append((gate, indices))
+        self.gates = kept
+
+    ### The edges that no gate blocks, in network order
+    def getUnblocked(self):
+        return [e for e, b in zip(self.network, self.blocked.tolist()) if b == 0]
+
+###############################
+### PathCache
+###
+### Least recently used cache of the paths between pairs of path nodes, so that agents heading for the same places (e.g., minions
+### from the same base attacking the same tower) don't repeat the same search.
+### Paths are only good for the gates they were found with: the cache is emptied when used with a different gate version.
+
+class PathCache(object):
+
+    ### paths: ordered dictionary from (start node, end node, gate version) to the path, least recently used first
+    ### network: the path network the paths were found on
+    ### version: the gate version of the paths in the cache
+    ### maxSize: least recently used paths are dropped to stay at this many paths
+    ### hits, misses, evictions, invalidations: counters for tuning (invalidations counts how many times the gates emptied the cache)
+
+    def __init__(self, maxSize = PATHCACHESIZE):
+        self.paths = collections.OrderedDict()
+        self.network = None
+        self.version = None
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    ### The path from start to end found with the given gate version, or None if it isn't in the cache.
+    ### The path is shared with the cache and must not be modified.
+    def get(self, start, end, version):
+        self.setVersion(version)
+        key = (start, end, version)
+        path = self.paths.pop(key, None)
+        if path is None:
+            self.misses = self.misses + 1
+            return None
+        self.hits = self.hits + 1
+        # Most recently used goes last
+        self.paths[key] = path
+        return path
+
+    ### True if the path from start to end found with the given gate version is in the cache. Counts a miss if it isn't (the
+    ### path is about to be searched for); a path that is found counts when it is read with get.
+    def contains(self, start, end, version):
+        self.setVersion(version)
+        if (start, end, version) in self.paths:
+            return True
+        self.misses = self.misses + 1
+        return False
+
+    def put(self, start, end, version, path):
+        self.setVersion(version)
+        self.paths[(start, end, version)] = tuple(path)
+        while len(self.paths) > self.maxSize:
+            self.paths.popitem(False)
+            self.evictions = self.evictions + 1
+
+    ### Empty the cache if its paths were found with a different gate version
+    def setVersion(self, version):
+        if version != self.version:
+            if len(self.paths) > 0:
+                self.invalidations = self.invalidations + 1
+            self.paths = collections.OrderedDict()
+            self.version = version
+
+    def clear(self):
+        self.paths = collections.OrderedDict()
+        self.version = None
+
+    def getStats(self):
+        return {'paths': len(self.paths), 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions, 'invalidations': self.invalidations}
+
+###############################
+### PathNetworkIndex
+###
+### Adjacency lists for a path network, built once so that A* doesn't have to scan every edge to find neighbors.
+### Neighbors are listed in the order their edges appear in the network.
+
+class PathNetworkIndex(object):
+
+    ### network: the edges that were indexed
+    ### adjacency: dictionary from node to the list of its neighbors
+
+    def __init__(self, network):
+        self.network = network
+        self.adjacency = {}
+        seen = {}
         for edge in network:
             for index in range(len(edge)):
-                if current == edge[index] and edge[1 - index] not in neighbors: neighbors.append(edge[1 - index])
+                node = edge[index]
+                other = edge[1 - index]
+                if node not in seen:
+                    seen[node] = set()
+                    self.adjacency[node] = []
+                if other not in seen[node]:
+                    seen[node].add(other)
+                    self.adjacency[node].append(other)
+
+    def getNeighbors(self, node):
+        return self.adjacency.get(node, [])
+
+### A* from init to goal. network is a list of edges or a PathNetworkIndex.
+### Returns the path (not including init) and the closed list (nodes in the order they were expanded).
+def astar(init, goal, network):
+    if not isinstance(network, PathNetworkIndex):
+        network = PathNetworkIndex(network)
+    search = AStarSearch(init, goal, network)
+    search.step()
+    return search.path, search.closed
+
+###############################
+### AStarSearch
+###
+### An A* search that can be run a few nodes at a time (see PathScheduler).
+### The open list is a binary heap. Nodes are never removed from the heap when their cost goes down; the stale entry is skipped when popped.
+### Ties are broken the same way as re-sorting the open list with a stable sort every iteration would:
+### among nodes with the same f, the one that got that f earliest goes first.
+
+class AStarSearch(object):
+
+    ### init, goal: the nodes to search from and to
+    ### network: the PathNetworkIndex searched
+    ### path: the path found (not including init), empty if there is none or the search isn't done
+    ### closed: the nodes in the order they were expanded
+    ### done: True once the search has finished
+    ### distances: dictionary from node to the length of the shortest path found to it
+    ### keys: the current heap key of every node on the open list
+    ### prevList: dictionary from node to the node before it on the shortest path found to it
+    ### heap: the open list
+    ### count: the number of nodes expanded
+
+    def __init__(self, init, goal, network):
+        self.init = init
+        self.goal = goal
+        self.network = network
+        self.path = []
+        self.closed = []
+        self.closedset = set()
+        self.done = False
+        self.distances = {init: 0}
+        self.keys = {}
+        self.prevList = {}
+        self.heap = []
+        self.count = 0
+        self.keys[init] = (distance(init, goal), self.count, (1, 0))
+        heapq.heappush(self.heap, (self.keys[init], init))
 
-        open.remove(current)
-        closed.append(current)
+    ### Expand at most budget nodes (None: run until done). Returns the number of nodes expanded.
+    def step(self, budget = None):
+        expanded = 0
+        keys = self.keys
+        distances = self.distances
+        goal = self.goal
+        while keys and not self.done and (budget is None or expanded < budget):
+            key, current = heapq.heappop(self.heap)
+            if keys.get(current) != key:
+                # Stale entry
+                continue
+            if current == goal:
+                path = []
+                while current != self.init:
+                    path = [current] + path
+                    current = self.prevList[current]
+                self.path = path
+                self.done = True
+                break
 
-        for neighbor in neighbors:
-            if neighbor in closed: continue
-            if neighbor not in open or distances[current] + distance(current, neighbor) < distances[neighbor]:
-                prevList[neighbor] = current
-                distances[neighbor] = distances[current] + distance(current, neighbor)
-                heuristics[neighbor] = distances[neighbor] + distance(neighbor, goal)
-                if neighbor not in open: open.append(neighbor)
+            del keys[current]
+            self.closed.append(current)
+            self.closedset.add(current)
+            self.count = self.count + 1
+            expanded = expanded + 1
 
-    return path, closed
+            appended = 0
+            for neighbor in self.network.getNeighbors(current):
+                if neighbor in self.closedset: continue
+                if neighbor not in keys or distances[current] + distance(current, neighbor) < distances[neighbor]:
+                    self.prevList[neighbor] = current
+                    distances[neighbor] = distances[current] + distance(current, neighbor)
+                    f = distances[neighbor] + distance(neighbor, goal)
+                    if neighbor in keys:
+                        # Keeps its place relative to the other nodes updated this step
+                        keys[neighbor] = (f, self.count, (0, keys[neighbor]))
+                    else:
+                        # New nodes go after everything already on the open list
+                        keys[neighbor] = (f, self.count, (1, appended))
+                        appended = appended + 1
+                    heapq.heappush(self.heap, (keys[neighbor], neighbor))
+        if not keys:
+            self.done = True
+        return expanded
 
+### On the last leg of a path, keeps checking that the way to the move target is clear, unless it is known to be
+### (but not while it is heading for the first path node, waiting for the path)
 def myUpdate(nav, delta):
-    if not nav.path: nav.agent.navigateTo(nav.agent.moveTarget)
+    if nav.request is None and not nav.path and not pathIsClear(nav): nav.agent.navigateTo(nav.agent.moveTarget)
 
 def myCheckpoint(nav):
-    if not clearShot(nav.agent.getLocation(), nav.agent.moveTarget, nav.world.getLinesWithoutBorders(), nav.world.getPoints(), nav.agent):
+    if not pathIsClear(nav) and not clearShot(nav.agent.getLocation(), nav.agent.moveTarget, nav.world.getLineArrayWithoutBorders(), nav.world.getPoints(), nav.agent):
         nav.agent.stopMoving()
         nav.setPath(None)
 
@@ -0,0 +1,156 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import sys, pygame, math, numpy, random, time, copy
+from pygame.locals import *
+
+from constants import *
+from utils import *
+from core import *
+from astarnavigator import *
+from maps import *
+
+############################
+### How to use this file
+###
+### Compares astar() against the old list-based A* on the Romania graph (homework 4 runromania.py) and on the
+### path networks of the competition maps. Both must return the same path and the same closed list.
+### python benchastar.py [queries per map]
+
+############################
+### List-based A* (what astar used to do)
+
+def listAStar(init, goal, network):
+	path = []
+	open = [init]
+	closed = []
+	distances = {init: 0}
+	heuristics = {init: distance(init, goal)}
+	prevList = {}
+	while open:
+		toSort = [(vertex, heuristics[vertex]) for vertex in open]
+		toSort.sort(key=lambda x: x[1])
+		open = [vertex[0] for vertex in toSort]
+		current = open[0]
+		if current == goal:
+			while current != init:
+				path = [current] + path
+				current = prevList[current]
+			break
+		neighbors = []
+		for edge in network:
+			for index in range(len(edge)):
+				if current == edge[index] and edge[1 - index] not in neighbors: neighbors.append(edge[1 - index])
+		open.remove(current)
+		closed.append(current)
+		for neighbor in neighbors:
+			if neighbor in closed: continue
+			if neighbor not in open or distances[current] + distance(current, neighbor) < distances[neighbor]:
+				prevList[neighbor] = current
+				distances[neighbor] = distances[current] + distance(current, neighbor)
+				heuristics[neighbor] = distances[neighbor] + distance(neighbor, goal)
+				if neighbor not in open: open.append(neighbor)
+	return path, closed
+
+############################
+### Romania (from Artificial Intelligence: A Modern Approach, as in homework 4 runromania.py)
+
+romania = dict(
+    A=set(["Z", "S", "T"]),
+    B=set(["U", "P", "G", "F"]),
+    C=set(["D", "R", "P"]),
+    D=set(["M"]),
+    E=set(["H"]),
+    F=set(["S"]),
+    H=set(["U"]),
+    I=set(["V", "N"]),
+    L=set(["T", "M"]),
+    O=set(["Z", "S"]),
+    P=set(["R"]),
+    R=set(["S"]),
+    U=set(["V"]))
+
+locations = dict(
+    A=( 91, 492),    B=(400, 327),    C=(253, 288),   D=(165, 299),
+    E=(562, 293),    F=(305, 449),    G=(375, 270),   H=(534, 350),
+    I=(473, 506),    L=(165, 379),    M=(168, 339),   N=(406, 537),
+    O=(131, 571),    P=(320, 368),    R=(233, 410),   S=(207, 457),
+    T=( 94, 410),    U=(456, 350),    V=(509, 444),   Z=(108, 531))
+
+def romaniaNetwork():
+	nodes = [locations[l] for l in sorted(locations.keys())]
+	network = []
+	for l in sorted(romania.keys()):
+		for r in sorted(romania[l]):
+			network.append((locations[l], locations[r]))
+	return nodes, network
+
+############################
+### Competition maps
+
+def mapNetwork(name):
+	m = getMap(name)
+	world = GameWorld(SEED, m['dims'], m['dims'])
+	agent = GhostAgent(m['player'], (m['dims'][0]/2, m['dims'][1]/2), 0, SPEED, world)
+	world.setPlayerAgent(agent)
+	world.initializeTerrain(m['obstacles'], (0, 0, 0), 4)
+	nav = AStarNavigator()
+	nav.agent = agent
+	if not NAVMESHCACHE or not loadPathNetwork(nav, world):
+		nav.createPathNetwork(world)
+		if NAVMESHCACHE:
+			savePathNetwork(nav, world)
+	return nav.pathnodes, nav.pathnetwork
+
+### Runs the same queries with both A* implementations. Returns (old seconds, new seconds, nodes expanded, identical).
+def compare(queries, network):
+	index = PathNetworkIndex(network)
+	slow = 0.0
+	fast = 0.0
+	expanded = 0
+	same = True
+	for start, goal in queries:
+		t = time.time()
+		expected = listAStar(start, goal, network)
+		slow = slow + (time.time() - t)
+		t = time.time()
+		found = astar(start, goal, index)
+		fast = fast + (time.time() - t)
+		expanded = expanded + len(found[1])
+		same = same and expected == found
+	return slow, fast, expanded, same
+
+
+if __name__ == '__main__':
+	num = 200
+	if len(sys.argv) > 1:
+		num = int(sys.argv[1])
+	r = random.Random(SEED)
+	graphs = [('romania', romaniaNetwork())] + [(name, mapNetwork(name)) for name in getMapNames()]
+	print "graph     nodes  edges  queries  expanded  list(ms)  heap(ms)  speedup  identical"
+	for name, (nodes, network) in graphs:
+		if name == 'romania':
+			# Every pair, like runromania.py
+			queries = [(p1, p2) for p1 in nodes for p2 in nodes if p1 != p2]
+		else:
+			queries = [(r.choice(nodes), r.choice(nodes)) for _ in xrange(num)]
+		slow, fast, expanded, same = compare(queries, network)
+		print "%-8s  %5d  %5d  %7d  %8d  %8.1f  %8.1f  %6.1fx  %s" % (name, len(nodes), len(network), len(queries), expanded, slow*1000.0, fast*1000.0, slow/max(fast, 1e-9), same)
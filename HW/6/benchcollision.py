@@ -0,0 +1,154 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import sys, pygame, math, numpy, random, time, copy
+from pygame.locals import *
+
+from constants import *
+from utils import *
+from core import *
+
+############################
+### How to use this file
+###
+### Compares the time spent finding collisions in GameWorld.worldCollisionTest against the old all-pairs test.
+### Both tests must find exactly the same collisions in the same order.
+### python benchcollision.py [ticks]
+
+############################
+### All-pairs collision test (what worldCollisionTest used to do)
+
+def allPairsCollisions(world):
+	collisions = []
+	for m1 in world.movers:
+		if m1 in world.movers:
+			# Collision against world boundaries
+			if m1.position[0] < 0 or m1.position[0] > world.dimensions[0] or m1.position[1] < 0 or m1.position[1] > world.dimensions[1]:
+				collisions.append((m1, world))
+			# Collision against obstacles
+			for o in world.obstacles:
+				c = False
+				needCheckVertex = False
+				if isinstance(m1, Agent) and m1.moveTarget != None:
+					moverRadius = m1.getRadius()
+					lines = o.getLines()
+					direction = numpy.subtract(m1.moveTarget, m1.position)
+					magnitude = numpy.linalg.norm(direction)
+					if magnitude > 0:
+						direction = direction / magnitude
+					nextPosition = tuple(numpy.add(m1.position, direction * (m1.speed[0] + moverRadius)))
+					p = rayTraceWorldNoEndPoints(m1.position, nextPosition, lines)
+					if p == None:
+						needCheckVertex = True
+				if needCheckVertex:
+					for v in o.getPoints():
+						if between(v[0], m1.position[0], nextPosition[0]) and between(v[1], m1.position[1], nextPosition[1]):
+							d = minimumDistance((m1.position, nextPosition), v)
+							if d < moverRadius:
+								needCheckVertex = False
+								break
+					if needCheckVertex:
+						for l in lines:
+							if minimumDistance(l, nextPosition) < moverRadius:
+								needCheckVertex = False
+								break
+				if not needCheckVertex:
+					for l in o.getLines():
+						for r in ((m1.rect.topleft, m1.rect.topright), (m1.rect.topright, m1.rect.bottomright), (m1.rect.bottomright, m1.rect.bottomleft), (m1.rect.bottomleft, m1.rect.topleft)):
+							hit = calculateIntersectPoint(l[0], l[1], r[0], r[1])
+							if hit is not None:
+								c = True
+				if c:
+					collisions.append((m1, o))
+			# Movers against movers
+			for m2 in world.movers:
+				if m2 in world.movers:
+					if m1 != m2:
+						if (m1, m2) not in collisions and (m2, m1) not in collisions:
+							if m1.rect.colliderect(m2.rect):
+								collisions.append((m1, m2))
+	return collisions
+
+############################
+### SET UP WORLD
+
+dims = (1200, 1200)
+
+obstacles = [[(250, 150), (600, 200), (550, 350), (260, 390)],
+			 [(800, 200), (1040, 140), (1050, 160), (1025, 500), (1000, 500), (810, 310)]]
+
+mirror = map(lambda poly: map(lambda point: (dims[0]-point[0], dims[1]-point[1]), poly), obstacles)
+
+obstacles = obstacles + mirror
+
+obstacles = obstacles + [[(550, 570), (600, 550), (660, 570), (650, 630), (600, 650), (540, 630)]]
+
+
+def makeWorld(num):
+	world = GameWorld(SEED, dims, dims)
+	agent = Agent(AGENT, (600, 500), 0, SPEED, world)
+	world.setPlayerAgent(agent)
+	world.initializeTerrain(obstacles, (0, 0, 0), 4)
+	# Half moving agents, half bullets, scattered anywhere in the world (including inside obstacles)
+	for x in xrange(num - 1):
+		pos = (corerandom.uniform(0, dims[0]), corerandom.uniform(0, dims[1]))
+		if x % 2 == 0:
+			npc = Agent(NPC, pos, 0, SPEED, world)
+			npc.setNavigator(Navigator())
+			npc.moveToTarget((corerandom.uniform(0, dims[0]), corerandom.uniform(0, dims[1])))
+			world.addNPC(npc)
+		else:
+			world.addBullet(Bullet(pos, corerandom.uniform(0, 360), world))
+	return world
+
+### Times both collision tests on the same world state, then moves every mover one step without acting on collisions.
+def timeTicks(world, ticks):
+	slow = 0.0
+	fast = 0.0
+	same = True
+	for _ in xrange(ticks):
+		start = time.time()
+		expected = allPairsCollisions(world)
+		slow = slow + (time.time() - start)
+		start = time.time()
+		found = world.findCollisions()
+		fast = fast + (time.time() - start)
+		same = same and expected == found
+		for m in world.movers:
+			if isinstance(m, Agent) and m.moveTarget is not None:
+				direction = numpy.subtract(m.moveTarget, m.position)
+				magnitude = numpy.linalg.norm(direction)
+				if magnitude > m.speed[0]:
+					m.move(tuple(direction / magnitude * m.speed[0]))
+			else:
+				m.update(1)
+	return slow / ticks, fast / ticks, same
+
+
+if __name__ == '__main__':
+	ticks = 10
+	if len(sys.argv) > 1:
+		ticks = int(sys.argv[1])
+	print "movers  all-pairs(ms)  spatial-hash(ms)  speedup  identical"
+	for num in (10, 100, 1000):
+		world = makeWorld(num)
+		slow, fast, same = timeTicks(world, ticks)
+		print "%6d  %13.2f  %16.2f  %7.1fx  %s" % (num, slow*1000.0, fast*1000.0, slow/max(fast, 1e-9), same)
@@ -0,0 +1,86 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import sys, pygame, math, numpy, random, time, copy
+from pygame.locals import *
+
+from constants import *
+from utils import *
+from core import *
+from astarnavigator import *
+from flowfieldnavigator import *
+from benchnavmesh import makeWorld
+from maps import *
+
+############################
+### How to use this file
+###
+### Compares planning with flow fields (FlowFieldNavigator) against A* for a crowd of agents heading for a few goals, like the
+### minions of a MOBA team heading for the enemy towers and base. Agents start at random path nodes and each goes to one of
+### GOALS random path nodes. For each map and crowd size it reports the time to plan every agent's path with astar() and by
+### following flow fields (building the fields included), how many fields were built, and checks that the paths are as long.
+### python benchflowfield.py [comma-separated crowd sizes] [comma-separated map names]
+
+GOALS = 4
+
+def pathLength(start, path):
+	return sum([distance(a, b) for a, b in zip([start] + path, path)])
+
+### Returns (A* ms, flow field ms, fields built, queries with paths of different lengths)
+def compare(nav, queries):
+	network = nav.getUnobstructedNetwork()
+	t = time.time()
+	expected = [astar(start, goal, network)[0] for start, goal in queries]
+	flat = (time.time() - t) * 1000.0
+	# Start without any flow fields
+	nav.context.flowFields = None
+	builds = nav.context.builds
+	t = time.time()
+	found = [nav.findPath(start, goal) for start, goal in queries]
+	flow = (time.time() - t) * 1000.0
+	different = 0
+	for (start, goal), a, b in zip(queries, expected, found):
+		if abs(pathLength(start, a) - pathLength(start, b)) > EPSILON:
+			different = different + 1
+	return flat, flow, nav.context.builds - builds, different
+
+
+if __name__ == '__main__':
+	sizes = [50, 200, 800]
+	if len(sys.argv) > 1:
+		sizes = [int(n) for n in sys.argv[1].split(',')]
+	names = getMapNames() + ['gen2400']
+	if len(sys.argv) > 2:
+		names = sys.argv[2].split(',')
+	r = random.Random(SEED)
+	print "map       nodes  agents  a*(ms)  flow(ms)  speedup  fields  different"
+	for name in names:
+		m = getMap(name)
+		world = makeWorld(m['dims'], m['obstacles'])
+		nav = FlowFieldNavigator()
+		nav.agent = world.getAgent()
+		nav.setWorld(world)
+		nodes = nav.pathnodes
+		goals = [r.choice(nodes) for _ in xrange(GOALS)]
+		for size in sizes:
+			queries = [(r.choice(nodes), r.choice(goals)) for _ in xrange(size)]
+			flat, flow, builds, different = compare(nav, queries)
+			print "%-8s  %5d  %6d  %6.1f  %8.1f  %6.1fx  %6d  %9d" % (name, len(nodes), size, flat, flow, flat / max(flow, 1e-9), builds, different)
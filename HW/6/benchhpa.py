@@ -0,0 +1,101 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import sys, pygame, math, numpy, random, time, copy
+from pygame.locals import *
+
+from constants import *
+from utils import *
+from core import *
+from astarnavigator import *
+from hpanavigator import *
+from benchnavmesh import makeWorld
+from maps import *
+
+############################
+### How to use this file
+###
+### Compares hierarchical A* (ClusterHierarchy.findPath) against astar() on the path networks of the competition maps and of
+### random maps up to several times their size. For each map it reports the time to build the hierarchy, the size of the
+### abstract graph, the time per query for both, and how much longer the hierarchical paths are (mean and worst ratio).
+### Queries are between random pairs of path nodes that A* finds a path between.
+### python benchhpa.py [queries per map] [cluster size]
+
+def pathNetwork(world):
+	nav = AStarNavigator()
+	nav.agent = world.getAgent()
+	nav.createPathNetwork(world)
+	return nav.pathnodes, nav.pathnetwork
+
+def pathLength(start, path):
+	return sum([distance(a, b) for a, b in zip([start] + path, path)])
+
+### Returns (A* ms per query, HPA* ms per query, mean length ratio, worst length ratio, queries HPA* couldn't answer)
+def compare(queries, index, hierarchy):
+	flat = 0.0
+	hierarchical = 0.0
+	ratios = []
+	failed = 0
+	for start, goal in queries:
+		t = time.time()
+		expected = astar(start, goal, index)[0]
+		flat = flat + (time.time() - t)
+		t = time.time()
+		found = hierarchy.findPath(start, goal, index)
+		hierarchical = hierarchical + (time.time() - t)
+		if found is None or (len(found) > 0 and found[-1] != goal):
+			failed = failed + 1
+		else:
+			ratios.append(pathLength(start, found) / max(pathLength(start, expected), EPSILON))
+	n = max(1, len(queries))
+	return flat * 1000.0 / n, hierarchical * 1000.0 / n, sum(ratios) / max(1, len(ratios)), max(ratios + [1.0]), failed
+
+
+if __name__ == '__main__':
+	num = 200
+	if len(sys.argv) > 1:
+		num = int(sys.argv[1])
+	clusterSize = HPACLUSTERSIZE
+	if len(sys.argv) > 2:
+		clusterSize = int(sys.argv[2])
+	# (name, dimensions, obstacles); worlds are made one at a time, since each has surfaces as big as the map
+	maps = []
+	for name in getMapNames():
+		m = getMap(name)
+		maps.append((name, m['dims'], m['obstacles']))
+	r = random.Random(SEED)
+	for cells in [12, 24, 36]:
+		maps.append(('random%d' % cells, (cells * 100, cells * 100), generateObstacles(r, cells, cells, 100, 0.8, 6)))
+	print "map       size  nodes  edges  build(ms)  abstract  edges  a*(ms)  hpa*(ms)  speedup  mean len  worst len  failed"
+	for name, dims, obstacles in maps:
+		world = makeWorld(dims, obstacles)
+		nodes, network = pathNetwork(world)
+		index = PathNetworkIndex(network)
+		t = time.time()
+		hierarchy = ClusterHierarchy(nodes, network, clusterSize)
+		build = (time.time() - t) * 1000.0
+		queries = []
+		while len(queries) < num:
+			start, goal = r.choice(nodes), r.choice(nodes)
+			if start != goal and len(astar(start, goal, index)[0]) > 0:
+				queries.append((start, goal))
+		flat, hierarchical, mean, worst, failed = compare(queries, index, hierarchy)
+		print "%-8s  %4d  %5d  %5d  %9.0f  %8d  %5d  %6.2f  %8.2f  %6.1fx  %8.4f  %9.4f  %6d" % (name, world.getDimensions()[0], len(nodes), len(network), build, hierarchy.getAbstractSize()[0], hierarchy.getAbstractSize()[1], flat, hierarchical, flat / max(hierarchical, 1e-9), mean, worst, failed)
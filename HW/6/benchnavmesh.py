@@ -0,0 +1,168 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import sys, pygame, math, numpy, random, time, copy
+from pygame.locals import *
+
+from constants import *
+from utils import *
+from core import *
+from triangulation import *
+from maps import *
+
+############################
+### How to use this file
+###
+### Compares navMeshPolygons() against the old nav mesh builder (every triple of points, then merging polygons pairwise)
+### on the competition maps and on random maps with more and more obstacle points.
+### For each map it reports the number of polygons, whether they are all convex, and how much of the free space they cover
+### (the same convexity and coverage measures as the homework 3 autograder).
+### The old builder is only run on maps with at most a given number of points; it takes minutes on a few hundred.
+### python benchnavmesh.py [max points for the old builder]
+
+############################
+### The old nav mesh builder
+
+def oldNavMeshPolygons(world):
+	points = world.getPoints()
+	lines = world.getLines()
+	obstacles = [o.getPoints() for o in world.getObstacles()]
+	newLines = []
+	polys = []
+	# Every triangle whose edges are obstacle lines or clear of every line so far
+	for first in points:
+		for second in points:
+			if second is first: continue
+			if rayTraceWorldNoEndPoints(first, second, lines + newLines):
+				if (first, second) not in lines + newLines and (second, first) not in lines + newLines: continue
+			for third in points:
+				if third in (first, second): continue
+				if rayTraceWorldNoEndPoints(second, third, lines + newLines):
+					if (second, third) not in lines + newLines and (third, second) not in lines + newLines: continue
+				if rayTraceWorldNoEndPoints(third, first, lines + newLines):
+					if (first, third) not in lines + newLines and (third, first) not in lines + newLines: continue
+				newLines.append((first, second))
+				newLines.append((second, third))
+				newLines.append((third, first))
+				polys.append([first, second, third])
+	# Remove obstacles and repeated triangles
+	remove = []
+	for i in range(len(polys)):
+		if polys[i] in remove: continue
+		a, b, c = polys[i]
+		triangles = [[a, b, c], [a, c, b], [b, a, c], [b, c, a], [c, a, b], [c, b, a]]
+		for obstacle in obstacles:
+			if obstacle in triangles:
+				remove.append(polys[i])
+				break
+		for j in range(i + 1, len(polys)):
+			if polys[j] in triangles: remove.append(polys[j])
+	polys = [p for p in polys if p not in remove]
+	# Remove triangles that contain or cut into obstacles
+	remove = []
+	for polygon in polys:
+		for obstacle in obstacles:
+			for point in obstacle:
+				if pointInsidePolygonPoints(point, polygon) and not pointOnPolygon(point, polygon):
+					remove.append(polygon)
+					break
+			for i in range(len(polygon)):
+				midpoint = ((polygon[i][0] + polygon[(i + 1) % len(polygon)][0]) / 2, (polygon[i][1] + polygon[(i + 1) % len(polygon)][1]) / 2)
+				if pointInsidePolygonPoints(midpoint, obstacle) and not pointOnPolygon(midpoint, obstacle):
+					remove.append(polygon)
+					break
+	newPolys = [p for p in polys if p not in remove]
+	# Merge adjacent polygons while the result is convex
+	i = 0
+	while i < len(newPolys):
+		j = 0
+		while j < len(newPolys):
+			if newPolys[j] is newPolys[i] or not polygonsAdjacent(newPolys[i], newPolys[j]):
+				j += 1
+				continue
+			shared = polygonsAdjacent(newPolys[i], newPolys[j])
+			newPolygon = newPolys[i] + newPolys[j]
+			for point in shared: newPolygon.remove(point)
+			center = ((shared[0][0] + shared[1][0]) / 2, (shared[0][1] + shared[1][1]) / 2)
+			newPolygon = [p for a, p in sorted([(math.atan2(p[1] - center[1], p[0] - center[0]), p) for p in newPolygon], key = lambda x: x[0])]
+			if isConvex(newPolygon):
+				newPolys.append(newPolygon)
+				newPolys.remove(newPolys[i])
+				newPolys.remove(newPolys[j - 1])
+				i -= 1
+				break
+			j += 1
+		i += 1
+	return newPolys
+
+############################
+### Maps
+###
+### The random maps are made by generateObstacles (maps.py)
+
+def polygonArea(poly):
+	area = 0.0
+	for i in xrange(len(poly)):
+		area = area + poly[i - 1][0] * poly[i][1] - poly[i][0] * poly[i - 1][1]
+	return abs(area / 2.0)
+
+def makeWorld(dims, obstacles):
+	world = GameWorld(SEED, dims, dims)
+	agent = GhostAgent(AGENT, (0, 0), 0, SPEED, world)
+	world.setPlayerAgent(agent)
+	world.initializeTerrain(obstacles, (0, 0, 0), 4)
+	return world
+
+############################
+### Measuring
+
+### Returns (milliseconds, number of polygons, all convex, coverage)
+def measure(builder, world):
+	start = time.time()
+	polys = builder(world)
+	elapsed = (time.time() - start) * 1000.0
+	dims = world.getDimensions()
+	free = dims[0] * dims[1] - sum([polygonArea(o.getPoints()) for o in world.getObstacles()])
+	covered = sum([polygonArea(p) for p in polys])
+	coverage = 1.0 - abs(1.0 - covered / free)
+	return elapsed, len(polys), all([isConvex(p) for p in polys]), coverage
+
+
+if __name__ == '__main__':
+	oldLimit = 40
+	if len(sys.argv) > 1:
+		oldLimit = int(sys.argv[1])
+	worlds = []
+	for name in getMapNames():
+		m = getMap(name)
+		worlds.append((name, makeWorld(m['dims'], m['obstacles'])))
+	r = random.Random(SEED)
+	for cells in [2, 3, 5, 8, 12, 16, 24, 32]:
+		worlds.append(('random%d' % cells, makeWorld((cells * 100, cells * 100), generateObstacles(r, cells, cells, 100, 0.8, 8))))
+	print "map       points  old(ms)  polys  convex  coverage  new(ms)  polys  convex  coverage"
+	for name, world in worlds:
+		points = len(world.getPoints())
+		new = measure(navMeshPolygons, world)
+		if points <= oldLimit:
+			old = "%7.0f  %5d  %-6s  %8.3f" % measure(oldNavMeshPolygons, world)
+		else:
+			old = "%7s  %5s  %-6s  %8s" % ('-', '-', '-', '-')
+		print "%-8s  %6d  %s  %7.0f  %5d  %-6s  %8.3f" % ((name, points, old) + new)
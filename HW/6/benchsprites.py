@@ -0,0 +1,82 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import sys, pygame, math, numpy, random, time, copy
+from pygame.locals import *
+
+from constants import *
+from utils import *
+from core import *
+from spritecache import *
+
+############################
+### How to use this file
+###
+### Measures how many bullets can be spawned (and turned) per second with and without the sprite cache,
+### and checks that cached rects are the same as the rects of uncached rotations.
+### python benchsprites.py [spawns]
+
+############################
+### Uncached sprite setup (what Mover used to do)
+
+def uncachedSprite(image, position, angle):
+	img, rect = load_image(image, -1)
+	original = img.copy()
+	rotated = pygame.transform.rotate(original, angle)
+	rect = rotated.get_rect()
+	rect.center = position
+	return rotated, rect
+
+def cachedSprite(image, position, angle):
+	img, rect = loadCachedImage(image, -1)
+	rotated = rotations.rotate(img, angle)
+	rect = pygame.Rect((0, 0), rotatedSize(img.get_width(), img.get_height(), angle))
+	rect.center = position
+	return rotated, rect
+
+def timeSpawns(spawn, angles):
+	start = time.time()
+	for angle in angles:
+		spawn(SMALLBULLET, (600, 600), angle)
+	return time.time() - start
+
+
+if __name__ == '__main__':
+	num = 5000
+	if len(sys.argv) > 1:
+		num = int(sys.argv[1])
+	pygame.init()
+	pygame.display.set_mode((1, 1))
+	r = random.Random(SEED)
+	angles = [r.uniform(-180, 360) for _ in xrange(num)]
+	same = all([uncachedSprite(image, (600, 600), a)[1] == cachedSprite(image, (600, 600), a)[1] for image in (SMALLBULLET, AGENT, NPC, ELITE) for a in angles[:1000]])
+	rotations.clear()
+	slow = timeSpawns(uncachedSprite, angles)
+	fast = timeSpawns(cachedSprite, angles)
+	start = time.time()
+	for angle in angles:
+		Bullet((600, 600), angle, None)
+	bullets = time.time() - start
+	print "sprite setups  uncached/s  cached/s  speedup  same rects"
+	print "%12d  %10.0f  %8.0f  %6.1fx  %s" % (num, num / max(slow, 1e-9), num / max(fast, 1e-9), slow / max(fast, 1e-9), same)
+	print "Bullet() spawns/s: %.0f" % (num / max(bullets, 1e-9))
+	print "image cache: %d images, %d bytes" % (len(images), imageCacheBytes())
+	print "rotation cache:", rotations.getStats()
@@ -0,0 +1,184 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import os
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+
+import sys, pygame, math, numpy, random, time, copy, json, platform, argparse
+from pygame.locals import *
+
+from constants import *
+from utils import *
+from core import *
+from triangulation import *
+from mycreatepathnetwork import *
+from astarnavigator import *
+from visibility import *
+from maps import *
+
+############################
+### How to use this file
+###
+### Times the parts of the game that grow with the map on the competition maps and the generated maps (see maps.py):
+### nav mesh construction, path network construction, A* between random pairs of path nodes, lines of sight between random
+### free points, finding collisions among agents and bullets moving around the map, and the free locations agents are sent to.
+### Prints a table and writes every number to a JSON report, to compare against the report of an earlier version.
+### Everything random is seeded, so two runs do the same work.
+### python benchsuite.py [--report file (default benchsuite.json)] [--maps comma-separated map names (default all)]
+
+### Work done on every map
+QUERIES = 200
+VIEWERS = 50
+TARGETS = 20
+MOVERS = 200
+TICKS = 20
+
+def makeWorld(m):
+	world = GameWorld(SEED, m['dims'], m['dims'])
+	agent = GhostAgent(m['player'], (m['dims'][0] / 2, m['dims'][1] / 2), 0, SPEED, world)
+	world.setPlayerAgent(agent)
+	world.initializeTerrain(m['obstacles'], (0, 0, 0), 4)
+	return world
+
+### A random point of the world that isn't inside an obstacle
+def freePoint(r, world):
+	dims = world.getDimensions()
+	while True:
+		point = (r.uniform(0, dims[0]), r.uniform(0, dims[1]))
+		if not insideObstacle(point, world.getObstacles()):
+			return point
+
+def milliseconds(start):
+	return (time.time() - start) * 1000.0
+
+############################
+### Benchmarks. Each returns a dictionary for the report.
+
+def benchNavMesh(world):
+	start = time.time()
+	polys = navMeshPolygons(world)
+	return {'ms': milliseconds(start), 'polygons': len(polys)}
+
+def benchPathNetwork(world):
+	start = time.time()
+	nodes, edges, polys = myCreatePathNetwork(world, world.getAgent())
+	return {'ms': milliseconds(start), 'nodes': len(nodes), 'edges': len(edges)}, nodes, edges
+
+def benchAStar(r, nodes, edges):
+	start = time.time()
+	index = PathNetworkIndex(edges)
+	indexTime = milliseconds(start)
+	queries = [(r.choice(nodes), r.choice(nodes)) for _ in xrange(QUERIES)]
+	expanded = 0
+	unreachable = 0
+	start = time.time()
+	for init, goal in queries:
+		path, closed = astar(init, goal, index)
+		expanded = expanded + len(closed)
+		if init != goal and len(path) == 0:
+			unreachable = unreachable + 1
+	elapsed = milliseconds(start)
+	return {'indexMs': indexTime, 'queries': len(queries), 'msPerQuery': elapsed / len(queries), 'expandedPerQuery': expanded / float(len(queries)), 'unreachable': unreachable}
+
+### Lines of sight from each viewer to the same targets, on an empty visibility cache
+def benchVisibility(r, world):
+	viewers = [freePoint(r, world) for _ in xrange(VIEWERS)]
+	targets = [freePoint(r, world) for _ in xrange(TARGETS)]
+	world.visibility = VisibilityCache()
+	start = time.time()
+	clear = 0
+	for viewer in viewers:
+		clear = clear + sum(world.linesOfSight(viewer, targets))
+	elapsed = milliseconds(start)
+	rays = len(viewers) * len(targets)
+	return {'rays': rays, 'msPerRay': elapsed / rays, 'clear': clear}
+
+### Half agents walking to random free points, half bullets, starting at random free points. Times findCollisions every tick;
+### movers are moved without acting on the collisions, so every run sees the same states.
+def benchCollisions(r, world):
+	for x in xrange(MOVERS):
+		pos = freePoint(r, world)
+		if x % 2 == 0:
+			npc = Agent(NPC, pos, 0, SPEED, world)
+			npc.setNavigator(Navigator())
+			npc.moveToTarget(freePoint(r, world))
+			world.addNPC(npc)
+		else:
+			world.addBullet(Bullet(pos, r.uniform(0, 360), world))
+	elapsed = 0.0
+	collisions = 0
+	for _ in xrange(TICKS):
+		start = time.time()
+		collisions = collisions + len(world.findCollisions())
+		elapsed = elapsed + milliseconds(start)
+		for m in world.movers:
+			if isinstance(m, Agent) and m.moveTarget is not None:
+				direction = numpy.subtract(m.moveTarget, m.position)
+				magnitude = numpy.linalg.norm(direction)
+				if magnitude > m.speed[0]:
+					m.move(tuple(direction / magnitude * m.speed[0]))
+			else:
+				m.update(1)
+	return {'movers': len(world.movers), 'ticks': TICKS, 'msPerTick': elapsed / TICKS, 'collisions': collisions}
+
+### The free locations of agents the size of the player, as MOBAAgent.start asks for them
+def benchFreeLocations(world):
+	start = time.time()
+	index = world.getFreeLocationIndex(world.getAgent().getRadius())
+	return {'ms': milliseconds(start), 'locations': len(index)}
+
+def benchMap(name):
+	m = getMap(name)
+	r = random.Random(SEED)
+	world = makeWorld(m)
+	report = {'dims': list(m['dims']), 'obstacles': len(m['obstacles']), 'points': len(world.getPoints())}
+	report['navmesh'] = benchNavMesh(world)
+	report['pathnetwork'], nodes, edges = benchPathNetwork(world)
+	report['astar'] = benchAStar(r, nodes, edges)
+	report['visibility'] = benchVisibility(r, world)
+	report['collisions'] = benchCollisions(r, world)
+	report['freelocations'] = benchFreeLocations(world)
+	return report
+
+
+def main(argv):
+	allNames = getMapNames() + getGeneratedMapNames()
+	parser = argparse.ArgumentParser(description = 'Time the parts of the game that grow with the map and write a JSON report.')
+	parser.add_argument('--report', default = 'benchsuite.json', help = 'report file name (default benchsuite.json)')
+	parser.add_argument('--maps', default = ','.join(allNames), help = 'comma separated map names (default: all of ' + ', '.join(allNames) + ')')
+	args = parser.parse_args(argv)
+	names = args.maps.split(',')
+	for name in names:
+		if name not in allNames:
+			parser.error('unknown map ' + name)
+	report = {'seed': SEED, 'python': platform.python_version(), 'numpy': numpy.__version__, 'platform': platform.platform(),
+		'time': time.strftime('%Y-%m-%d %H:%M:%S'), 'settings': {'queries': QUERIES, 'viewers': VIEWERS, 'targets': TARGETS, 'movers': MOVERS, 'ticks': TICKS},
+		'maps': {}}
+	print "map       size  obstacles  navmesh(ms)  polys  network(ms)  nodes  a*(ms)  ray(ms)  collisions(ms/tick)  free(ms)"
+	for name in names:
+		result = benchMap(name)
+		report['maps'][name] = result
+		print "%-8s  %4d  %9d  %11.1f  %5d  %11.1f  %5d  %6.2f  %7.3f  %19.2f  %8.1f" % (name, result['dims'][0], result['obstacles'], result['navmesh']['ms'], result['navmesh']['polygons'], result['pathnetwork']['ms'], result['pathnetwork']['nodes'], result['astar']['msPerQuery'], result['visibility']['msPerRay'], result['collisions']['msPerTick'], result['freelocations']['ms'])
+	out = open(args.report, 'w')
+	json.dump(report, out, indent = 1, sort_keys = True)
+	out.close()
+	print "Report written to", args.report
+
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
@@ -20,25 +20,27 @@ import sys, pygame, math, numpy, random, time, copy
 from pygame.locals import *
 
 from astarnavigator import *
+from apspnavigator import *
+from hpanavigator import *
+from flowfieldnavigator import *
 
 ############################
 ### HELPERS
 
-'''
-def cloneAPSPNavigator(nav):
-	newnav = APSPNavigator()
-	newnav.world = nav.world
-	newnav.pathnodes = nav.pathnodes
-	newnav.pathnetwork = nav.pathnetwork
-	newnav.next = nav.next
-	newnav.dist = nav.dist
-	return newnav
-'''
-
+### A clone shares the navigation context of the navigator it is cloned from (the path network, nav mesh, their indexes and
+### any shortest path tables, cluster hierarchy or flow fields), so cloning only creates the per-agent state
 def cloneAStarNavigator(nav):
 	newnav = nav.__class__()
 	newnav.world = nav.world
-	newnav.pathnodes = nav.pathnodes
-	newnav.pathnetwork = nav.pathnetwork
-	newnav.navmesh = nav.navmesh
+	newnav.pointLocation = nav.pointLocation
+	newnav.shareContext(nav)
 	return newnav
+
+def cloneAPSPNavigator(nav):
+	return cloneAStarNavigator(nav)
+
+def cloneHPANavigator(nav):
+	return cloneAStarNavigator(nav)
+
+def cloneFlowFieldNavigator(nav):
+	return cloneAStarNavigator(nav)
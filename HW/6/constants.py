@@ -19,6 +19,8 @@
 SCREEN = [1024, 768]
 WORLD = [1024, 768]
 TICK = 60
+# Milliseconds per tick passed to update() when running headless
+HEADLESSDELTA = 1000 / TICK
 
 SPEED = (5, 5)
 NUMOBSTACLES = 3
@@ -27,6 +29,32 @@ OBSTACLESIGMA = 50
 OBSTACLEMIN = 25
 OBSTACLEPOINTS = 7
 OBSTACLEGRIDSIZE = 50
+COLLISIONCELLSIZE = 64
+VISIBILITYCACHESIZE = 200000
+# Rotated sprites are cached every ROTATIONSTEP degrees, using at most ROTATIONCACHEBYTES
+ROTATIONSTEP = 1
+ROTATIONCACHEBYTES = 32 * 1024 * 1024
+NAVMESHCACHE = True
+# Relative to the directory of navmeshcache.py
+NAVMESHCACHEDIR = "navmeshcache"
+# Find the path nodes to start and end at among the nodes of the nav mesh polygon holding the point, not among every path node
+NAVMESHPOINTLOCATION = True
+# Pull A* paths taut through the nav mesh polygons they cross, keeping the agent's radius away from obstacle corners
+FUNNELSMOOTHING = True
+# APSPNavigator uses Floyd-Warshall on path networks with at most this many nodes and Dijkstra from every node on larger ones
+APSPDIJKSTRANODES = 400
+# Processes for APSPNavigator's Dijkstra runs (0: one per CPU, except on Windows)
+APSPWORKERS = 0
+# Node-to-node paths AStarNavigator remembers per path network (least recently used are dropped)
+PATHCACHESIZE = 1000
+# Plan A* paths a few nodes every tick on the world's PathScheduler instead of all at once inside the agent's update
+ASYNCPATHPLANNING = True
+# Nodes the PathScheduler expands per tick, over every agent waiting for a path
+PATHEXPANSIONBUDGET = 100
+# Width and height of the square clusters HPANavigator cuts the path network into
+HPACLUSTERSIZE = 600
+# Goals FlowFieldNavigator keeps flow fields for per path network (least recently used are dropped)
+FLOWFIELDCOUNT = 16
 NUMRESOURCES = 20
 SEED = 2
 HITPOINTS = 25
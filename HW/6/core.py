@@ -16,11 +16,17 @@
  * limitations under the License.
 '''
 
-import sys, pygame, math, numpy, random, time, copy
+import sys, os, pygame, math, numpy, random, time, copy, collections
 from pygame.locals import * 
 
 from constants import *
 from utils import *
+from spatialhash import *
+from navmeshgraph import *
+from navmeshcache import *
+from visibility import *
+from freelocations import *
+from spritecache import *
 
 
 ###########################
@@ -52,7 +58,7 @@ class Mover(pygame.sprite.Sprite, Thing):
 		
 	### rect: the rectangle
 	### image: the image, rotated to orientation
-	### originalImage: the image un-rotated
+	### originalImage: the image un-rotated (shared with other Movers using the same image; don't draw on it)
 	### orientation: direction agent is facing in degrees (0 = to the right)
 	### speed: how fast the agent moves (horizontal, vertical)
 	### maxradius: the worst-case scenario for the bounding circle, accounting for rotation changing the dimensions of the agent's bounding box.
@@ -63,8 +69,8 @@ class Mover(pygame.sprite.Sprite, Thing):
 	
 	def __init__(self, image, position, orientation, speed, world):
 		pygame.sprite.Sprite.__init__(self) # call sprite initializer
-		self.image, self.rect = load_image(image, -1)
-		self.originalImage = self.image.copy()
+		self.image, self.rect = loadCachedImage(image, -1)
+		self.originalImage = self.image
 		self.orientation = orientation
 		self.world = world
 		self.speed = speed
@@ -86,6 +92,8 @@ class Mover(pygame.sprite.Sprite, Thing):
 	def move(self, offset):
 		self.position = tuple(map(lambda x, y: x + y, self.position, offset))
 		self.rect.center = self.position
+		if self.world is not None:
+			self.world.updateMover(self)
 	
 	### Tells the agent to face a point
 	def turnToFace(self, pos):
@@ -100,11 +108,14 @@ class Mover(pygame.sprite.Sprite, Thing):
 			#unwind
 			angle = 360+angle
 		self.orientation = angle
-		rot_img = pygame.transform.rotate(self.originalImage, self.orientation)
-		img_rect = rot_img.get_rect()
+		rot_img = rotations.rotate(self.originalImage, self.orientation)
+		# Sized for the exact angle, even though the cached image may be rounded to a nearby angle
+		img_rect = pygame.Rect((0, 0), rotatedSize(self.originalImage.get_width(), self.originalImage.get_height(), self.orientation))
 		img_rect.center = self.position
 		self.image = rot_img
 		self.rect = img_rect
+		if self.world is not None:
+			self.world.updateMover(self)
 	
 	### Update the agent every tick. Primarily does movement
 	def update(self, delta):
@@ -247,7 +258,8 @@ class Agent(Mover):
 	def update(self, delta):
 		Mover.update(self, delta)
 		if self.moveTarget is not None:
-			drawCross(self.world.background, self.moveTarget, (0, 0, 0), 5)
+			if not self.world.headless:
+				drawCross(self.world.background, self.moveTarget, (0, 0, 0), 5)
 			direction = [m - n for m,n in zip(self.moveTarget,self.position)]
 			# Figure out distance to moveTarget
 #			mag = reduce(lambda x, y: (x**2)+(y**2), direction)**0.5 
@@ -531,19 +543,104 @@ class Navigator(object):
 
 
 #####################
-### PathNetworkNavigator
+### NavigationContext
 ###
-### Abstract Navigator class that uses a network of path nodes.
+### What a path network navigator knows about a map that doesn't depend on its agent: the path network, the nav mesh and the
+### indexes built from them. The world keeps one context for each kind of navigator (see GameWorld.getNavigationContext) and
+### every navigator of that kind on the map uses it, so the network and its indexes are built once however many agents there are.
+### Navigators only keep per-agent state (path, source, destination).
+### A context is shared once the world or a clone has it. A navigator that replaces the path network of a shared context gets
+### its own copy of the context first (see PathNetworkNavigator.setContextValue), so the other navigators never see the change.
 
-class PathNetworkNavigator(Navigator):
+class NavigationContext(object):
 
 	### pathnodes: the path nodes
 	### pathnetwork: the edges between path nodes
+	### navmesh: the polygons making up the nav mesh
+	### navmeshGraph: NavMeshGraph of the navmesh polygons (built when first asked for)
+	### polygonNodes: for each navmesh polygon, the path nodes inside it or on its edges (built when first asked for)
+	### polygonNodesFor: the (navmeshGraph, pathnodes) polygonNodes was built from
+	### blockingLines: the world lines that aren't nav mesh edges (e.g., gates)
+	### blockingLinesFor: the world lines blockingLines was computed from
+	### shared: True once more than one navigator may be using the context
 
 	def __init__(self):
-		Navigator.__init__(self)
 		self.pathnodes = None
 		self.pathnetwork = None
+		self.navmesh = None
+		self.navmeshGraph = None
+		self.polygonNodes = None
+		self.polygonNodesFor = None
+		self.blockingLines = None
+		self.blockingLinesFor = None
+		self.shared = False
+
+	### An unshared copy. The indexes are shared with this context until the copy rebuilds them, which it does when what they
+	### were built from is replaced.
+	def copy(self):
+		context = copy.copy(self)
+		context.shared = False
+		return context
+
+	### The nav mesh polygons with their neighbors and shared edges. Rebuilt if the navmesh polygons were replaced.
+	def getNavMeshGraph(self):
+		if self.navmesh is None:
+			return None
+		if self.navmeshGraph is None or self.navmeshGraph.polygons is not self.navmesh:
+			self.navmeshGraph = NavMeshGraph(self.navmesh)
+		return self.navmeshGraph
+
+	### For each navmesh polygon, the path nodes inside it or on its edges. Rebuilt if the path nodes or polygons were replaced.
+	def getPolygonNodes(self):
+		graph = self.getNavMeshGraph()
+		if graph is None or self.pathnodes is None:
+			return None
+		if self.polygonNodes is None or self.polygonNodesFor[0] is not graph or self.polygonNodesFor[1] is not self.pathnodes:
+			self.polygonNodes = graph.pointsByPolygon(self.pathnodes)
+			self.polygonNodesFor = (graph, self.pathnodes)
+		return self.polygonNodes
+
+	### The lines of worldLines (a list or LineArray) that aren't nav mesh edges, such as gates. Kept until worldLines changes.
+	def getBlockingLines(self, worldLines):
+		if self.blockingLines is None or self.blockingLinesFor is not worldLines:
+			lines = worldLines.getLines() if isinstance(worldLines, LineArray) else worldLines
+			graph = self.getNavMeshGraph()
+			self.blockingLines = [l for l in lines if graph is None or not graph.isEdge(l[0], l[1])]
+			self.blockingLinesFor = worldLines
+		return self.blockingLines
+
+#####################
+### PathNetworkNavigator
+###
+### Abstract Navigator class that uses a network of path nodes.
+
+class PathNetworkNavigator(Navigator):
+
+	### context: the NavigationContext holding the path network
+	### pathnodes: the path nodes (kept in the context)
+	### pathnetwork: the edges between path nodes (kept in the context)
+
+	def __init__(self):
+		Navigator.__init__(self)
+		self.context = self.createContext()
+
+	pathnodes = property(lambda self: self.context.pathnodes, lambda self, value: self.setContextValue('pathnodes', value))
+	pathnetwork = property(lambda self: self.context.pathnetwork, lambda self, value: self.setContextValue('pathnetwork', value))
+
+	### A new, empty context of the kind this navigator uses
+	def createContext(self):
+		return NavigationContext()
+
+	### Sets a value in the context, first copying the context if other navigators are using it
+	def setContextValue(self, name, value):
+		if self.context.shared:
+			self.context = self.context.copy()
+		setattr(self.context, name, value)
+
+	### Use the same context as another navigator
+	def shareContext(self, nav):
+		nav.context.shared = True
+		self.context = nav.context
 
 	def drawPathNetwork(self, surface):
 		if self.pathnetwork is not None:
@@ -557,24 +654,43 @@ class PathNetworkNavigator(Navigator):
 
 class NavMeshNavigator(PathNetworkNavigator):
 	
-	### pathnodes: the path nodes
-	### pathnetwork: the edges between path nodes
-	### navmesh: the polygons making up the nav mesh
+	### pathnodes: the path nodes (kept in the context)
+	### pathnetwork: the edges between path nodes (kept in the context)
+	### navmesh: the polygons making up the nav mesh (kept in the context)
+	### pointLocation: if True, findClosestNode only looks at the path nodes of the polygon holding the point
 	
 	def __init__(self):
 		PathNetworkNavigator.__init__(self)
-		self.navmesh = None
-	
+		self.pointLocation = NAVMESHPOINTLOCATION
+
+	navmesh = property(lambda self: self.context.navmesh, lambda self, value: self.setContextValue('navmesh', value))
+
 	### Set the world object
 	### self: the navigator object
 	### world: the world object
 	def setWorld(self, world):
 		Navigator.setWorld(self, world)
-		# Create the path network
-		self.createPathNetwork(world)
+		# Use the world's context for this kind of navigator, or create the path network (unless it was already built for this
+		# terrain) and give the world the new context
+		key = self.getContextKey()
+		context = world.getNavigationContext(key)
+		if context is not None:
+			self.context = context
+		else:
+			self.context = self.createContext()
+			if not NAVMESHCACHE or not loadPathNetwork(self, world):
+				self.createPathNetwork(world)
+				if NAVMESHCACHE:
+					savePathNetwork(self, world)
+			world.setNavigationContext(key, self.context)
 		# Draw the world
-		self.drawNavMesh(self.world.debug)
-		self.drawPathNetwork(self.world.debug)
+		if not self.world.headless:
+			self.drawNavMesh(self.world.debug)
+			self.drawPathNetwork(self.world.debug)
+
+	### Navigators with the same key build the same path network on the same terrain: the class and the agent's size
+	def getContextKey(self):
+		return (self.__class__, self.agent.getMaxRadius() if self.agent is not None else None)
 	
 	### Create the path node network and pre-compute all shortest paths along the network
 	### self: the navigator object
@@ -582,6 +698,56 @@ class NavMeshNavigator(PathNetworkNavigator):
 	def createPathNetwork(self, world):
 		return None
 
+	### Numpy arrays to store in the nav mesh cache with the path network, by name
+	def getCacheTables(self):
+		return {}
+
+	### Takes the arrays stored in the nav mesh cache with the path network.
+	### Returns False if they can't be used, in which case the path network is built again.
+	def setCacheTables(self, tables):
+		return True
+
+	### The nav mesh polygons with their neighbors and shared edges. Rebuilt if the navmesh polygons were replaced.
+	def getNavMeshGraph(self):
+		return self.context.getNavMeshGraph()
+
+	### The index (into navmesh) of the polygon containing point, or None if point isn't on the nav mesh
+	def findPolygon(self, point):
+		graph = self.getNavMeshGraph()
+		if graph is None:
+			return None
+		return graph.findPolygon(point)
+
+	### For each navmesh polygon, the path nodes inside it or on its edges. Rebuilt if the path nodes or polygons were replaced.
+	def getPolygonNodes(self):
+		return self.context.getPolygonNodes()
+
+	### The lines of worldLines (a list or LineArray) that aren't nav mesh edges, such as gates. Kept until worldLines changes.
+	def getBlockingLines(self, worldLines):
+		return self.context.getBlockingLines(worldLines)
+
+	### The path node closest to point that is unobstructed by worldLines.
+	### With pointLocation, only the nodes of the nav mesh polygon holding point are considered. The polygon is convex and has no
+	### obstacles in it, so only the world lines that aren't nav mesh edges (like gates) and cross the polygon's bounding box are
+	### ray cast. Every path node is considered if point isn't on the nav mesh or none of its polygon's nodes can be reached.
+	def findClosestNode(self, point, worldLines):
+		if self.pointLocation and self.getNavMeshGraph() is not None:
+			polygon = self.findPolygon(point)
+			if polygon is not None:
+				box = self.getNavMeshGraph().boxes[polygon]
+				lines = [l for l in self.getBlockingLines(worldLines) if boxesOverlap(lineBox(l, 2*EPSILON), box)]
+				best = None
+				dist = INFINITY
+				for node in self.getPolygonNodes()[polygon]:
+					if len(lines) == 0 or rayTraceWorld(point, node, lines) == None:
+						d = distance(point, node)
+						if best == None or d < dist:
+							best = node
+							dist = d
+				if best is not None:
+					return best
+		return findClosestUnobstructed(point, self.pathnodes, worldLines)
+
 	def drawNavMesh(self, surface):
 		if self.navmesh is not None:
 			for p in self.navmesh:
@@ -589,6 +755,125 @@ class NavMeshNavigator(PathNetworkNavigator):
 
 
 
+#####################
+### PathRequest
+###
+### A path search waiting on the world's PathScheduler, with the functions to call when it is done.
+
+class PathRequest(object):
+
+	### search: the resumable search. search.step(budget) expands at most budget nodes and returns how many it expanded;
+	###   search.done is True once it has finished.
+	### key: requests with the same key (not None) would find the same path, so they are merged into one search
+	### callbacks: functions called with the request when the search is done. A request nobody waits for anymore is dropped.
+	### submitted: the scheduler tick the request was submitted on
+	### finished: the scheduler tick the search finished on (None until then)
+
+	def __init__(self, search, callback, key = None):
+		self.search = search
+		self.key = key
+		self.callbacks = [callback]
+		self.submitted = None
+		self.finished = None
+
+	def addCallback(self, callback):
+		if callback not in self.callbacks:
+			self.callbacks.append(callback)
+
+	def removeCallback(self, callback):
+		if callback in self.callbacks:
+			self.callbacks.remove(callback)
+
+	def isDone(self):
+		return self.finished is not None
+
+#####################
+### PathScheduler
+###
+### Plans paths a few nodes at a time, so that many agents asking for paths on the same tick (e.g., a wave of minions spawning,
+### or gates moving) don't all search on that tick. Every tick the scheduler expands at most budget nodes, oldest request first;
+### a request's search picks up where it left off on the next tick. Agents get their path on a later tick, through a callback.
+
+class PathScheduler(object):
+
+	### requests: the requests not done yet, oldest first
+	### pending: dictionary from key to the request in requests with that key
+	### budget: nodes expanded per tick, over all requests
+	### ticks: number of updates
+	### completed, expanded: requests finished and nodes expanded
+	### totalLatency, maxLatency: ticks from submitting a request to finishing it, over the completed requests
+	### lastTime, totalTime, maxTime: seconds spent searching in the last update, in every update, and in the slowest one
+
+	def __init__(self, budget = PATHEXPANSIONBUDGET):
+		self.requests = collections.deque()
+		self.pending = {}
+		self.budget = budget
+		self.ticks = 0
+		self.completed = 0
+		self.expanded = 0
+		self.totalLatency = 0
+		self.maxLatency = 0
+		self.lastTime = 0.0
+		self.totalTime = 0.0
+		self.maxTime = 0.0
+
+	### Add request to the queue. If a request with the same key is already waiting, request's callbacks are added to that one
+	### instead. Returns the request that will call back.
+	def submit(self, request):
+		if request.key is not None and request.key in self.pending:
+			existing = self.pending[request.key]
+			for callback in request.callbacks:
+				existing.addCallback(callback)
+			return existing
+		request.submitted = self.ticks
+		self.requests.append(request)
+		if request.key is not None:
+			self.pending[request.key] = request
+		return request
+
+	### callback no longer wants to hear about request
+	def cancel(self, request, callback):
+		request.removeCallback(callback)
+
+	def getQueueLength(self):
+		return len(self.requests)
+
+	### Run the searches at the front of the queue for this tick's budget
+	def update(self, delta):
+		self.ticks = self.ticks + 1
+		start = time.time()
+		budget = self.budget
+		while len(self.requests) > 0 and budget > 0:
+			request = self.requests[0]
+			if len(request.callbacks) > 0 and not request.search.done:
+				expanded = request.search.step(budget)
+				self.expanded = self.expanded + expanded
+				budget = budget - max(1, expanded)
+			if len(request.callbacks) == 0 or request.search.done:
+				self.requests.popleft()
+				if self.pending.get(request.key) is request:
+					del self.pending[request.key]
+				if len(request.callbacks) > 0:
+					self.finish(request)
+		self.lastTime = time.time() - start
+		self.totalTime = self.totalTime + self.lastTime
+		self.maxTime = max(self.maxTime, self.lastTime)
+
+	def finish(self, request):
+		request.finished = self.ticks
+		latency = request.finished - request.submitted
+		self.completed = self.completed + 1
+		self.totalLatency = self.totalLatency + latency
+		self.maxLatency = max(self.maxLatency, latency)
+		for callback in list(request.callbacks):
+			callback(request)
+
+	def getStats(self):
+		return {'queue': len(self.requests), 'completed': self.completed, 'expanded': self.expanded,
+			'meanLatency': self.totalLatency / float(max(1, self.completed)), 'maxLatency': self.maxLatency,
+			'lastTime': self.lastTime, 'meanTime': self.totalTime / max(1, self.ticks), 'maxTime': self.maxTime}
+
+
 #####################
 ### Blocker
 ###
@@ -734,8 +1019,9 @@ class ManualObstacle(Obstacle):
 	### points: points of the polygon relative to center
 	### pos: center of polygon
 	### lines: lines of polygon relative to center
-	### surface: the surface
+	### surface: the surface (made when the obstacle is first drawn)
 	### rect: the rectangle of the surface
+	### color, linewidth: how the lines are drawn on the surface
 	### sprites: the sprite group for all decorations (redundant with self.decorations, but just easier this way)
 	### decorations: the decorations
 		
@@ -748,12 +1034,11 @@ class ManualObstacle(Obstacle):
 		Obstacle.__init__(self)
 		minpt = ( min(map(lambda p: p[0], points)), min(map(lambda p: p[1], points)) )
 		maxpt = ( max(map(lambda p: p[0], points)), max(map(lambda p: p[1], points)) )
-		# create surface
-		s = pygame.Surface((maxpt[0]+linewidth, maxpt[1]+linewidth), pygame.SRCALPHA, 32)
-		s = s.convert_alpha()
-		pygame.draw.lines(s, color, True, points, linewidth)
-		self.surface = s
-		self.rect = s.get_rect()
+		# The surface covers the map from (0, 0) to the obstacle, so it is only made if the obstacle is drawn: worlds that are
+		# never drawn (headless games, benchmarks on big maps) would otherwise hold one for every obstacle
+		self.rect = pygame.Rect(0, 0, int(maxpt[0]+linewidth), int(maxpt[1]+linewidth))
+		self.color = color
+		self.linewidth = linewidth
 		#transpoints = []
 		#for p in points:
 		#	transpoints.append((p[0] + self.pos[0], p[1] + self.pos[1]))
@@ -783,8 +1068,16 @@ class ManualObstacle(Obstacle):
 						self.decorations.append(d)
 						self.sprites.add(d)
 
+	def makeSurface(self):
+		s = pygame.Surface(self.rect.size, pygame.SRCALPHA, 32)
+		s = s.convert_alpha()
+		pygame.draw.lines(s, self.color, True, self.points, self.linewidth)
+		return s
+
 	### Draw me
 	def draw(self, parent):
+		if self.surface is None:
+			self.surface = self.makeSurface()
 		Obstacle.draw(self, parent)
 		self.sprites.draw(self.surface)
 
@@ -806,14 +1099,29 @@ class GameWorld():
 	### resources: all the resources
 	### movers: all things that can collide with other things and implement collision()
 	### destinations: places that are not inside of obstacles. 
+	### freeLocationIndexes: dictionary from agent radius to the FreeLocationIndex of agents that size (see getFreeLocationIndex). Cleared with destinations when the terrain changes.
 	### clock: elapsed time in game
-
-	def __init__(self, seed, worlddimensions, screendimensions):
+	### ticks: number of times the world has been updated
+	### headless: no window, no drawing, and a fixed delta every tick, so the game runs as fast as possible
+	### moverIndex: spatial hash of the movers' rects, kept up to date as movers are added, removed, and moved
+	### obstacleIndex: spatial hash of (obstacle index, line) for every obstacle line. Built lazily.
+	### obstacleArray: PolygonArray of the obstacles' points, for testing many points at once. Built lazily.
+	### lineArrays: cache of LineArrays for ray tracing. Cleared whenever the world lines change.
+	### lineIndex: spatial hash of the world lines without the borders (gates included), by bounding box. Built lazily and cleared
+	###   whenever the world lines change.
+	### visibility: lines of sight already traced against the current world lines
+	### navigationContexts: dictionary from navigator context key to the NavigationContext navigators of that kind share on this terrain
+	### pathScheduler: PathScheduler planning the navigators' paths a few nodes every tick
+
+	def __init__(self, seed, worlddimensions, screendimensions, headless = False):
 		#initialize random seed
 		self.time = time.time()
 		corerandom.seed(seed or self.time)
 		random.seed(self.time)
 		#initialize Pygame and set up screen and background surface
+		if headless:
+			# Must be set before the display is initialized
+			os.environ['SDL_VIDEODRIVER'] = 'dummy'
 		pygame.init()
 		self.font = pygame.font.SysFont("monospace", 15)
 		screen = pygame.display.set_mode(screendimensions)
@@ -827,8 +1135,9 @@ class GameWorld():
 		debug = debug.convert()
 		debug.fill((255, 255, 255))
 		background.blit(debug, (0, 0))
-		screen.blit(background, (0, 0))
-		pygame.display.flip()
+		if not headless:
+			screen.blit(background, (0, 0))
+			pygame.display.flip()
 		#store stuff
 		self.screen = screen
 		self.seed = seed or self.time
@@ -846,10 +1155,24 @@ class GameWorld():
 		self.debugging = False
 		self.movers = []
 		self.clock = 0
+		self.ticks = 0
+		self.headless = headless
 		# camera
 		self.camera = [0, 0]
 		# unobstructed places
 		self.destinations = {}
+		self.freeLocationIndexes = {}
+		# collision broad phase
+		self.moverIndex = SpatialHash(COLLISIONCELLSIZE)
+		self.obstacleIndex = None
+		self.obstacleArray = None
+		# ray tracing
+		self.lineArrays = {}
+		self.lineIndex = None
+		self.visibility = VisibilityCache()
+		# path networks
+		self.navigationContexts = {}
+		self.pathScheduler = PathScheduler()
 	
 	def getPoints(self):
 		return self.points
@@ -865,6 +1188,48 @@ class GameWorld():
 				lines.append(l)
 		return lines
 
+	### Same lines as getLines(), packed for ray tracing. Can be passed anywhere a list of world lines is expected by the rayTrace functions.
+	def getLineArray(self):
+		if 'all' not in self.lineArrays:
+			self.lineArrays['all'] = LineArray(self.getLines())
+		return self.lineArrays['all']
+
+	### Same lines as getLinesWithoutBorders(), packed for ray tracing.
+	def getLineArrayWithoutBorders(self):
+		if 'noborders' not in self.lineArrays:
+			self.lineArrays['noborders'] = LineArray(self.getLinesWithoutBorders())
+		return self.lineArrays['noborders']
+
+	### The obstacles' points packed into a PolygonArray. Can be passed anywhere a list of obstacles is expected by insideObstacleBatch.
+	def getObstacleArray(self):
+		if self.obstacleArray is None:
+			self.obstacleArray = PolygonArray([o.getPoints() for o in self.obstacles] if self.obstacles is not None else [])
+		return self.obstacleArray
+
+	### Spatial hash of the same lines as getLinesWithoutBorders(), for finding the lines near a leg or a point
+	def getLineIndex(self):
+		if self.lineIndex is None:
+			self.lineIndex = SpatialHash(COLLISIONCELLSIZE)
+			for l in self.getLinesWithoutBorders():
+				self.lineIndex.insert(l, lineBox(l, EPSILON))
+		return self.lineIndex
+
+	### Must be called whenever the world lines change (terrain or gates)
+	def linesChanged(self):
+		self.lineArrays = {}
+		self.lineIndex = None
+
+	def getPathScheduler(self):
+		return self.pathScheduler
+
+	### The NavigationContext navigators with key (see NavMeshNavigator.getContextKey) share on this terrain, or None
+	def getNavigationContext(self, key):
+		return self.navigationContexts.get(key)
+
+	def setNavigationContext(self, key, context):
+		context.shared = True
+		self.navigationContexts[key] = context
+
 	
 	def getObstacles(self):
 		return self.obstacles
@@ -876,6 +1241,7 @@ class GameWorld():
 		self.agent = agent
 		self.camera = agent.getLocation()
 		self.movers.append(agent)
+		self.moverIndex.insert(agent, rectBox(agent.rect))
 #		print agent.radius
 
 	# Make Random Terrain
@@ -900,6 +1266,13 @@ class GameWorld():
 		self.obstacles = obstacles
 		self.points = points
 		self.lines = lines 
+		self.obstacleIndex = None
+		self.obstacleArray = None
+		self.destinations = {}
+		self.freeLocationIndexes = {}
+		self.navigationContexts = {}
+		self.pathScheduler = PathScheduler()
+		self.linesChanged()
 		
 	# Make Terrain
 	# polys = list of list points (poly1, poly2, ...) = ((p11, p12, ...), (p21, p22, ...), ...)
@@ -919,6 +1292,13 @@ class GameWorld():
 		self.obstacles = obstacles
 		self.points = points
 		self.lines = lines
+		self.obstacleIndex = None
+		self.obstacleArray = None
+		self.destinations = {}
+		self.freeLocationIndexes = {}
+		self.navigationContexts = {}
+		self.pathScheduler = PathScheduler()
+		self.linesChanged()
 
 
 	def initializeResources(self, points, resource = RESOURCE):
@@ -932,19 +1312,20 @@ class GameWorld():
 			pos = (0, 0)
 			while True:
 				pos = (corerandom.randint(0, self.dimensions[0]), corerandom.randint(0, self.dimensions[1]))
-				inside = False
-				for o in self.obstacles:
-					if pointInsidePolygonPoints(pos, o.getPoints()):
-						inside = True
-				if inside == False:
+				if not self.getObstacleArray().containsPoint(pos):
 					break
 			r = SimpleResource(resource, pos, 0, self)
 			self.addResource(r)
 #			self.resources.add(r)
 #			self.movers.add(r)
 
-	def run(self):
-		self.sprites = pygame.sprite.RenderPlain((self.agent))
+	### Run the game loop.
+	### maxTicks: stop after this many ticks (None: never)
+	### done: function that takes the world and returns True when the game should stop (None: never)
+	### Returns the final state of the world (see getState()).
+	def run(self, maxTicks = None, done = None):
+		# Sprites update in the order they were added, so the same seed always plays out the same way
+		self.sprites = pygame.sprite.OrderedUpdates((self.agent))
 #		for r in self.resources:
 #			self.sprites.add(r)
 #		for n in self.npcs:
@@ -954,22 +1335,39 @@ class GameWorld():
 		clock = pygame.time.Clock()
 		
 		# Draw obstacles. Only need to do this once
-		for o in self.obstacles:
-			o.draw(self.background)
-
-		while True:
-			clock.tick(TICK)
-			delta = clock.get_rawtime()
-			self.handleEvents()
+		if not self.headless:
+			for o in self.obstacles:
+				o.draw(self.background)
+
+		start = time.time()
+		while (maxTicks is None or self.ticks < maxTicks) and (done is None or not done(self)):
+			if self.headless:
+				delta = HEADLESSDELTA
+			else:
+				clock.tick(TICK)
+				delta = clock.get_rawtime()
+				self.handleEvents()
 			self.update(delta)
 			self.sprites.update(delta) 
+			self.ticks = self.ticks + 1
 			#print "obstacles"
 			#for o in self.obstacles:
 			#	print o.pos
 			#	o.pos[0] = o.pos[0] + 1.0
 			#	o.pos[1] = o.pos[1] + 1.0
-			self.drawWorld()
-			pygame.display.flip()
+			if not self.headless:
+				self.drawWorld()
+				pygame.display.flip()
+		elapsed = time.time() - start
+		print self.ticks, "ticks in %.2fs (%.1f ticks/second)" % (elapsed, self.ticks / max(elapsed, 0.000001))
+		return self.getState()
+
+	### The state of the game, returned by run() when the game ends
+	def getState(self):
+		state = {'ticks': self.ticks}
+		if self.agent is not None:
+			state['agent'] = (self.agent.getLocation(), self.agent.getHitpoints() if isinstance(self.agent, Agent) else None)
+		return state
 			
 	def drawWorld(self):
 		#self.screen.blit(self.background, (0, 0))
@@ -1021,61 +1419,99 @@ class GameWorld():
 			print "distance traveled", self.agent.distanceTraveled
 
 	def worldCollisionTest(self):
-		collisions = []
-		for m1 in self.movers:
-			if m1 in self.movers:
-				# Collision against world boundaries
-				if m1.position[0] < 0 or m1.position[0] > self.dimensions[0] or m1.position[1] < 0 or m1.position[1] > self.dimensions[1]:
-					collisions.append((m1, self))
-				# Collision against obstacles
-				for o in self.obstacles:
-					c = False
-					needCheckVertex = False
-					if isinstance(m1, Agent) and m1.moveTarget != None:
-						moverRadius = m1.getRadius()
-						lines = o.getLines()
-						direction = numpy.subtract(m1.moveTarget, m1.position)
-						magnitude = numpy.linalg.norm(direction)
-						if magnitude > 0:
-							direction = direction / magnitude
-						nextPosition = tuple(numpy.add(m1.position, direction * (m1.speed[0] + moverRadius)))
-						p = rayTraceWorldNoEndPoints(m1.position, nextPosition, lines)
-						if p == None:
-							needCheckVertex = True
-					if needCheckVertex:
-						for v in o.getPoints():
-							# check v between m1.position and nextPosition
-							if between(v[0], m1.position[0], nextPosition[0]) and between(v[1], m1.position[1], nextPosition[1]):
-								d = minimumDistance((m1.position, nextPosition), v)
-								if d < moverRadius:
-									needCheckVertex = False
-									break
-						if needCheckVertex:
-							for l in lines:
-								if minimumDistance(l, nextPosition) < moverRadius:
-									needCheckVertex = False
-									break
-					if not needCheckVertex:
-						for l in o.getLines():
-							for r in ((m1.rect.topleft, m1.rect.topright), (m1.rect.topright, m1.rect.bottomright), (m1.rect.bottomright, m1.rect.bottomleft), (m1.rect.bottomleft, m1.rect.topleft)):
-								hit = calculateIntersectPoint(l[0], l[1], r[0], r[1])
-								if hit is not None:
-									c = True
-					if c:
-						collisions.append((m1, o))
-				# Movers against movers
-				for m2 in self.movers:
-					if m2 in self.movers:
-						if m1 != m2:
-							if (m1, m2) not in collisions and (m2, m1) not in collisions:
-								if m1.rect.colliderect(m2.rect):
-									collisions.append((m1, m2))
-		for c in collisions:
+		for c in self.findCollisions():
 			c[0].collision(c[1])
 			c[1].collision(c[0])
+
+	### Returns the (thing, thing) pairs that are colliding, in the order their collision callbacks should be called.
+	def findCollisions(self):
+		collisions = []
+		if len(self.moverIndex) != len(self.movers):
+			# Something touched self.movers directly. Rebuild the index from scratch.
+			self.rebuildMoverIndex()
+		if self.obstacleIndex is None:
+			self.buildObstacleIndex()
+		# Movers only test against movers that come after them in self.movers, so callbacks happen in the same order as an all-pairs test.
+		order = {}
+		for i, m in enumerate(self.movers):
+			if id(m) not in order:
+				order[id(m)] = i
+		for i, m1 in enumerate(self.movers):
+			# Collision against world boundaries
+			if m1.position[0] < 0 or m1.position[0] > self.dimensions[0] or m1.position[1] < 0 or m1.position[1] > self.dimensions[1]:
+				collisions.append((m1, self))
+			# Collision against obstacles. Only obstacles with a line near the mover's rect can be hit.
+			box = rectBox(m1.rect)
+			candidates = {}
+			for index, l in self.obstacleIndex.query((box[0]-EPSILON, box[1]-EPSILON, box[2]+EPSILON, box[3]+EPSILON)).itervalues():
+				candidates.setdefault(index, []).append(l)
+			for index in sorted(candidates.keys()):
+				o = self.obstacles[index]
+				if self.rectHitsLines(m1.rect, candidates[index]) and not self.movingClearOfObstacle(m1, o):
+					collisions.append((m1, o))
+			# Movers against movers
+			if order[id(m1)] == i:
+				others = []
+				for m2 in self.moverIndex.neighbors(m1).itervalues():
+					j = order.get(id(m2))
+					if j is not None and j > i and m1.rect.colliderect(m2.rect):
+						others.append((j, m2))
+				others.sort(key=lambda x: x[0])
+				for j, m2 in others:
+					collisions.append((m1, m2))
+		return collisions
+
+	### Does any edge of the rect intersect any of the lines?
+	def rectHitsLines(self, rect, lines):
+		edges = ((rect.topleft, rect.topright), (rect.topright, rect.bottomright), (rect.bottomright, rect.bottomleft), (rect.bottomleft, rect.topleft))
+		for l in lines:
+			for r in edges:
+				if calculateIntersectPoint(l[0], l[1], r[0], r[1]) is not None:
+					return True
+		return False
+
+	### An agent that is moving is not stopped by an obstacle unless its next step would take it into or near the obstacle.
+	def movingClearOfObstacle(self, m1, o):
+		if isinstance(m1, Agent) and m1.moveTarget != None:
+			moverRadius = m1.getRadius()
+			lines = o.getLines()
+			direction = numpy.subtract(m1.moveTarget, m1.position)
+			magnitude = numpy.linalg.norm(direction)
+			if magnitude > 0:
+				direction = direction / magnitude
+			nextPosition = tuple(numpy.add(m1.position, direction * (m1.speed[0] + moverRadius)))
+			p = rayTraceWorldNoEndPoints(m1.position, nextPosition, lines)
+			if p == None:
+				for v in o.getPoints():
+					# check v between m1.position and nextPosition
+					if between(v[0], m1.position[0], nextPosition[0]) and between(v[1], m1.position[1], nextPosition[1]):
+						d = minimumDistance((m1.position, nextPosition), v)
+						if d < moverRadius:
+							return False
+				for l in lines:
+					if minimumDistance(l, nextPosition) < moverRadius:
+						return False
+				return True
+		return False
+
+	def rebuildMoverIndex(self):
+		self.moverIndex.clear()
+		for m in self.movers:
+			self.moverIndex.insert(m, rectBox(m.rect))
+
+	def buildObstacleIndex(self):
+		self.obstacleIndex = SpatialHash(COLLISIONCELLSIZE)
+		for index, o in enumerate(self.obstacles or []):
+			for l in o.getLines():
+				self.obstacleIndex.insert((index, l), lineBox(l, EPSILON))
+
+	### Callback from Mover when it moves or its rect changes
+	def updateMover(self, mover):
+		self.moverIndex.update(mover, rectBox(mover.rect))
 		
 	def update(self, delta):
 		self.clock = self.clock + delta
+		self.pathScheduler.update(delta)
 		self.worldCollisionTest()
 		return None
 		
@@ -1093,6 +1529,7 @@ class GameWorld():
 		if self.sprites is not None:
 			self.sprites.add(bullet)
 		self.movers.append(bullet)
+		self.moverIndex.insert(bullet, rectBox(bullet.rect))
 		
 	def deleteBullet(self, bullet):
 		if bullet in self.bullets:
@@ -1100,24 +1537,28 @@ class GameWorld():
 			if self.sprites is not None:
 				self.sprites.remove(bullet)
 			self.movers.remove(bullet)
+			self.moverIndex.remove(bullet)
 
 	def addResource(self, res):
 		self.resources.append(res)
 		if self.sprites is not None:
 			self.sprites.add(res)
 		self.movers.append(res)
+		self.moverIndex.insert(res, rectBox(res.rect))
 	
 	def deleteResource(self, res):
 		self.resources.remove(res)
 		if self.sprites is not None:
 			self.sprites.remove(res)
 		self.movers.remove(res)
+		self.moverIndex.remove(res)
 		
 	def addNPC(self, npc):
 		self.npcs.append(npc)
 		if self.sprites is not None:
 			self.sprites.add(npc)
 		self.movers.append(npc)
+		self.moverIndex.insert(npc, rectBox(npc.rect))
 		
 	def deleteNPC(self, npc):
 		if npc in self.npcs:
@@ -1125,9 +1566,12 @@ class GameWorld():
 			if self.sprites is not None:
 				self.sprites.remove(npc)
 			self.movers.remove(npc)
+			self.moverIndex.remove(npc)
 
 	def getVisible(self, position, orientation, viewangle, type = None):
-		visible = []
+		candidates = []
+		if viewangle < 360:
+			orient = (math.cos(math.radians(orientation)), -math.sin(math.radians(orientation)))
 		for m in self.movers:
 			if type == None or isinstance(m, type):
 				# m is the type that we are looking for
@@ -1136,7 +1580,6 @@ class GameWorld():
 					# other is not me
 					if viewangle < 360:
 						# viewangle less than 360
-						orient = (math.cos(math.radians(orientation)), -math.sin(math.radians(orientation)))
 						vect = (other[0]-position[0], other[1]-position[1])
 						x = dotProduct(orient, vect) / (vectorMagnitude(orient) * vectorMagnitude(vect))
 						if x >= 1.0:
@@ -1144,32 +1587,39 @@ class GameWorld():
 						else:
 							angle = math.degrees(math.acos(x))
 						if angle < viewangle/2.0:
-							hit = rayTraceWorld(position, other, self.getLines())
-							if hit == None:
-								visible.append(m)
+							candidates.append(m)
 					else:
 						# viewangle is 360
-						hit = rayTraceWorld(position, other, self.getLines())
-						if hit == None:
-							visible.append(m)
+						candidates.append(m)
+		visible = []
+		clear = self.linesOfSight(position, [m.getLocation() for m in candidates])
+		for m, c in zip(candidates, clear):
+			if c:
+				visible.append(m)
 		return visible
 
+	### For each point, True if nothing in the world is between position and the point. Answers are cached until the world lines change.
+	def linesOfSight(self, position, points):
+		return self.visibility.linesOfSight(position, points, self.getLineArray())
+
 	def computeFreeLocations(self, agent):
 		if type(agent) not in self.destinations:
-			destinations = []
-			grid = agent.getRadius()*2.0
-			for x in xrange(1, int(self.dimensions[0]/grid)):
-				for y in xrange(1, int(self.dimensions[1]/grid)):
-					point = (x*grid, y*grid)
-					if isGood(point, self, grid):
-						destinations.append(point)
-			self.destinations[type(agent)] = destinations
+			self.destinations[type(agent)] = self.getFreeLocationIndex(agent.getRadius())
 		
 	def getFreeLocations(self, agent):
 		if type(agent) in self.destinations:
-			return self.destinations[type(agent)]
+			return self.destinations[type(agent)].getLocations()
 		else:
 			return None
+
+	### The FreeLocationIndex of the places agents of the given radius can be sent to: a lattice radius*2 apart, keeping radius*2
+	### from every world line. Built the first time agents of that size ask, against the world lines at that time, and shared
+	### by every kind of agent of that size.
+	def getFreeLocationIndex(self, radius):
+		if radius not in self.freeLocationIndexes:
+			grid = radius*2.0
+			self.freeLocationIndexes[radius] = FreeLocationIndex(self.dimensions, self.getLines(), self.getObstacleArray(), grid, grid)
+		return self.freeLocationIndexes[radius]
 					
 	def getNPCs(self):
 		return self.npcs
@@ -1230,24 +1680,35 @@ class GatedWorld(GameWorld):
 	### timer: running timer
 	### alarm: when timer is greater than this number, gate switches
 	### gate: the active gate
+	### gateVersion: incremented every time the gates change. Navigators compare it against the version they last saw to know when to re-check their edges.
 
-	def __init__(self, seed, worlddimensions, screendimensions, numgates, alarm):
-		GameWorld.__init__(self, seed, worlddimensions, screendimensions)
+	def __init__(self, seed, worlddimensions, screendimensions, numgates, alarm, headless = False):
+		GameWorld.__init__(self, seed, worlddimensions, screendimensions, headless)
 		self.potentialGates = []
 		self.timer = 0
 		self.alarm = alarm
 		self.gates = []
 		self.numGates = numgates
+		self.gateVersion = 0
 	
 	def getNumGates(self):
 		return self.numGates
 	
 	def getGates(self):
 		return map(getGateLine, self.gates)
+
+	def getGateVersion(self):
+		return self.gateVersion
+
+	### Must be called whenever self.gates changes
+	def gatesChanged(self):
+		self.gateVersion = self.gateVersion + 1
+		self.linesChanged()
 	
 	def makePotentialGates(self):
 		if self.obstacles != None:
 			dangerpoints = [(0, 0), (self.dimensions[0], 0), (self.dimensions[0], self.dimensions[1]), (0, self.dimensions[1])]
+			pairs = []
 			for p1 in self.getPoints():
 				for p2 in self.getPoints():
 					if p1 != p2: # and p2 != (0, 0) and p2 != (self.dimensions[0], 0) and p2 != (self.dimensions[0], self.dimensions[1]) and p2 != (0, self.dimensions[1]):
@@ -1257,11 +1718,15 @@ class GatedWorld(GameWorld):
 								if p1 in o.getPoints() and p2 in o.getPoints():
 									samepoly = True
 							if samepoly == False:
-								if not insideObstacle(((p1[0]+p2[0])/2.0, (p1[1]+p2[1])/2.0), self.obstacles):
-									
-									hit = rayTraceWorldNoEndPoints(p1, p2, self.getLines())
-									if hit == None:
-										self.potentialGates.append((p1, p2))
+								pairs.append((p1, p2))
+			# Test all the midpoints at once
+			inside = insideObstacleBatch([((p1[0]+p2[0])/2.0, (p1[1]+p2[1])/2.0) for p1, p2 in pairs], self.getObstacleArray())
+			candidates = [pair for pair, blocked in zip(pairs, inside) if not blocked]
+			# Cast all the rays at once
+			hits = rayTraceWorldBatch([c[0] for c in candidates], [c[1] for c in candidates], self.getLineArray(), False)
+			for c, hit in zip(candidates, hits):
+				if hit == None:
+					self.potentialGates.append(c)
 
 	def drawWorld(self):
 		GameWorld.drawWorld(self)
@@ -1299,6 +1764,7 @@ class GatedWorld(GameWorld):
 					elif len(self.gates) > x:
 						newgates.append(self.gates[x])
 				self.gates = newgates
+				self.gatesChanged()
 		return None
 
 
@@ -1334,6 +1800,7 @@ class GatedWorld(GameWorld):
 			self.gates.append(g)
 			if len(self.gates) > self.numGates:
 				self.gates.pop(0)
+			self.gatesChanged()
 
 #######################################
 ### HELPERS
@@ -1356,3 +1823,34 @@ def isGood(point, world, threshold):
 		return True
 	return False
 
+### Same as insideObstacle for many points at once. Returns a numpy array of booleans, one per point.
+### obstacles: a list of Obstacles, or a PolygonArray of their points (such as world.getObstacleArray())
+def insideObstacleBatch(points, obstacles):
+	if not isinstance(obstacles, PolygonArray):
+		obstacles = PolygonArray([o.getPoints() for o in obstacles])
+	return obstacles.containsPoints(points)
+
+### Same as isGood for many points at once. Returns a numpy array of booleans, one per point.
+### Only the points inside the world and outside every obstacle are measured against the world lines, each line at once for all of
+### them. A point whose clearance is within rounding of threshold is decided with isGood.
+def isGoodBatch(points, world, threshold):
+	points = list(points)
+	coords = numpy.array(points, dtype=numpy.float64).reshape((-1, 2))
+	x = coords[:, 0]
+	y = coords[:, 1]
+	good = (x > 0) & (x < world.dimensions[0]) & (y > 0) & (y < world.dimensions[1])
+	candidates = numpy.nonzero(good)[0]
+	if len(candidates) > 0:
+		good[candidates] = ~world.getObstacleArray().containsPoints([points[i] for i in candidates])
+	candidates = numpy.nonzero(good)[0]
+	if len(candidates) > 0:
+		clearance = numpy.empty(len(candidates), dtype=numpy.float64)
+		clearance.fill(INFINITY)
+		for l in world.getLines():
+			clearance = numpy.minimum(clearance, segmentDistances(l, x[candidates], y[candidates]))
+		tolerance = EPSILON * max(1.0, threshold)
+		good[candidates] = clearance >= threshold
+		for i in candidates[numpy.abs(clearance - threshold) < tolerance]:
+			good[i] = isGood(points[i], world, threshold)
+	return good
+
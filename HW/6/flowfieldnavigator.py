@@ -0,0 +1,146 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import sys, pygame, math, numpy, random, time, copy, heapq, collections
+from pygame.locals import *
+
+from constants import *
+from utils import *
+from core import *
+from astarnavigator import *
+
+###############################
+### FlowFieldNavigator
+###
+### Creates a path node network and finds paths by following flow fields instead of searching. The flow field of a goal path
+### node is the length of the shortest path from every path node to the goal and the next node on it, found with one Dijkstra
+### search out from the goal. Fields are kept in the navigation context, so all the navigators on a map share them: the minions
+### of a team heading for the same tower or base only search once, and each agent just follows the next nodes from its own node.
+### A field is built again once the gates change. Meant for many agents with a few goals between them.
+
+class FlowFieldNavigator(AStarNavigator):
+
+    def createContext(self):
+        return FlowFieldNavigationContext()
+
+    ### Paths are read from flow fields, so nothing is planned on the world's PathScheduler
+    def canSchedulePath(self, start, end):
+        return False
+
+    ### The path from path node start to path node end (not including start), following end's flow field
+    def findPath(self, start, end):
+        return self.getFlowField(end).getPath(start)
+
+    ### The FlowField leading to path node goal along the edges no gate blocks
+    def getFlowField(self, goal):
+        return self.context.getFlowField(goal, self.getUnobstructedNetwork())
+
+    ### How many flow fields were built and read on this map
+    def getFlowFieldStats(self):
+        return self.context.getFlowFieldStats()
+
+###############################
+### FlowFieldNavigationContext
+###
+### The NavigationContext of a FlowFieldNavigator: also keeps the flow fields of the goals navigated to most recently.
+
+class FlowFieldNavigationContext(AStarNavigationContext):
+
+    ### flowFields: ordered dictionary from goal path node to its FlowField, least recently used first (made when first asked for)
+    ### builds, reads: counters for tuning
+
+    def __init__(self):
+        AStarNavigationContext.__init__(self)
+        self.flowFields = None
+        self.builds = 0
+        self.reads = 0
+
+    ### The copy starts with no flow fields, since its path network may be replaced
+    def copy(self):
+        context = AStarNavigationContext.copy(self)
+        context.flowFields = None
+        return context
+
+    ### The FlowField leading to goal over network (a PathNetworkIndex). The field is built if the one kept for goal was built on
+    ### another network: the gates changed or the path network was replaced. At most FLOWFIELDCOUNT fields are kept.
+    def getFlowField(self, goal, network):
+        if self.flowFields is None:
+            self.flowFields = collections.OrderedDict()
+        field = self.flowFields.pop(goal, None)
+        if field is None or field.network is not network:
+            field = FlowField(goal, network)
+            self.builds = self.builds + 1
+        self.reads = self.reads + 1
+        # Most recently used goes last
+        self.flowFields[goal] = field
+        while len(self.flowFields) > FLOWFIELDCOUNT:
+            self.flowFields.popitem(False)
+        return field
+
+    def getFlowFieldStats(self):
+        return {'fields': len(self.flowFields) if self.flowFields is not None else 0, 'builds': self.builds, 'reads': self.reads}
+
+###############################
+### FlowField
+###
+### Shortest paths from every path node to one goal node, as a distance and a next node for each path node.
+### The path network is undirected, so a Dijkstra search out from the goal finds them all at once.
+
+class FlowField(object):
+
+    ### goal: the path node the field leads to
+    ### network: the PathNetworkIndex the field was built on
+    ### dist: dictionary from path node to the length of its shortest path to goal (nodes that can't reach goal aren't in it)
+    ### next: dictionary from path node to the node after it on its shortest path to goal
+
+    def __init__(self, goal, network):
+        self.goal = goal
+        self.network = network
+        self.dist = {goal: 0}
+        self.next = {}
+        heap = [(0, goal)]
+        done = set()
+        while heap:
+            d, current = heapq.heappop(heap)
+            if current in done:
+                continue
+            done.add(current)
+            for neighbor in network.getNeighbors(current):
+                nd = d + distance(current, neighbor)
+                if neighbor not in self.dist or nd < self.dist[neighbor]:
+                    self.dist[neighbor] = nd
+                    self.next[neighbor] = current
+                    heapq.heappush(heap, (nd, neighbor))
+
+    ### The length of the shortest path from node to goal, or INFINITY if there is none
+    def getDistance(self, node):
+        return self.dist.get(node, INFINITY)
+
+    ### The node after node on its shortest path to goal, or None if node is goal or can't reach it
+    def getNext(self, node):
+        return self.next.get(node)
+
+    ### The path from node to goal (not including node), empty if there is none
+    def getPath(self, node):
+        path = []
+        while node != self.goal:
+            node = self.next.get(node)
+            if node is None:
+                return []
+            path.append(node)
+        return path
@@ -0,0 +1,132 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import math, numpy, random
+
+from constants import *
+from utils import *
+from spatialhash import *
+
+############################
+### FREE LOCATION INDEX
+###
+### The places agents can be sent to (see GameWorld.computeFreeLocations): the points of a lattice spacing apart that are outside
+### every obstacle and at least threshold from every world line, the same points isGood accepts.
+### The lattice is rasterized into a clearance map instead of testing every point against every line: each line only measures
+### its distance to the lattice points around it, and only the points far enough from every line are tested against the
+### obstacles, all at once with a PolygonArray (obstacles can be given as one, or as a list of polygons).
+### A point whose clearance is within rounding of threshold is decided with minimumDistance, as isGood would.
+### Free locations are kept as a list (in the order computeFreeLocations always listed them: by column, then by row), as a numpy
+### array, and as a grid of booleans for finding the free locations around a point.
+
+class FreeLocationIndex(object):
+
+	### spacing: the distance between lattice points. Lattice point (i, j) is (i * spacing, j * spacing), for 0 < i < columns and
+	###   0 < j < rows, so every point is inside the world.
+	### threshold: how far a free location must be from every line
+	### columns, rows: the size of the lattice, including the points on the top and left edges of the world that are never free
+	### free: numpy array of booleans; free[i, j] is True if lattice point (i, j) is a free location
+	### points: numpy array of the free locations, one row (x, y) each
+	### locations: the free locations as a list of (x, y) tuples, in the same order as points
+
+	def __init__(self, dimensions, lines, obstacles, spacing, threshold):
+		self.spacing = spacing
+		self.threshold = threshold
+		self.columns = max(1, int(dimensions[0] / spacing))
+		self.rows = max(1, int(dimensions[1] / spacing))
+		# Distance from each lattice point to the nearest line, measured only for points closer than threshold plus a cell
+		clearance = numpy.empty((self.columns, self.rows), dtype=numpy.float64)
+		clearance.fill(INFINITY)
+		for line in lines:
+			box = lineBox(line, threshold)
+			i, j = self.window(box)
+			if i is None:
+				continue
+			x = (i * spacing)[:, numpy.newaxis]
+			y = (j * spacing)[numpy.newaxis, :]
+			distances = segmentDistances(line, x, y)
+			clearance[i[0]:i[-1] + 1, j[0]:j[-1] + 1] = numpy.minimum(clearance[i[0]:i[-1] + 1, j[0]:j[-1] + 1], distances)
+		# Lattice points inside an obstacle, tested only where the clearance is enough for them to be free
+		tolerance = EPSILON * max(1.0, threshold)
+		if not isinstance(obstacles, PolygonArray):
+			obstacles = PolygonArray(obstacles)
+		inside = numpy.zeros((self.columns, self.rows), dtype=bool)
+		i, j = numpy.nonzero(clearance > threshold - tolerance)
+		if len(i) > 0:
+			inside[i, j] = obstacles.containsPoints(numpy.column_stack((i * spacing, j * spacing)))
+		self.free = (clearance >= threshold + tolerance) & ~inside
+		self.free[0, :] = False
+		self.free[:, 0] = False
+		# Points about threshold from a line (such as the ones next to the borders when spacing is a round number). They are too far
+		# from every line for the inside test to be wrong, but the distance is measured again against the lines around them.
+		unsure = numpy.nonzero(numpy.abs(clearance - threshold) < tolerance)
+		if len(unsure[0]) > 0:
+			boxes = numpy.array([lineBox(l, threshold + tolerance) for l in lines], dtype=numpy.float64).reshape((-1, 4))
+			for i, j in zip(*unsure):
+				if i > 0 and j > 0:
+					point = (int(i) * spacing, int(j) * spacing)
+					near = numpy.nonzero((boxes[:, 0] <= point[0]) & (boxes[:, 2] >= point[0]) & (boxes[:, 1] <= point[1]) & (boxes[:, 3] >= point[1]))[0]
+					self.free[i, j] = not inside[i, j] and all([minimumDistance(lines[k], point) >= threshold for k in near])
+		i, j = numpy.nonzero(self.free)
+		self.locations = [(int(a) * spacing, int(b) * spacing) for a, b in zip(i, j)]
+		self.points = numpy.array(self.locations, dtype=numpy.float64).reshape((-1, 2))
+
+	### The lattice columns and rows (as numpy arrays of indices) whose points are in box (left, top, right, bottom), or
+	### (None, None) if there are none
+	def window(self, box):
+		left = max(1, int(math.ceil(box[0] / self.spacing)))
+		top = max(1, int(math.ceil(box[1] / self.spacing)))
+		right = min(self.columns - 1, int(math.floor(box[2] / self.spacing)))
+		bottom = min(self.rows - 1, int(math.floor(box[3] / self.spacing)))
+		if left > right or top > bottom:
+			return None, None
+		return numpy.arange(left, right + 1), numpy.arange(top, bottom + 1)
+
+	def getLocations(self):
+		return self.locations
+
+	def getPoints(self):
+		return self.points
+
+	def __len__(self):
+		return len(self.locations)
+
+	### The free location nearest to point, or None if there are none
+	def findNearest(self, point):
+		if len(self.locations) == 0:
+			return None
+		d = ((self.points[:, 0] - point[0]) ** 2) + ((self.points[:, 1] - point[1]) ** 2)
+		return self.locations[int(numpy.argmin(d))]
+
+	### The free locations within range of point, in the same order as locations
+	def findWithin(self, point, range):
+		i, j = self.window((point[0] - range, point[1] - range, point[0] + range, point[1] + range))
+		if i is None:
+			return []
+		a, b = numpy.nonzero(self.free[i[0]:i[-1] + 1, j[0]:j[-1] + 1])
+		a = a + i[0]
+		b = b + j[0]
+		near = ((a * self.spacing - point[0]) ** 2) + ((b * self.spacing - point[1]) ** 2) <= range ** 2
+		return [(int(x) * self.spacing, int(y) * self.spacing) for x, y in zip(a[near], b[near])]
+
+	### A random free location within range of point, drawn with rand (a random.Random), or None if there is none
+	def findRandomWithin(self, point, range, rand = random):
+		candidates = self.findWithin(point, range)
+		if len(candidates) == 0:
+			return None
+		return candidates[rand.randrange(len(candidates))]
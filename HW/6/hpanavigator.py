@@ -0,0 +1,266 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import sys, pygame, math, numpy, random, time, copy, heapq
+from pygame.locals import *
+
+from constants import *
+from utils import *
+from core import *
+from astarnavigator import *
+
+###############################
+### HPANavigator
+###
+### Creates a path node network and finds paths with hierarchical A* (HPA*), for maps too big for A* over every path node.
+### The map is cut into square clusters. The path nodes with an edge into another cluster (entrances) make up a much smaller
+### abstract graph, whose edges are the edges between clusters and the shortest paths between the entrances of each cluster,
+### found once when the network is built. A path is found by searching the abstract graph, then filled in from the stored
+### paths, so the search only ever looks at the clusters the path goes through.
+### Gates aren't part of the abstract graph: a stored path that a gate blocks is searched again within its cluster, and if that
+### fails the path is found with A* instead.
+
+class HPANavigator(AStarNavigator):
+
+    def createContext(self):
+        return HPANavigationContext()
+
+    ### Abstract searches are short, so paths are always found right away
+    def canSchedulePath(self, start, end):
+        return False
+
+    ### The path from path node start to path node end (not including start), found on the cluster hierarchy.
+    ### Paths are remembered in the context's PathCache until the gates change.
+    def findPath(self, start, end):
+        cache = self.context.getPathCache()
+        version = gateVersion(self.world)
+        path = cache.get(start, end, version)
+        if path is None:
+            network = self.getUnobstructedNetwork()
+            path = self.context.getHierarchy().findPath(start, end, network)
+            if path is None:
+                path, closedlist = astar(start, end, network)
+            cache.put(start, end, version, path)
+        return list(path)
+
+###############################
+### HPANavigationContext
+###
+### The NavigationContext of an HPANavigator: also keeps the cluster hierarchy of the path network.
+
+class HPANavigationContext(AStarNavigationContext):
+
+    ### hierarchy: ClusterHierarchy of the path network (built when first asked for)
+
+    def __init__(self):
+        AStarNavigationContext.__init__(self)
+        self.hierarchy = None
+
+    ### The ClusterHierarchy of the path network. Rebuilt if the path network was replaced.
+    def getHierarchy(self):
+        if self.hierarchy is None or self.hierarchy.network is not self.pathnetwork:
+            self.hierarchy = ClusterHierarchy(self.pathnodes, self.pathnetwork)
+        return self.hierarchy
+
+###############################
+### ClusterHierarchy
+###
+### The abstract graph of a path network cut into square clusters of clusterSize x clusterSize (see HPANavigator).
+### Every edge between clusters is in the abstract graph and the paths within clusters are shortest paths, so on the network the
+### hierarchy was built from the paths are as short as A*'s.
+
+class ClusterHierarchy(object):
+
+    ### network: the edges the hierarchy was built from
+    ### clusterSize: the width and height of a cluster
+    ### index: PathNetworkIndex of network
+    ### clusterOf: dictionary from node to its cluster (column, row)
+    ### members: dictionary from cluster to the set of its nodes
+    ### entrances: dictionary from cluster to the list of its nodes with an edge into another cluster
+    ### prevs: dictionary from entrance node to the node before each node on the shortest paths from it within its cluster
+    ### entranceCosts: dictionary from node to the list of (entrance node, cost) for the entrances of its cluster it has a path
+    ###   to. A path that goes through another entrance isn't listed: the abstract search finds it as the paths on either side of
+    ###   that entrance, at the same cost.
+    ### abstract: dictionary from entrance node to the list of (entrance node, cost) it has an abstract edge to
+
+    def __init__(self, nodes, network, clusterSize = HPACLUSTERSIZE):
+        self.network = network
+        self.clusterSize = float(clusterSize)
+        self.index = PathNetworkIndex(network)
+        self.clusterOf = {}
+        self.members = {}
+        for node in list(nodes) + [node for edge in network for node in edge]:
+            if node not in self.clusterOf:
+                cluster = self.getCluster(node)
+                self.clusterOf[node] = cluster
+                self.members.setdefault(cluster, set()).add(node)
+        self.entrances = {}
+        self.prevs = {}
+        self.entranceCosts = {}
+        self.abstract = {}
+        # Edges between clusters
+        for a, b in network:
+            if self.clusterOf[a] != self.clusterOf[b]:
+                for node, other in ((a, b), (b, a)):
+                    if node not in self.abstract:
+                        self.abstract[node] = []
+                        self.entrances.setdefault(self.clusterOf[node], []).append(node)
+                    if other not in [n for n, cost in self.abstract[node]]:
+                        self.abstract[node].append((other, distance(node, other)))
+        # Shortest paths from each entrance within its cluster
+        for cluster, entrances in self.entrances.iteritems():
+            entranceSet = set(entrances)
+            for entrance in entrances:
+                dist, prev = clusterSearch(entrance, self.members[cluster], self.index)
+                self.prevs[entrance] = prev
+                # Nodes whose path from entrance goes through another entrance, worked out nearest first
+                through = set()
+                for node in sorted(dist.keys(), key = lambda n: dist[n]):
+                    if node == entrance:
+                        continue
+                    if prev[node] != entrance and (prev[node] in entranceSet or prev[node] in through):
+                        through.add(node)
+                    else:
+                        self.entranceCosts.setdefault(node, []).append((entrance, dist[node]))
+        for entrance in self.prevs:
+            self.abstract[entrance] = self.abstract[entrance] + self.entranceCosts.get(entrance, [])
+
+    ### The cluster (column, row) point falls in
+    def getCluster(self, point):
+        return (int(math.floor(point[0] / self.clusterSize)), int(math.floor(point[1] / self.clusterSize)))
+
+    def getAbstractSize(self):
+        return len(self.abstract), sum([len(edges) for edges in self.abstract.itervalues()])
+
+    ### The shortest path from a to b (not including a) within their cluster, on the network the hierarchy was built from.
+    ### One of them must be an entrance.
+    def clusterPath(self, a, b):
+        if a in self.prevs:
+            return tracePath(a, b, self.prevs[a])
+        # The network is undirected, so the path from a to b is the path from b to a, reversed
+        return list(reversed(tracePath(b, a, self.prevs[b])[:-1])) + [b]
+
+    ### The path from node start to node end (not including start) along the edges of network (a PathNetworkIndex of this
+    ### hierarchy's network minus some edges, or the same edges), or None if it can't be found on the hierarchy.
+    ### The abstract graph is searched with start and end added for this search: start gets edges to the entrances of its
+    ### cluster, the entrances of end's cluster get edges to end, and start gets an edge to end if they share a cluster.
+    ### The stored paths the result follows are checked against network; one that a gate blocks is searched again within its
+    ### cluster (which may make the path longer than A*'s).
+    def findPath(self, start, end, network):
+        if start == end:
+            return []
+        if start not in self.clusterOf or end not in self.clusterOf:
+            return None
+        # Edges that only exist for this search
+        extra = {start: list(self.entranceCosts.get(start, []))}
+        for entrance, cost in self.entranceCosts.get(end, []):
+            extra.setdefault(entrance, []).append((end, cost))
+        direct = None
+        if self.clusterOf[start] == self.clusterOf[end]:
+            dist, prev = clusterSearch(start, self.members[self.clusterOf[start]], network, end)
+            if end in dist:
+                extra[start].append((end, dist[end]))
+                direct = tracePath(start, end, prev)
+        abstractPath = abstractSearch(start, end, self.abstract, extra)
+        if abstractPath is None:
+            return None
+        # Fill in the path from the abstract edges it takes
+        path = []
+        previous = start
+        for node in abstractPath:
+            if previous == start and node == end and direct is not None:
+                segment = direct
+            elif self.clusterOf[previous] != self.clusterOf[node]:
+                segment = [node] if node in network.getNeighbors(previous) else None
+            else:
+                segment = self.clusterPath(previous, node)
+                if not pathFollowsNetwork(previous, segment, network):
+                    # A gate blocks the stored path; look for another way within the cluster
+                    dist, prev = clusterSearch(previous, self.members[self.clusterOf[previous]], network, node)
+                    segment = tracePath(previous, node, prev) if node in dist else None
+            if segment is None:
+                return None
+            path = path + segment
+            previous = node
+        return path
+
+### Dijkstra's algorithm from node source over network (anything with getNeighbors()), staying within the nodes in members.
+### Stops early once goal (if not None) is reached. Returns the distance to every node reached and the node before it.
+def clusterSearch(source, members, network, goal = None):
+    dist = {source: 0}
+    prev = {}
+    heap = [(0, source)]
+    done = set()
+    while heap:
+        d, current = heapq.heappop(heap)
+        if current in done:
+            continue
+        done.add(current)
+        if current == goal:
+            break
+        for neighbor in network.getNeighbors(current):
+            if neighbor in members:
+                nd = d + distance(current, neighbor)
+                if neighbor not in dist or nd < dist[neighbor]:
+                    dist[neighbor] = nd
+                    prev[neighbor] = current
+                    heapq.heappush(heap, (nd, neighbor))
+    return dist, prev
+
+### The path from source to node (not including source) following prev
+def tracePath(source, node, prev):
+    path = []
+    while node != source:
+        path.append(node)
+        node = prev[node]
+    path.reverse()
+    return path
+
+### True if every step of path (starting after source) is an edge of network
+def pathFollowsNetwork(source, path, network):
+    previous = source
+    for node in path:
+        if node not in network.getNeighbors(previous):
+            return False
+        previous = node
+    return True
+
+### A* over the abstract graph (dictionary from node to a list of (node, cost)) plus the edges in extra. Returns the abstract
+### nodes from start to end (not including start), or None if end can't be reached.
+def abstractSearch(start, end, abstract, extra):
+    dist = {start: 0}
+    prev = {}
+    heap = [(distance(start, end), start)]
+    closed = set()
+    while heap:
+        f, current = heapq.heappop(heap)
+        if current in closed:
+            continue
+        if current == end:
+            return tracePath(start, end, prev)
+        closed.add(current)
+        for edges in (abstract.get(current, ()), extra.get(current, ())):
+            for neighbor, cost in edges:
+                if neighbor in closed:
+                    continue
+                d = dist[current] + cost
+                if neighbor not in dist or d < dist[neighbor]:
+                    dist[neighbor] = d
+                    prev[neighbor] = current
+                    heapq.heappush(heap, (d + distance(neighbor, end), neighbor))
+    return None
@@ -0,0 +1,151 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import math, random
+
+from constants import *
+from triangulation import orientation
+
+############################
+### MAPS
+###
+### The terrain used by the competition run scripts, so that other tools (e.g., navmeshcache.py) can find them.
+### Each map is a dictionary with:
+### dims: the size of the world (width, height)
+### obstacles: list of obstacle polygons
+### player: the sprite of the player agent (GameWorld.agent). Its radius is used by the path network builder.
+### Besides the competition maps there are generated maps of several sizes (see generateMap), for benchmarks.
+
+### Flip polygons through the center of the world
+def mirrorPolygons(polys, dims):
+	return map(lambda poly: map(lambda point: (dims[0]-point[0], dims[1]-point[1]), poly), polys)
+
+### Rotate polygons 90 degrees around the center of the world
+def rotatePolygons(polys, dims):
+	return map(lambda poly: map(lambda point: (dims[0]-point[1], point[0]), poly), polys)
+
+CENTEROBSTACLE = [(550, 570), (600, 550), (660, 570), (650, 630), (600, 650), (540, 630)]
+
+def heroMap():
+	dims = (1200, 1200)
+	obstacles = [[(250, 150), (600, 200), (550, 350), (260, 390)],
+				 [(800, 200), (1040, 140), (1050, 160), (1025, 500), (1000, 500), (810, 310)]]
+	obstacles = obstacles + mirrorPolygons(obstacles, dims)
+	obstacles = obstacles + [CENTEROBSTACLE]
+	return {'dims': dims, 'obstacles': obstacles, 'player': ELITE}
+
+### Homework 5 runmoba.py and runmobacompetition.py
+def mobaMap1():
+	dims = (1200, 1200)
+	obstacles = [[(400, 100), (1100, 100), (1100, 800), (1010, 875), (990, 875), (900, 750), (900, 500), (700, 300), (450, 300), (325, 210), (325, 190)]]
+	obstacles = obstacles + mirrorPolygons(obstacles, dims)
+	obstacles = obstacles + [CENTEROBSTACLE]
+	return {'dims': dims, 'obstacles': obstacles, 'player': AGENT}
+
+### Homework 5 runmoba2.py and runmobacompetition2.py
+def mobaMap2():
+	dims = (1200, 1200)
+	obstacles = [[(400, 100), (800, 100), (1100, 400), (1100, 800), (1010, 875), (990, 875), (900, 750), (900, 500), (700, 300), (450, 300), (325, 210), (325, 190)],
+				 [(1195, 5), (1195, 205), (1025, 135), (995, 5)]]
+	obstacles = obstacles + mirrorPolygons(obstacles, dims)
+	obstacles = obstacles + [CENTEROBSTACLE]
+	return {'dims': dims, 'obstacles': obstacles, 'player': AGENT}
+
+### Homework 5 runmoba3.py, runmoba4.py, runmobacompetition3.py and runmobacompetition4.py
+def mobaMap3():
+	dims = (1200, 1200)
+	obstacles = [[(400, 100), (800, 100), (1100, 400), (1100, 800), (1010, 875), (990, 875), (900, 750), (900, 500), (700, 300), (450, 300), (325, 210), (325, 190)]]
+	obstacles = rotatePolygons(obstacles, dims)
+	obstacles = obstacles + mirrorPolygons(obstacles, dims)
+	obstacles = obstacles + [CENTEROBSTACLE]
+	return {'dims': dims, 'obstacles': obstacles, 'player': AGENT}
+
+MAPS = {'hero': heroMap, 'moba1': mobaMap1, 'moba2': mobaMap2, 'moba3': mobaMap3}
+
+### Generated maps: name -> (dims, density, seed). Cells are GENERATEDCELLSIZE wide and obstacles keep GENERATEDCLEARANCE apart,
+### enough for an agent to get between any two of them.
+GENERATEDCELLSIZE = 150
+GENERATEDCLEARANCE = 60
+GENERATEDMAPS = {'gen1200': ((1200, 1200), 0.6, SEED), 'gen2400': ((2400, 2400), 0.7, SEED), 'gen3600': ((3600, 3600), 0.7, SEED), 'gen4800': ((4800, 4800), 0.8, SEED)}
+
+def getMap(name):
+	if name in GENERATEDMAPS:
+		dims, density, seed = GENERATEDMAPS[name]
+		return generateMap(dims, density, seed, GENERATEDCELLSIZE, 8, GENERATEDCLEARANCE)
+	return MAPS[name]()
+
+### The competition maps
+def getMapNames():
+	return sorted(MAPS.keys())
+
+### The generated maps, smallest first
+def getGeneratedMapNames():
+	return sorted(GENERATEDMAPS.keys(), key = lambda name: GENERATEDMAPS[name][0])
+
+############################
+### Map generator
+
+### A map of dims with random obstacles (see generateObstacles). The cells are centered in the map with a margin, so that
+### obstacles are at least clearance from the edges of the map too. The same arguments always make the same map.
+def generateMap(dims, density = 0.8, seed = SEED, cellSize = 100, maxSides = 8, clearance = None):
+	if clearance is None:
+		clearance = cellSize / 10.0
+	r = random.Random(seed)
+	columns = int((dims[0] - clearance) / cellSize)
+	rows = int((dims[1] - clearance) / cellSize)
+	origin = ((dims[0] - columns * cellSize) / 2, (dims[1] - rows * cellSize) / 2)
+	obstacles = generateObstacles(r, columns, rows, cellSize, density, maxSides, clearance, origin)
+	return {'dims': dims, 'obstacles': obstacles, 'player': AGENT}
+
+### Random obstacles in a grid of columns x rows cells of cellSize starting at origin, drawing from r (a random.Random).
+### Each cell has an obstacle with probability density. An obstacle is a convex polygon of 3 to maxSides points around the
+### middle of its cell, at least clearance/2 inside the cell (clearance defaults to a tenth of a cell), so obstacles never
+### overlap and are at least clearance apart.
+def generateObstacles(r, columns, rows, cellSize, density = 0.8, maxSides = 8, clearance = None, origin = (0, 0)):
+	if clearance is None:
+		clearance = cellSize / 10.0
+	maxRadius = cellSize / 2.0 - clearance / 2.0
+	minRadius = min(cellSize * 0.2, maxRadius)
+	obstacles = []
+	for i in xrange(columns):
+		for j in xrange(rows):
+			if r.random() < 1.0 - density:
+				continue
+			center = (origin[0] + i * cellSize + cellSize / 2, origin[1] + j * cellSize + cellSize / 2)
+			obstacles.append(randomConvexPolygon(r, center, minRadius, maxRadius, maxSides))
+	return obstacles
+
+### A random convex polygon of 3 to maxSides points (integers) around center, each between minRadius and maxRadius from it.
+### Tries again until the polygon is convex.
+def randomConvexPolygon(r, center, minRadius, maxRadius, maxSides):
+	while True:
+		while True:
+			angles = sorted([r.uniform(0, 2 * math.pi) for _ in xrange(r.randint(3, maxSides))])
+			gaps = [b - a for a, b in zip(angles, angles[1:] + [angles[0] + 2 * math.pi])]
+			# The center is inside the polygon
+			if max(gaps) < math.pi * 0.9:
+				break
+		poly = []
+		for a in angles:
+			radius = r.uniform(minRadius, maxRadius)
+			p = (int(center[0] + radius * math.cos(a)), int(center[1] + radius * math.sin(a)))
+			if p not in poly:
+				poly.append(p)
+		# Rounding can make points turn back on themselves
+		if len(poly) >= 3 and all([orientation(poly[k - 2], poly[k - 1], poly[k]) > 0 for k in xrange(len(poly))]):
+			return poly
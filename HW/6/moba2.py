@@ -243,7 +243,8 @@ class Hero(MOBAAgent):
 	def areaEffect(self):
 		if self.canareaeffect:
 			self.canareaeffect = False
-			pygame.draw.circle(self.world.background, (255, 0, 0), (int(self.getLocation()[0]), int(self.getLocation()[1])), int(self.getMaxRadius()*AREAEFFECTRANGE), 1)
+			if not self.world.headless:
+				pygame.draw.circle(self.world.background, (255, 0, 0), (int(self.getLocation()[0]), int(self.getLocation()[1])), int(self.getMaxRadius()*AREAEFFECTRANGE), 1)
 			for x in self.world.getEnemyNPCs(self.getTeam()) + self.world.getEnemyBases(self.getTeam()) + self.world.getEnemyTowers(self.getTeam()):
 				if distance(self.getLocation(), x.getLocation()) < (self.getMaxRadius()*AREAEFFECTRANGE)+(x.getRadius()):
 					x.lastDamagedBy = self
@@ -376,14 +377,17 @@ class Base(Mover):
 			targets = []
 			minions = []
 			heros = []
+			candidates = []
 			for npc in self.world.npcs + [self.world.agent]:
 				if npc.getTeam() == None or npc.getTeam() != self.getTeam() and distance(self.getLocation(), npc.getLocation()) < BASEBULLETRANGE:
-					hit = rayTraceWorld(self.getLocation(), npc.getLocation(), self.world.getLines())
-					if hit == None:
-						if isinstance(npc, Minion):
-							minions.append(npc)
-						elif isinstance(npc, Hero):
-							heros.append(npc)
+					candidates.append(npc)
+			clear = self.world.linesOfSight(self.getLocation(), [npc.getLocation() for npc in candidates])
+			for npc, c in zip(candidates, clear):
+				if c:
+					if isinstance(npc, Minion):
+						minions.append(npc)
+					elif isinstance(npc, Hero):
+						heros.append(npc)
 			minions = sorted(minions, key=lambda x: distance(self.getLocation(), x.getLocation()))
 			heros = sorted(heros, key=lambda x: distance(self.getLocation(), x.getLocation()))
 			targets = minions + heros
@@ -485,14 +489,17 @@ class Tower(Mover):
 			targets = []
 			minions = []
 			heros = []
+			candidates = []
 			for npc in self.world.npcs + [self.world.agent]:
 				if npc.getTeam() == None or npc.getTeam() != self.getTeam() and distance(self.getLocation(), npc.getLocation()) < TOWERBULLETRANGE:
-					hit = rayTraceWorld(self.getLocation(), npc.getLocation(), self.world.getLines())
-					if hit == None:
-						if isinstance(npc, Minion):
-							minions.append(npc)
-						elif isinstance(npc, Hero):
-							heros.append(npc)
+					candidates.append(npc)
+			clear = self.world.linesOfSight(self.getLocation(), [npc.getLocation() for npc in candidates])
+			for npc, c in zip(candidates, clear):
+				if c:
+					if isinstance(npc, Minion):
+						minions.append(npc)
+					elif isinstance(npc, Hero):
+						heros.append(npc)
 			minions = sorted(minions, key=lambda x: distance(self.getLocation(), x.getLocation()))
 			heros = sorted(heros, key=lambda x: distance(self.getLocation(), x.getLocation()))
 			targets = minions + heros
@@ -523,8 +530,8 @@ class MOBAWorld(GatedWorld):
 	### towers: the towers (many per team)
 	### score: dictionary with team symbol as key and team score as value. Score is amount of damage done to the hero.
 	
-	def __init__(self, seed, worlddimensions, screendimensions, numgates, alarm):
-		GatedWorld.__init__(self, seed, worlddimensions, screendimensions, numgates, alarm)
+	def __init__(self, seed, worlddimensions, screendimensions, numgates, alarm, headless = False):
+		GatedWorld.__init__(self, seed, worlddimensions, screendimensions, numgates, alarm, headless)
 		self.bases = []
 		self.towers = []
 		self.score = {}
@@ -534,6 +541,7 @@ class MOBAWorld(GatedWorld):
 		if self.sprites is not None:
 			self.sprites.add(base)
 		self.movers.append(base)
+		self.moverIndex.insert(base, rectBox(base.rect))
 	
 	def deleteBase(self, base):
 		if base in self.bases:
@@ -541,6 +549,7 @@ class MOBAWorld(GatedWorld):
 			if self.sprites is not None:
 				self.sprites.remove(base)
 			self.movers.remove(base)
+			self.moverIndex.remove(base)
 	
 	
 	def addTower(self, tower):
@@ -548,6 +557,7 @@ class MOBAWorld(GatedWorld):
 		if self.sprites is not None:
 			self.sprites.add(tower)
 		self.movers.append(tower)
+		self.moverIndex.insert(tower, rectBox(tower.rect))
 			
 	def deleteTower(self, tower):
 		if tower in self.towers:
@@ -555,6 +565,7 @@ class MOBAWorld(GatedWorld):
 			if self.sprites is not None:
 				self.sprites.remove(tower)
 			self.movers.remove(tower)
+			self.moverIndex.remove(tower)
 
 	def getBases(self):
 		return list(self.bases)
@@ -631,3 +642,16 @@ class MOBAWorld(GatedWorld):
 				self.score[team] = 0
 			return self.score[team]
 		return 0
+
+	### Adds the score and the surviving bases and towers
+	def getState(self):
+		state = GatedWorld.getState(self)
+		state['score'] = dict(self.score)
+		state['bases'] = [(b.getTeam(), b.getHitpoints()) for b in self.bases]
+		state['towers'] = [(t.getTeam(), t.getLocation(), t.getHitpoints()) for t in self.towers]
+		state['heroes'] = [(h.getTeam(), h.getLocation(), h.getHitpoints()) for h in self.getNPCs() if isinstance(h, Hero)]
+		return state
+
+	### True when at most one team has a base left
+	def isGameOver(self):
+		return len(set([b.getTeam() for b in self.bases])) < 2
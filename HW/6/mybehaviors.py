@@ -511,7 +511,7 @@ class UpdatedKillHero(BTNode):
 
 	def execute(self, delta = 0):
 		BTNode.execute(self, delta)
-		if not self.target or distance(self.agent.getLocation(), self.target.getLocation()) > BIGBULLETRANGE or rayTraceWorld(self.agent.getLocation(), self.target.getLocation(), self.agent.world.getLines()): return False
+		if not self.target or distance(self.agent.getLocation(), self.target.getLocation()) > BIGBULLETRANGE or rayTraceWorld(self.agent.getLocation(), self.target.getLocation(), self.agent.world.getLineArray()): return False
 		elif not self.target.isAlive(): return True
 		else:
 			closest = min(self.agent.world.getEnemyNPCs(self.agent.getTeam()), key = lambda e:distance(self.agent.getLocation(), e.getLocation()))
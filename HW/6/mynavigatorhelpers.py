@@ -29,11 +29,254 @@ from core import *
 ### path: the path previously computed by the A* algorithm
 ### world: pointer to the world
 def shortcutPath(source, dest, path, world, agent):
-	return path
+	nav = agent.navigator
+	if not FUNNELSMOOTHING or not isinstance(nav, NavMeshNavigator):
+		return path
+	# The agent turns for the next corner as soon as it is within half its radius of a corner, so corners keep that much further away
+	radius = agent.getMaxRadius()
+	taut = funnelPath(nav, source, dest, path, radius, radius * 1.5)
+	if taut is None:
+		return path
+	# Every leg of the new path is known to be clear until the gates change
+	nav.clearVersion = gateVersion(world)
+	return taut
 
 ### This function changes the move target of the agent if there is an opportunity to walk a shorter path.
 ### This function should call nav.agent.moveToTarget() if an opportunity exists and may also need to modify nav.path.
 ### nav: the navigator object
 ### This function returns True if the moveTarget and/or path is modified and False otherwise
 def mySmooth(nav):
-	return False
\ No newline at end of file
+	# Paths from shortcutPath are already taut through their corridor and the agent walks them leg by leg, so there's nothing
+	# left to cut: skipping a corner would cut the obstacle corner it wraps around.
+	return False
+
+
+### True if every leg of the navigator's path was known to be clear when it was planned and the gates haven't changed since
+def pathIsClear(nav):
+	return getattr(nav, 'clearVersion', None) is not None and nav.clearVersion == gateVersion(nav.world)
+
+### The world's gate version, or 0 for worlds without gates
+def gateVersion(world):
+	if isinstance(world, GatedWorld):
+		return world.getGateVersion()
+	return 0
+
+############################
+### Funnel smoothing
+###
+### A path found by A* on the path network runs through a corridor of nav mesh polygons. Every polygon is convex and free of
+### obstacles, so any line that only crosses from one polygon of the corridor to the next through the edges they share (portals)
+### is free of obstacles too. The shortest such line bends only at portal endpoints; it is found by the simple stupid funnel
+### algorithm, which sweeps a funnel from the last corner through the portals, in time linear in the length of the corridor.
+### Portals are shrunk at each end so that corners keep away from the obstacle points they wrap around.
+### Legs that still pass within the agent's radius of a corridor polygon's corner get extra corners (see keepClearance). Every
+### corner added that way is checked to keep its legs inside the corridor, so the path never needs to be checked against the
+### whole world: only the lines near each leg that aren't nav mesh edges (gates) are ray traced, found with the world's line index.
+
+### Returns the taut path from source to dest through the nav mesh polygons that path passes through, not including source,
+### or None if path doesn't follow the nav mesh, the taut path can't keep radius from the corridor's corners, or it crosses a
+### line that isn't part of the nav mesh (such as a gate).
+### nav: a NavMeshNavigator
+### radius: how far from obstacle points the path should keep
+### clearance: how far from obstacle points to put corners (at least radius)
+def funnelPath(nav, source, dest, path, radius, clearance):
+	graph = nav.getNavMeshGraph()
+	if graph is None:
+		return None
+	corridor = navMeshCorridor(graph, source, dest, path)
+	if corridor is None:
+		return None
+	portals = []
+	for i in xrange(len(corridor) - 1):
+		portals.append(orientPortal(graph, corridor[i], graph.getPortal(corridor[i], corridor[i + 1])))
+	corners = stringPull(source, dest, [shrinkPortal(portal, clearance) for portal in portals])
+	points = keepClearance(graph, corridor, [source] + corners + [dest], radius, clearance)
+	# The nav mesh doesn't know about gates
+	if points is None or crossesBlockingLine(nav.world, graph, points):
+		return None
+	if len(points) > 2:
+		return points[1:-1]
+	return [dest]
+
+### The indices of the nav mesh polygons that a path from source through the path nodes of path to dest passes through,
+### each one next to the one before, or None if the points can't be connected that way.
+### A polygon is only left when the next point isn't in it, so a path node on a portal doesn't decide which side the corridor is on.
+def navMeshCorridor(graph, source, dest, path):
+	current = graph.findPolygon(source)
+	if current is None:
+		return None
+	corridor = [current]
+	for point in path + [dest]:
+		steps = corridorSteps(graph, corridor[-1], point)
+		if steps is None:
+			return None
+		for polygon in steps:
+			if polygon in corridor:
+				# Went around in a loop
+				del corridor[corridor.index(polygon) + 1:]
+			else:
+				corridor.append(polygon)
+	return corridor
+
+### The polygons to go through to get from polygon current to one that holds point: none, a neighbor, or a neighbor and one of its neighbors.
+### None if point is further away than that.
+def corridorSteps(graph, current, point):
+	if graph.polygonContains(current, point):
+		return []
+	containing = graph.polygonsContaining(point)
+	neighbors = graph.getNeighbors(current)
+	for other, portal in neighbors:
+		if other in containing:
+			return [other]
+	for polygon in containing:
+		for other, portal in neighbors:
+			if graph.getPortal(other, polygon) is not None:
+				return [other, polygon]
+	return None
+
+### Twice the area of the triangle a, b, c; positive if c is to the left of the line from a to b (on screen, y pointing down)
+def triangleArea2(a, b, c):
+	return (c[0] - a[0]) * (b[1] - a[1]) - (b[0] - a[0]) * (c[1] - a[1])
+
+### The portal out of polygon as (left, right), as seen walking out of the polygon.
+### Polygon i's points go around it counterclockwise (numerically) if graph.turns[i] is 1, so its interior is to the left of its
+### edges numerically, which is to the right on screen.
+def orientPortal(graph, polygon, portal):
+	if graph.turns[polygon] > 0:
+		return (portal[1], portal[0])
+	return portal
+
+### The portal moved in by radius at each end, or its midpoint if it is too short for that
+def shrinkPortal(portal, radius):
+	left, right = portal
+	length = distance(left, right)
+	if length <= 2 * radius:
+		middle = ((left[0] + right[0]) / 2.0, (left[1] + right[1]) / 2.0)
+		return (middle, middle)
+	dx = (right[0] - left[0]) * radius / length
+	dy = (right[1] - left[1]) * radius / length
+	return ((left[0] + dx, left[1] + dy), (right[0] - dx, right[1] - dy))
+
+### The simple stupid funnel algorithm. Returns the corners of the shortest path from source to dest through portals,
+### a list of (left, right) pairs in order, not including source and dest.
+### The funnel is the apex (the last corner) and the left and right sides of the portals so far. Each portal narrows the funnel;
+### when one side crosses over the other, the other side's endpoint becomes a corner and the sweep restarts from the portal it came from.
+def stringPull(source, dest, portals):
+	portals = portals + [(dest, dest)]
+	corners = []
+	apex = left = right = source
+	apexIndex = leftIndex = rightIndex = -1
+	i = 0
+	while i < len(portals):
+		nextLeft, nextRight = portals[i]
+		# Narrow the right side
+		if triangleArea2(apex, right, nextRight) <= 0:
+			if apex == right or triangleArea2(apex, left, nextRight) > 0:
+				right = nextRight
+				rightIndex = i
+			else:
+				# Right crossed over left: left is a corner
+				corners.append(left)
+				apex = right = left
+				apexIndex = rightIndex = leftIndex
+				i = apexIndex + 1
+				continue
+		# Narrow the left side
+		if triangleArea2(apex, left, nextLeft) >= 0:
+			if apex == left or triangleArea2(apex, right, nextLeft) < 0:
+				left = nextLeft
+				leftIndex = i
+			else:
+				# Left crossed over right: right is a corner
+				corners.append(right)
+				apex = left = right
+				apexIndex = leftIndex = rightIndex
+				i = apexIndex + 1
+				continue
+		i = i + 1
+	if len(corners) > 0 and corners[-1] == dest:
+		corners.pop()
+	return corners
+
+### True if a leg of the path through points crosses a world line that isn't a nav mesh edge (such as a gate). Only the lines
+### the world's line index has around each leg are ray traced.
+def crossesBlockingLine(world, graph, points):
+	index = world.getLineIndex()
+	for i in xrange(len(points) - 1):
+		for l in index.query(lineBox((points[i], points[i + 1]), EPSILON)).itervalues():
+			if not graph.isEdge(l[0], l[1]) and rayTraceNoEndpoints(points[i], points[i + 1], l) is not None:
+				return True
+	return False
+
+### Moves the path away from any corner of the corridor polygons closer than radius to the middle of one of its legs, by adding
+### a corner clearance away from the point. Returns None if that takes more than depth added corners per leg, or if an added
+### corner would take a leg out of the corridor.
+def keepClearance(graph, corridor, points, radius, clearance, depth = 2):
+	vertices = numpy.array([p for i in corridor for p in graph.getPolygon(i)], dtype=numpy.float64).reshape((-1, 2))
+	walls = corridorWalls(graph, corridor)
+	result = [points[0]]
+	for i in xrange(len(points) - 1):
+		leg = clearLeg(vertices, walls, points[i], points[i + 1], radius, clearance, depth)
+		if leg is None:
+			return None
+		result = result + leg
+	return result
+
+### The edges of the corridor polygons that aren't shared by two of them, one row (x1, y1, x2, y2) each: obstacle edges, and
+### portals to polygons outside the corridor. A line between two points of the corridor that crosses none of them stays in it.
+def corridorWalls(graph, corridor):
+	inside = set(corridor)
+	walls = []
+	for i in corridor:
+		polygon = graph.getPolygon(i)
+		for j in xrange(len(polygon)):
+			p = polygon[j - 1]
+			q = polygon[j]
+			owners = graph.edges[(p, q) if p < q else (q, p)]
+			if not any([other != i and other in inside for other in owners]):
+				walls.append((p[0], p[1], q[0], q[1]))
+	return numpy.array(walls, dtype=numpy.float64).reshape((-1, 4))
+
+### True if the line from a to b crosses any of walls (touching one doesn't count)
+def crossesWalls(a, b, walls):
+	x1 = walls[:, 0]
+	y1 = walls[:, 1]
+	x2 = walls[:, 2]
+	y2 = walls[:, 3]
+	# Which side of the line each end of each wall is on, and which side of each wall a and b are on
+	side1 = (b[0] - a[0]) * (y1 - a[1]) - (b[1] - a[1]) * (x1 - a[0])
+	side2 = (b[0] - a[0]) * (y2 - a[1]) - (b[1] - a[1]) * (x2 - a[0])
+	sideA = (x2 - x1) * (a[1] - y1) - (y2 - y1) * (a[0] - x1)
+	sideB = (x2 - x1) * (b[1] - y1) - (y2 - y1) * (b[0] - x1)
+	return bool(((side1 * side2 < 0) & (sideA * sideB < 0)).any())
+
+### The points after start of a path from start to end inside the corridor that keeps radius away from the corridor's corners
+### (vertices, an n x 2 numpy array), or None if there isn't one with at most depth added corners.
+### walls: the corridor's walls (see corridorWalls). Added corners must not take a leg across them.
+def clearLeg(vertices, walls, start, end, radius, clearance, depth):
+	dx = end[0] - start[0]
+	dy = end[1] - start[1]
+	if (dx == 0 and dy == 0) or len(vertices) == 0:
+		return [end]
+	# Where the closest point on the line to each corner is (0 at start, 1 at end), and how far away
+	t = ((vertices[:, 0] - start[0]) * dx + (vertices[:, 1] - start[1]) * dy) / float(dx * dx + dy * dy)
+	footX = start[0] + t * dx
+	footY = start[1] + t * dy
+	distances = numpy.hypot(vertices[:, 0] - footX, vertices[:, 1] - footY)
+	near = (t > 0) & (t < 1) & (distances < radius)
+	if not near.any():
+		return [end]
+	i = int(numpy.argmin(numpy.where(near, distances, INFINITY)))
+	if depth == 0 or distances[i] == 0:
+		return None
+	point = vertices[i]
+	# Push the closest point on the leg out to clearance away
+	scale = clearance / distances[i]
+	corner = (float(point[0] + (footX[i] - point[0]) * scale), float(point[1] + (footY[i] - point[1]) * scale))
+	if crossesWalls(start, corner, walls) or crossesWalls(corner, end, walls):
+		return None
+	first = clearLeg(vertices, walls, start, corner, radius, clearance, depth - 1)
+	second = clearLeg(vertices, walls, corner, end, radius, clearance, depth - 1)
+	if first is None or second is None:
+		return None
+	return first + second
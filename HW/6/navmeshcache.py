@@ -0,0 +1,255 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import sys, os, numpy, hashlib
+
+from constants import *
+
+############################
+### NAV MESH CACHE
+###
+### Stores the path nodes, path network and nav mesh built by a NavMeshNavigator on disk, so that a terrain only has to be processed once.
+### A cache file is keyed by a hash of:
+### - the world dimensions and every obstacle polygon (any terrain change is a different key)
+### - the max radius of the world's agent and the navigator's agent (the builders use it for clearance)
+### - the navigator class and the source code of the modules that build the network, including utils and constants (changing the
+###   builder is a different key)
+### Cache files go in NAVMESHCACHEDIR, next to this file unless it is an absolute path.
+###
+### Files are compressed numpy archives (.npz). Every distinct point is stored once; nodes, edges and polygons are stored as indices into the point table.
+### A navigator can store more numpy arrays with its path network (see NavMeshNavigator.getCacheTables), such as precomputed shortest paths.
+###
+### How to use this file:
+### python navmeshcache.py                 prebuild the cache for every map in maps.py, for the A* and APSP navigators
+### python navmeshcache.py hero moba1      prebuild the cache for some maps
+### python navmeshcache.py --clear         delete every cache file
+
+NAVMESHCACHEFORMAT = 1
+
+# Modules (besides the ones defining the navigator class) whose source is part of the cache key.
+NAVMESHSOURCEMODULES = ['mycreatepathnetwork', 'triangulation', 'navmeshgraph', 'utils', 'constants']
+
+sourceHashes = {}
+
+### Hash of the source files of the modules involved in building a navigator's path network
+def navigatorSourceHash(nav):
+	names = []
+	for cls in type(nav).__mro__:
+		if cls.__module__ not in names:
+			names.append(cls.__module__)
+	for name in NAVMESHSOURCEMODULES:
+		if name not in names:
+			names.append(name)
+	h = hashlib.sha1()
+	for name in names:
+		module = sys.modules.get(name)
+		filename = getattr(module, '__file__', None)
+		if filename is None:
+			continue
+		if filename.endswith('.pyc') or filename.endswith('.pyo'):
+			if os.path.exists(filename[:-1]):
+				filename = filename[:-1]
+		if filename not in sourceHashes:
+			f = open(filename, 'rb')
+			sourceHashes[filename] = hashlib.sha1(f.read()).hexdigest()
+			f.close()
+		h.update(name)
+		h.update(sourceHashes[filename])
+	return h.hexdigest()
+
+### The cache key for a navigator in a world
+def terrainHash(world, nav = None):
+	h = hashlib.sha1()
+	h.update('format %d\n' % NAVMESHCACHEFORMAT)
+	h.update('dims %r\n' % (tuple(world.getDimensions()),))
+	for o in world.getObstacles() or []:
+		h.update('obstacle %r\n' % (tuple(map(tuple, o.getPoints())),))
+	if world.getAgent() is not None:
+		h.update('world agent %r\n' % (world.getAgent().getMaxRadius(),))
+	if nav is not None:
+		if nav.agent is not None:
+			h.update('agent %r\n' % (nav.agent.getMaxRadius(),))
+		h.update('navigator %s.%s\n' % (type(nav).__module__, type(nav).__name__))
+		h.update('source %s\n' % navigatorSourceHash(nav))
+	return h.hexdigest()
+
+### NAVMESHCACHEDIR, relative to the directory of this file rather than to wherever the game is run from
+def cacheDirectory():
+	return os.path.join(os.path.dirname(os.path.abspath(__file__)), NAVMESHCACHEDIR)
+
+def cacheFilename(key):
+	return os.path.join(cacheDirectory(), key + '.npz')
+
+############################
+### Packing
+
+class PointTable(object):
+
+	### points: numpy-ready list of (x, y)
+	### ints: for each point, whether x and y were ints (so the exact same values come back out)
+	### index: dictionary from (x, y, ints) to the point's row
+
+	def __init__(self):
+		self.points = []
+		self.ints = []
+		self.index = {}
+
+	def add(self, p):
+		flags = (isinstance(p[0], (int, long)), isinstance(p[1], (int, long)))
+		key = (p[0], p[1], flags)
+		if key not in self.index:
+			self.index[key] = len(self.points)
+			self.points.append((p[0], p[1]))
+			self.ints.append(flags)
+		return self.index[key]
+
+def unpackPoint(p, ints):
+	x = int(p[0]) if ints[0] else float(p[0])
+	y = int(p[1]) if ints[1] else float(p[1])
+	return (x, y)
+
+### Write nodes, edges and polygons to the cache file for key, with tables (dictionary from name to numpy array)
+def savePathNetworkCache(key, nodes, edges, polys, tables = None):
+	table = PointTable()
+	nodeIndices = [table.add(n) for n in nodes or []]
+	edgeIndices = [(table.add(e[0]), table.add(e[1])) for e in edges or []]
+	polyIndices = []
+	polyLengths = []
+	for poly in polys or []:
+		polyLengths.append(len(poly))
+		for p in poly:
+			polyIndices.append(table.add(p))
+	if not os.path.isdir(cacheDirectory()):
+		os.makedirs(cacheDirectory())
+	filename = cacheFilename(key)
+	temp = filename + '.%d.tmp' % os.getpid()
+	extra = {}
+	for name, array in (tables or {}).items():
+		extra['table_' + name] = array
+	f = open(temp, 'wb')
+	numpy.savez_compressed(f,
+		points = numpy.array(table.points, dtype=numpy.float64).reshape((-1, 2)),
+		ints = numpy.array(table.ints, dtype=numpy.bool_).reshape((-1, 2)),
+		nodes = numpy.array(nodeIndices, dtype=numpy.int32),
+		edges = numpy.array(edgeIndices, dtype=numpy.int32).reshape((-1, 2)),
+		polys = numpy.array(polyIndices, dtype=numpy.int32),
+		polylengths = numpy.array(polyLengths, dtype=numpy.int32),
+		flags = numpy.array([nodes is not None, edges is not None, polys is not None], dtype=numpy.bool_),
+		**extra)
+	f.close()
+	# Atomic so that a reader never sees half a file
+	os.rename(temp, filename)
+	return filename
+
+### Read (nodes, edges, polygons, tables) from the cache file for key. Returns None if there is no usable cache file.
+def loadPathNetworkCache(key):
+	filename = cacheFilename(key)
+	if not os.path.exists(filename):
+		return None
+	try:
+		data = numpy.load(filename)
+		points = [unpackPoint(p, i) for p, i in zip(data['points'].tolist(), data['ints'].tolist())]
+		flags = data['flags'].tolist()
+		nodes = [points[i] for i in data['nodes'].tolist()]
+		edges = [(points[a], points[b]) for a, b in data['edges'].tolist()]
+		polys = []
+		indices = data['polys'].tolist()
+		start = 0
+		for length in data['polylengths'].tolist():
+			polys.append([points[i] for i in indices[start:start+length]])
+			start = start + length
+		tables = {}
+		for name in data.files:
+			if name.startswith('table_'):
+				tables[name[len('table_'):]] = data[name]
+		data.close()
+	except Exception as e:
+		print "Ignoring unreadable nav mesh cache file", filename, e
+		return None
+	if not flags[0]:
+		nodes = None
+	if not flags[1]:
+		edges = None
+	if not flags[2]:
+		polys = None
+	return nodes, edges, polys, tables
+
+### Fill in a navigator's path network from the cache. Returns True if the cache was used.
+def loadPathNetwork(nav, world):
+	cached = loadPathNetworkCache(terrainHash(world, nav))
+	if cached is None:
+		return False
+	nav.pathnodes, nav.pathnetwork, nav.navmesh, tables = cached
+	return nav.setCacheTables(tables)
+
+### Store a navigator's path network in the cache
+def savePathNetwork(nav, world):
+	return savePathNetworkCache(terrainHash(world, nav), nav.pathnodes, nav.pathnetwork, nav.navmesh, nav.getCacheTables())
+
+def clearPathNetworkCache():
+	count = 0
+	directory = cacheDirectory()
+	if os.path.isdir(directory):
+		for filename in os.listdir(directory):
+			if filename.endswith('.npz') or filename.endswith('.tmp'):
+				os.remove(os.path.join(directory, filename))
+				count = count + 1
+	return count
+
+
+############################
+### Prebuild caches for the maps in maps.py
+
+def prebuild(names, navigatorclass):
+	import time
+	from core import GameWorld, GhostAgent, Navigator
+	from maps import getMap
+	for name in names:
+		m = getMap(name)
+		world = GameWorld(SEED, m['dims'], m['dims'])
+		agent = GhostAgent(m['player'], (m['dims'][0]/2, m['dims'][1]/2), 0, SPEED, world)
+		world.setPlayerAgent(agent)
+		world.initializeTerrain(m['obstacles'], (0, 0, 0), 4)
+		agent.setNavigator(Navigator())
+		nav = navigatorclass()
+		nav.agent = agent
+		key = terrainHash(world, nav)
+		if loadPathNetworkCache(key) is not None:
+			print name, navigatorclass.__name__, "already cached", cacheFilename(key)
+			continue
+		start = time.time()
+		nav.createPathNetwork(world)
+		filename = savePathNetwork(nav, world)
+		print name, navigatorclass.__name__, "built in %.2fs" % (time.time() - start), filename
+
+
+if __name__ == '__main__':
+	os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+	args = sys.argv[1:]
+	if '--clear' in args:
+		print "Removed", clearPathNetworkCache(), "cache files"
+		args.remove('--clear')
+		if len(args) == 0:
+			sys.exit(0)
+	from maps import getMapNames
+	from astarnavigator import AStarNavigator
+	from apspnavigator import APSPNavigator
+	if len(args) == 0:
+		args = getMapNames()
+	prebuild(args, AStarNavigator)
+	prebuild(args, APSPNavigator)
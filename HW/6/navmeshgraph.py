@@ -0,0 +1,164 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import math, numpy
+
+from constants import *
+from utils import *
+from spatialhash import *
+
+############################
+### NavMeshGraph
+###
+### The polygons of a nav mesh with their adjacency: for each polygon, the polygons it shares an edge with and the shared edges
+### (portals). Shared edges are found with a dictionary from edge to polygons, so building the graph is linear in the number
+### of polygon edges.
+### Polygons are also kept in a SpatialHash of their bounding boxes, so the polygon containing a point is found by testing the
+### few polygons in the point's cell, each in time logarithmic in its number of points (the polygons must be convex).
+### Polygons are referred to by their index in the polygon list.
+
+class NavMeshGraph(object):
+
+	### polygons: the nav mesh polygons (lists of points)
+	### neighbors: for each polygon, a list of (neighbor index, portal), in the order of the polygon's edges. A portal is the shared
+	###   edge as a pair of points, in the order they appear in the polygon.
+	### portals: dictionary from (polygon index, neighbor index) to the portal between them, as it appears in the first polygon
+	### edges: dictionary from every polygon edge (p, q), with p < q, to the indices of the polygons it belongs to
+	### turns: for each polygon, 1 if its points turn counterclockwise (numerically), -1 if clockwise, 0 if it has no area
+	### boxes: for each polygon, its bounding box (left, top, right, bottom)
+	### index: SpatialHash of polygon indices by bounding box
+	### points: every point of every polygon, once each, sorted
+	### pointArray: points as an n x 2 numpy array
+
+	def __init__(self, polygons):
+		self.polygons = polygons
+		self.neighbors = [[] for polygon in polygons]
+		self.portals = {}
+		self.turns = []
+		self.boxes = []
+		# Every polygon on each (undirected) edge
+		owners = {}
+		for i, polygon in enumerate(polygons):
+			for j in xrange(len(polygon)):
+				p = polygon[j]
+				q = polygon[(j + 1) % len(polygon)]
+				key = (p, q) if p < q else (q, p)
+				owners.setdefault(key, []).append(i)
+		self.edges = owners
+		for i, polygon in enumerate(polygons):
+			for j in xrange(len(polygon)):
+				p = polygon[j]
+				q = polygon[(j + 1) % len(polygon)]
+				key = (p, q) if p < q else (q, p)
+				for other in owners[key]:
+					if other != i and (i, other) not in self.portals:
+						self.neighbors[i].append((other, (p, q)))
+						self.portals[(i, other)] = (p, q)
+		total = 0.0
+		for polygon in polygons:
+			area = polygonSignedArea(polygon)
+			self.turns.append(1 if area > 0 else (-1 if area < 0 else 0))
+			box = (min([p[0] for p in polygon]), min([p[1] for p in polygon]), max([p[0] for p in polygon]), max([p[1] for p in polygon]))
+			self.boxes.append(box)
+			total = total + (box[2] - box[0]) * (box[3] - box[1])
+		# Cells about the size of an average polygon's bounding box
+		cellsize = max(1.0, math.sqrt(total / max(1, len(polygons))))
+		self.index = SpatialHash(cellsize)
+		for i, box in enumerate(self.boxes):
+			self.index.insert(i, box)
+		self.points = sorted(set([p for polygon in polygons for p in polygon]))
+		self.pointArray = numpy.array(self.points, dtype=numpy.float64).reshape((-1, 2))
+
+	def __len__(self):
+		return len(self.polygons)
+
+	def getPolygon(self, i):
+		return self.polygons[i]
+
+	### The (neighbor index, portal) pairs of polygon i
+	def getNeighbors(self, i):
+		return self.neighbors[i]
+
+	### True if the line from p to q is an edge of some polygon
+	def isEdge(self, p, q):
+		return ((p, q) if p < q else (q, p)) in self.edges
+
+	### The edge polygons i and j share (in polygon i's order), or None if they aren't adjacent
+	def getPortal(self, i, j):
+		return self.portals.get((i, j))
+
+	### True if point is inside polygon i or on its boundary
+	def polygonContains(self, i, point):
+		box = self.boxes[i]
+		if point[0] < box[0] or point[0] > box[2] or point[1] < box[1] or point[1] > box[3]:
+			return False
+		return pointInConvexPolygon(point, self.polygons[i], self.turns[i])
+
+	### The indices of every polygon containing point (on the boundary counts), lowest first. A point on a portal is in both polygons.
+	def polygonsContaining(self, point):
+		candidates = self.index.query((point[0], point[1], point[0], point[1])).values()
+		return sorted([i for i in candidates if self.polygonContains(i, point)])
+
+	### The index of a polygon containing point (on its boundary counts), or None if point is outside the nav mesh.
+	### A point on a portal is in both polygons; the one with the lower index is returned.
+	def findPolygon(self, point):
+		found = None
+		for i in self.index.query((point[0], point[1], point[0], point[1])).itervalues():
+			if (found is None or i < found) and self.polygonContains(i, point):
+				found = i
+		return found
+
+	### For each polygon, the list of points (in the order given) inside it or on its boundary
+	def pointsByPolygon(self, points):
+		found = [[] for polygon in self.polygons]
+		for point in points:
+			for i in self.polygonsContaining(point):
+				found[i].append(point)
+		return found
+
+
+############################
+### Helpers
+
+### Twice the signed area of a polygon: > 0 if its points turn counterclockwise (numerically)
+def polygonSignedArea(polygon):
+	area = 0
+	for i in xrange(len(polygon)):
+		area = area + polygon[i - 1][0] * polygon[i][1] - polygon[i][0] * polygon[i - 1][1]
+	return area
+
+### True if point is inside or on a convex polygon. turn is 1 if the polygon's points turn counterclockwise (numerically), -1 if not.
+### Binary search for the wedge from the first point that holds point, then one test against the far edge.
+def pointInConvexPolygon(point, polygon, turn):
+	n = len(polygon)
+	if n < 3 or turn == 0:
+		return False
+	first = polygon[0]
+	def side(a, b):
+		return turn * ((b[0] - a[0]) * (point[1] - a[1]) - (b[1] - a[1]) * (point[0] - a[0]))
+	if side(first, polygon[1]) < 0 or side(polygon[n - 1], first) < 0:
+		return False
+	lo = 1
+	hi = n - 1
+	while hi - lo > 1:
+		mid = (lo + hi) / 2
+		if side(first, polygon[mid]) >= 0:
+			lo = mid
+		else:
+			hi = mid
+	return side(polygon[lo], polygon[hi]) >= 0
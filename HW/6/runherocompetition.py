@@ -25,17 +25,25 @@ from constants import *
 from utils import *
 from core import *
 from astarnavigator import *
+from apspnavigator import *
 from agents import *
 from moba2 import *
 from MyHero import *
 from WanderingMinion import *
 from clonenav import *
+from maps import *
 
 if len(sys.argv) < 3:
-	print "Usage: python " + sys.argv[0] + " classname1 classname2"
+	print "Usage: python " + sys.argv[0] + " classname1 classname2 [--headless] [--ticks n]"
 	print "classname1 and classname2 must be in files with the same located in this directory."
+	print "--headless runs without a window as fast as possible. --ticks stops the game after n ticks."
 	exit(1)
 
+headless = '--headless' in sys.argv
+maxTicks = None
+if '--ticks' in sys.argv:
+	maxTicks = int(sys.argv[sys.argv.index('--ticks')+1])
+
 module1 = __import__(sys.argv[1])
 module2 = __import__(sys.argv[2])
 class1 = getattr(module1, sys.argv[1])
@@ -47,21 +55,18 @@ class2 = getattr(module2, sys.argv[2])
 ### Use this file to conduct a competition with other agents.
 ### Step 1: Give your MyHero class an unique name, e.g., MarkHero. Change the file name to match the class name exactly.
 ### Step 2: python runherocompetition.py classname1 classname2
+### Add --headless to run without a window (much faster), and --ticks n to stop after n ticks. The final state is printed at the end.
 
 ############################
 ### SET UP WORLD
 
-dims = (1200, 1200)
-
-obstacles = [[(250, 150), (600, 200), (550, 350), (260, 390)],
-			 [(800, 200), (1040, 140), (1050, 160), (1025, 500), (1000, 500), (810, 310)]]
-
+### The terrain is defined in maps.py so that navmeshcache.py can prebuild its nav mesh.
 
-mirror = map(lambda poly: map(lambda point: (dims[0]-point[0], dims[1]-point[1]), poly), obstacles)
+heromap = getMap('hero')
 
-obstacles = obstacles + mirror
+dims = heromap['dims']
 
-obstacles = obstacles + [[(550, 570), (600, 550), (660, 570), (650, 630), (600, 650), (540, 630)]]
+obstacles = heromap['obstacles']
 
 ###########################
 ### Minion Subclasses
@@ -97,7 +102,7 @@ class MyAlienHero(class2):
 
 ########################
 
-world = MOBAWorld(SEED, dims, dims, 0, 60)
+world = MOBAWorld(SEED, dims, dims, 0, 60, headless)
 agent = GhostAgent(ELITE, (600, 500), 0, SPEED, world)
 #agent = Hero((600, 500), 0, world, ELITE)
 world.setPlayerAgent(agent)
@@ -107,7 +112,7 @@ agent.team = 0
 world.debugging = True
 
 
-nav = AStarNavigator()
+nav = APSPNavigator()
 nav.agent = agent
 nav.setWorld(world)
 
@@ -137,4 +142,5 @@ hero2.start()
 
 
 
-world.run()
+state = world.run(maxTicks, lambda w: w.isGameOver())
+print "Final state", state
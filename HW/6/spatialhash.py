@@ -0,0 +1,138 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import math
+
+###########################
+### SpatialHash
+###
+### Uniform grid used as a broad phase. Every item is stored in each cell that its bounding box overlaps.
+### Items are keyed by id() so that unhashable things (e.g., lists) can be stored.
+### A box is (left, top, right, bottom).
+
+class SpatialHash(object):
+
+	### cellsize: the width and height of a cell
+	### cells: dictionary mapping (column, row) to a dictionary of id(item) -> item
+	### items: dictionary mapping id(item) to (item, cells occupied)
+
+	def __init__(self, cellsize):
+		self.cellsize = float(cellsize)
+		self.cells = {}
+		self.items = {}
+
+	def __len__(self):
+		return len(self.items)
+
+	def __contains__(self, item):
+		return id(item) in self.items
+
+	### Returns the (column, row) range covered by a box as (mincol, minrow, maxcol, maxrow)
+	def cellRange(self, box):
+		size = self.cellsize
+		return (int(math.floor(box[0]/size)), int(math.floor(box[1]/size)), int(math.floor(box[2]/size)), int(math.floor(box[3]/size)))
+
+	def insert(self, item, box):
+		if id(item) in self.items:
+			self.update(item, box)
+			return
+		span = self.cellRange(box)
+		self.items[id(item)] = (item, span)
+		self.addToCells(item, span)
+
+	def remove(self, item):
+		entry = self.items.pop(id(item), None)
+		if entry is not None:
+			self.removeFromCells(item, entry[1])
+
+	### Move an item that is already in the hash. Only touches the cells if the item crossed a cell boundary.
+	def update(self, item, box):
+		entry = self.items.get(id(item))
+		if entry is None:
+			return
+		span = self.cellRange(box)
+		if span != entry[1]:
+			self.removeFromCells(item, entry[1])
+			self.addToCells(item, span)
+			self.items[id(item)] = (item, span)
+
+	def clear(self):
+		self.cells = {}
+		self.items = {}
+
+	### Returns a dictionary id(item) -> item of everything sharing a cell with the box
+	def query(self, box):
+		found = {}
+		mincol, minrow, maxcol, maxrow = self.cellRange(box)
+		cells = self.cells
+		for col in xrange(mincol, maxcol + 1):
+			for row in xrange(minrow, maxrow + 1):
+				bucket = cells.get((col, row))
+				if bucket is not None:
+					found.update(bucket)
+		return found
+
+	### Returns a dictionary id(item) -> item of everything sharing a cell with the given item
+	def neighbors(self, item):
+		entry = self.items.get(id(item))
+		if entry is None:
+			return {}
+		found = {}
+		mincol, minrow, maxcol, maxrow = entry[1]
+		cells = self.cells
+		for col in xrange(mincol, maxcol + 1):
+			for row in xrange(minrow, maxrow + 1):
+				found.update(cells[(col, row)])
+		return found
+
+	def addToCells(self, item, span):
+		mincol, minrow, maxcol, maxrow = span
+		cells = self.cells
+		key = id(item)
+		for col in xrange(mincol, maxcol + 1):
+			for row in xrange(minrow, maxrow + 1):
+				bucket = cells.get((col, row))
+				if bucket is None:
+					bucket = {}
+					cells[(col, row)] = bucket
+				bucket[key] = item
+
+	def removeFromCells(self, item, span):
+		mincol, minrow, maxcol, maxrow = span
+		cells = self.cells
+		key = id(item)
+		for col in xrange(mincol, maxcol + 1):
+			for row in xrange(minrow, maxrow + 1):
+				bucket = cells.get((col, row))
+				if bucket is not None:
+					bucket.pop(key, None)
+					if len(bucket) == 0:
+						del cells[(col, row)]
+
+
+### Bounding box of a pygame rect
+def rectBox(rect):
+	return (rect.left, rect.top, rect.right, rect.bottom)
+
+### Bounding box of a line, grown by margin on every side
+def lineBox(line, margin = 0.0):
+	return (min(line[0][0], line[1][0]) - margin, min(line[0][1], line[1][1]) - margin, max(line[0][0], line[1][0]) + margin, max(line[0][1], line[1][1]) + margin)
+
+### True if two boxes overlap (touching counts)
+def boxesOverlap(box1, box2):
+	return box1[0] <= box2[2] and box2[0] <= box1[2] and box1[1] <= box2[3] and box2[1] <= box1[3]
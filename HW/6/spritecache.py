@@ -0,0 +1,125 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import math, numpy, pygame, collections
+from pygame.locals import *
+
+from constants import *
+from utils import *
+
+############################
+### SPRITE CACHE
+###
+### Images are loaded from disk once per process, and rotated images are kept so turning to an angle seen before is a dictionary lookup.
+### Cached surfaces are shared by every Mover using them and must not be drawn on.
+###
+### Rotations are quantized to ROTATIONSTEP degrees, which only changes what is drawn: a Mover's rect is sized with rotatedSize(),
+### which gives the exact size pygame.transform.rotate would give for the unquantized angle, so collisions are unchanged.
+
+### images: dictionary from (file name, colorkey) to the loaded surface
+images = {}
+
+### Same as load_image, but the surface is only loaded once. Returns the shared surface and a new rect.
+def loadCachedImage(name, colorkey = None):
+	key = (name, colorkey)
+	if key not in images:
+		images[key] = load_image(name, colorkey)[0]
+	image = images[key]
+	return image, image.get_rect()
+
+### Bytes used by a surface's pixels
+def surfaceBytes(surface):
+	return surface.get_pitch() * surface.get_height()
+
+def imageCacheBytes():
+	return sum([surfaceBytes(image) for image in images.values()])
+
+### The (width, height) of pygame.transform.rotate(surface, angle) for a width x height surface.
+### Mirrors pygame's rotate: the angle is a single precision float, multiples of 90 degrees are turned exactly, and other angles
+### are the truncated bounding box of the rotated corners.
+def rotatedSize(width, height, angle):
+	angle = float(numpy.float32(angle))
+	if math.fmod(angle, 90.0) == 0:
+		if int(angle / 90.0) % 2 == 0:
+			return width, height
+		return height, width
+	radangle = angle * .01745329251994329
+	sangle = math.sin(radangle)
+	cangle = math.cos(radangle)
+	cx = cangle * width
+	cy = cangle * height
+	sx = sangle * width
+	sy = sangle * height
+	return (int(max(abs(cx + sy), abs(cx - sy), abs(-cx + sy), abs(-cx - sy))),
+			int(max(abs(sx + cy), abs(sx - cy), abs(-sx + cy), abs(-sx - cy))))
+
+### The angle a rotation is cached under
+def quantizeAngle(angle, step = ROTATIONSTEP):
+	if step > 0:
+		angle = round(angle / float(step)) * step
+	return angle % 360
+
+
+############################
+### RotationCache
+###
+### Least recently used cache of rotated surfaces, bounded by the bytes the surfaces use.
+
+class RotationCache(object):
+
+	### surfaces: ordered dictionary from (source surface, quantized angle) to the rotated surface, least recently used first
+	### bytes: bytes used by the rotated surfaces
+	### maxBytes: least recently used surfaces are dropped to stay under this many bytes
+	### step: rotations are quantized to this many degrees (0: not quantized)
+	### hits, misses, evictions: counters for tuning
+
+	def __init__(self, maxBytes = ROTATIONCACHEBYTES, step = ROTATIONSTEP):
+		self.surfaces = collections.OrderedDict()
+		self.bytes = 0
+		self.maxBytes = maxBytes
+		self.step = step
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	### The surface rotated by angle (quantized)
+	def rotate(self, surface, angle):
+		key = (surface, quantizeAngle(angle, self.step))
+		rotated = self.surfaces.pop(key, None)
+		if rotated is None:
+			self.misses = self.misses + 1
+			rotated = pygame.transform.rotate(surface, key[1])
+			self.bytes = self.bytes + surfaceBytes(rotated)
+			while self.bytes > self.maxBytes and len(self.surfaces) > 0:
+				old = self.surfaces.popitem(False)[1]
+				self.bytes = self.bytes - surfaceBytes(old)
+				self.evictions = self.evictions + 1
+		else:
+			self.hits = self.hits + 1
+		# Most recently used goes last
+		self.surfaces[key] = rotated
+		return rotated
+
+	def clear(self):
+		self.surfaces = collections.OrderedDict()
+		self.bytes = 0
+
+	def getStats(self):
+		return {'surfaces': len(self.surfaces), 'bytes': self.bytes, 'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions}
+
+rotations = RotationCache()
@@ -0,0 +1,419 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+import sys, os, time, math, random, json, csv, traceback, argparse, multiprocessing, signal
+
+from constants import *
+from core import *
+from astarnavigator import *
+from apspnavigator import *
+from moba2 import *
+from clonenav import *
+from maps import *
+from navmeshcache import *
+
+############################
+### How to use this file
+###
+### Plays a tournament between many Hero classes on the runherocompetition.py map. Every match is played headless in its own process,
+### so an agent that crashes or hangs only loses its own match.
+### python tournament.py [options] hero1 hero2 hero3 ...
+###
+### An entrant is a Hero class name in a file with the same name (like runherocompetition.py), or module.ClassName.
+### hero:minion gives that entrant its own Minion class. Otherwise every team uses --minion.
+###
+### Options:
+### --swiss n        play n Swiss rounds instead of a round robin
+### --seeds 1,2,3    play every pairing once per seed (and once per side)
+### --ticks n        stop a match after n ticks
+### --timeout s      kill a match after s seconds of wall clock time
+### --workers n      number of matches played at once (default: number of cores)
+### --minion name    default Minion class (default: moba2.Minion)
+### --out name       write name.csv (standings) and name.json (standings and every match)
+
+# Points for a win and a draw
+WINPOINTS = 3
+DRAWPOINTS = 1
+
+############################
+### Loading classes
+
+### Import a class given as ClassName (in ClassName.py) or module.ClassName
+def loadClass(name):
+	if '.' in name:
+		modulename, classname = name.rsplit('.', 1)
+	else:
+		modulename, classname = name, name
+	module = __import__(modulename)
+	return getattr(module, classname)
+
+### Module file names that belong to an entrant. Used to blame a crash on one side.
+def entrantModules(entrant):
+	names = []
+	for name in entrant.split(':'):
+		if '.' in name:
+			name = name.rsplit('.', 1)[0]
+		names.append(name + '.py')
+	return names
+
+### Split hero:minion
+def parseEntrant(entrant, defaultMinion):
+	if ':' in entrant:
+		return entrant.split(':', 1)
+	return entrant, defaultMinion
+
+############################
+### Playing one match (runs in the match's own process)
+
+### Build the runherocompetition.py world for hero1 (team 1) against hero2 (team 2) and play it headless.
+def playMatch(match):
+	heroName1, minionName1 = parseEntrant(match['hero1'], match['minion'])
+	heroName2, minionName2 = parseEntrant(match['hero2'], match['minion'])
+
+	### Give a class the team's sprite as its default image
+	def teamHero(cls, teamimage):
+		class TeamHero(cls):
+			def __init__(self, position, orientation, world, image = teamimage, speed = SPEED, viewangle = 360, hitpoints = HEROHITPOINTS, firerate = FIRERATE, bulletclass = BigBullet, dodgerate = DODGERATE, areaeffectrate = AREAEFFECTRATE, areaeffectdamage = AREAEFFECTDAMAGE):
+				cls.__init__(self, position, orientation, world, image, speed, viewangle, hitpoints, firerate, bulletclass, dodgerate, areaeffectrate, areaeffectdamage)
+		return TeamHero
+
+	def teamMinion(cls, teamimage):
+		class TeamMinion(cls):
+			def __init__(self, position, orientation, world, image = teamimage, speed = SPEED, viewangle = 360, hitpoints = HITPOINTS, firerate = FIRERATE, bulletclass = SmallBullet):
+				cls.__init__(self, position, orientation, world, image, speed, viewangle, hitpoints, firerate, bulletclass)
+		return TeamMinion
+
+	hero1 = teamHero(loadClass(heroName1), AGENT)
+	hero2 = teamHero(loadClass(heroName2), ELITE)
+	minion1 = teamMinion(loadClass(minionName1), NPC)
+	minion2 = teamMinion(loadClass(minionName2), JACKAL)
+
+	heromap = getMap('hero')
+	dims = heromap['dims']
+	world = MOBAWorld(match['seed'], dims, dims, 0, 60, True)
+	agent = GhostAgent(ELITE, (600, 500), 0, SPEED, world)
+	world.setPlayerAgent(agent)
+	world.initializeTerrain(heromap['obstacles'], (0, 0, 0), 4)
+	agent.setNavigator(Navigator())
+	agent.team = 0
+
+	nav = APSPNavigator()
+	nav.agent = agent
+	nav.setWorld(world)
+
+	b1 = Base(BASE, (75, 75), world, 1, minion1, hero1, BUILDRATE, 1000000)
+	b1.setNavigator(nav)
+	world.addBase(b1)
+	b2 = Base(BASE, (1125, 1125), world, 2, minion2, hero2, BUILDRATE, 1000000)
+	b2.setNavigator(nav)
+	world.addBase(b2)
+
+	h1 = hero1((125, 125), 0, world)
+	h1.setNavigator(cloneAStarNavigator(nav))
+	h1.team = 1
+	world.addNPC(h1)
+	h2 = hero2((1050, 1025), 0, world)
+	h2.setNavigator(cloneAStarNavigator(nav))
+	h2.team = 2
+	world.addNPC(h2)
+
+	world.makePotentialGates()
+	h1.start()
+	h2.start()
+
+	start = time.time()
+	state = world.run(match['maxTicks'], lambda w: w.isGameOver())
+	teams = [b[0] for b in state['bases']]
+	return {'score1': state['score'].get(1, 0),
+			'score2': state['score'].get(2, 0),
+			'base1': 1 in teams,
+			'base2': 2 in teams,
+			'ticks': state['ticks'],
+			'seconds': time.time() - start}
+
+### Process entry point. Game output goes to devnull; the result (or the error) goes back through conn.
+def matchProcess(match, conn):
+	devnull = open(os.devnull, 'w')
+	sys.stdout = devnull
+	try:
+		result = playMatch(match)
+	except BaseException:
+		result = {'error': traceback.format_exc()}
+	conn.send(result)
+	conn.close()
+
+############################
+### Running many matches
+
+### Play matches in parallel, each in its own process. Returns the matches with their results filled in.
+def playMatches(matches, workers, timeout):
+	pending = list(matches)
+	running = []
+	done = []
+	while pending or running:
+		while pending and len(running) < workers:
+			match = pending.pop(0)
+			receiver, sender = multiprocessing.Pipe(False)
+			p = multiprocessing.Process(target = matchProcess, args = (match, sender))
+			p.daemon = True
+			p.start()
+			sender.close()
+			running.append((p, receiver, match, time.time()))
+		stillRunning = []
+		for p, receiver, match, started in running:
+			result = None
+			if receiver.poll():
+				try:
+					result = receiver.recv()
+				except EOFError:
+					result = {'error': 'crashed (exit code %s)' % p.exitcode}
+			elif not p.is_alive():
+				# The result may have been sent between poll() and is_alive()
+				p.join()
+				try:
+					if receiver.poll():
+						result = receiver.recv()
+				except EOFError:
+					pass
+				if result is None:
+					result = {'error': 'crashed (exit code %s)' % p.exitcode}
+			elif time.time() - started > timeout:
+				# SDL catches SIGTERM, so terminate() isn't enough
+				os.kill(p.pid, signal.SIGKILL)
+				result = {'error': 'timed out after %d seconds' % timeout}
+			if result is None:
+				stillRunning.append((p, receiver, match, started))
+			else:
+				p.join(1)
+				receiver.close()
+				match.update(result)
+				scoreMatch(match)
+				done.append(match)
+				reportMatch(match, len(done), len(matches))
+		running = stillRunning
+		if running:
+			time.sleep(0.05)
+	return done
+
+### Fill in the match's winner (entrant name, or None for a draw)
+def scoreMatch(match):
+	match['winner'] = None
+	match['forfeit'] = False
+	if 'error' in match:
+		# Blame the side whose code raised the error, if it can be told
+		blamed = None
+		for line in reversed(match['error'].splitlines()):
+			line = line.strip()
+			if line.startswith('File '):
+				filename = os.path.basename(line.split('"')[1])
+				if filename in entrantModules(match['hero1']) and filename not in entrantModules(match['hero2']):
+					blamed = match['hero1']
+				elif filename in entrantModules(match['hero2']) and filename not in entrantModules(match['hero1']):
+					blamed = match['hero2']
+				if blamed is not None:
+					break
+		if blamed is not None:
+			match['winner'] = match['hero2'] if blamed == match['hero1'] else match['hero1']
+			match['forfeit'] = True
+		return match
+	if match['base1'] != match['base2']:
+		match['winner'] = match['hero1'] if match['base1'] else match['hero2']
+	elif match['score1'] != match['score2']:
+		match['winner'] = match['hero1'] if match['score1'] > match['score2'] else match['hero2']
+	return match
+
+def reportMatch(match, count, total):
+	if 'error' in match:
+		outcome = 'error: ' + match['error'].strip().splitlines()[-1]
+	else:
+		outcome = '%s-%s in %d ticks (%.1fs)' % (match['score1'], match['score2'], match['ticks'], match['seconds'])
+	print '[%d/%d] %s vs %s seed %s: %s, winner %s' % (count, total, match['hero1'], match['hero2'], match['seed'], outcome, match['winner'] or 'none')
+
+############################
+### Schedules
+
+def makeMatch(hero1, hero2, seed, args, number = 0):
+	return {'hero1': hero1, 'hero2': hero2, 'seed': seed, 'round': number, 'maxTicks': args.ticks, 'minion': args.minion}
+
+### Every entrant plays every other entrant, on both sides, once per seed
+def roundRobin(entrants, seeds, args):
+	matches = []
+	for seed in seeds:
+		for i in xrange(len(entrants)):
+			for j in xrange(i+1, len(entrants)):
+				matches.append(makeMatch(entrants[i], entrants[j], seed, args))
+				matches.append(makeMatch(entrants[j], entrants[i], seed, args))
+	return matches
+
+### Pair entrants with the same number of points, avoiding rematches where possible. Returns (pairs, bye).
+def swissPairs(entrants, table, played, rand):
+	order = list(entrants)
+	rand.shuffle(order)
+	order.sort(key = lambda e: -table[e]['points'])
+	bye = None
+	if len(order) % 2 == 1:
+		# The lowest ranked entrant that hasn't had a bye sits out
+		for e in reversed(order):
+			if not table[e]['byes']:
+				bye = e
+				break
+		if bye is None:
+			bye = order[-1]
+		order.remove(bye)
+	pairs = []
+	while order:
+		e1 = order.pop(0)
+		partner = 0
+		for k in xrange(len(order)):
+			if (e1, order[k]) not in played:
+				partner = k
+				break
+		e2 = order.pop(partner)
+		pairs.append((e1, e2))
+	return pairs, bye
+
+############################
+### Standings
+
+def newStanding():
+	return {'played': 0, 'wins': 0, 'draws': 0, 'losses': 0, 'points': 0, 'byes': 0,
+			'damage dealt': 0, 'damage taken': 0, 'bases destroyed': 0, 'errors': 0, 'ticks': 0, 'seconds': 0.0}
+
+def makeStandings(entrants, matches, byes = []):
+	table = dict([(e, newStanding()) for e in entrants])
+	for e in byes:
+		table[e]['byes'] = table[e]['byes'] + 1
+		table[e]['wins'] = table[e]['wins'] + 1
+		table[e]['points'] = table[e]['points'] + WINPOINTS
+	for m in matches:
+		for me, other, side in ((m['hero1'], m['hero2'], 1), (m['hero2'], m['hero1'], 2)):
+			t = table[me]
+			t['played'] = t['played'] + 1
+			if m['winner'] is None:
+				t['draws'] = t['draws'] + 1
+				t['points'] = t['points'] + DRAWPOINTS
+			elif m['winner'] == me:
+				t['wins'] = t['wins'] + 1
+				t['points'] = t['points'] + WINPOINTS
+			else:
+				t['losses'] = t['losses'] + 1
+			if 'error' in m:
+				t['errors'] = t['errors'] + 1
+				continue
+			t['damage dealt'] = t['damage dealt'] + m['score%d' % side]
+			t['damage taken'] = t['damage taken'] + m['score%d' % (3 - side)]
+			if not m['base%d' % (3 - side)]:
+				t['bases destroyed'] = t['bases destroyed'] + 1
+			t['ticks'] = t['ticks'] + m['ticks']
+			t['seconds'] = t['seconds'] + m['seconds']
+	return table
+
+STANDINGCOLUMNS = ['played', 'wins', 'draws', 'losses', 'points', 'damage dealt', 'damage taken', 'bases destroyed', 'errors', 'average ticks', 'average seconds']
+
+### Rows of the standings table, best first
+def standingRows(table):
+	rows = []
+	for e, t in table.items():
+		counted = t['played'] - t['errors']
+		row = dict(t)
+		row['entrant'] = e
+		row['average ticks'] = t['ticks'] / float(counted) if counted > 0 else 0
+		row['average seconds'] = t['seconds'] / counted if counted > 0 else 0
+		rows.append(row)
+	rows.sort(key = lambda r: (-r['points'], -(r['damage dealt'] - r['damage taken']), r['entrant']))
+	return rows
+
+def printStandings(rows):
+	print '%-24s %6s %4s %5s %6s %6s %8s %8s %5s %6s' % ('entrant', 'played', 'wins', 'draws', 'losses', 'points', 'dealt', 'taken', 'bases', 'errors')
+	for r in rows:
+		print '%-24s %6d %4d %5d %6d %6d %8d %8d %5d %6d' % (r['entrant'], r['played'], r['wins'], r['draws'], r['losses'], r['points'], r['damage dealt'], r['damage taken'], r['bases destroyed'], r['errors'])
+
+def writeResults(name, rows, matches):
+	f = open(name + '.csv', 'wb')
+	writer = csv.writer(f)
+	writer.writerow(['rank', 'entrant'] + STANDINGCOLUMNS)
+	for rank, r in enumerate(rows):
+		writer.writerow([rank + 1, r['entrant']] + [r[c] for c in STANDINGCOLUMNS])
+	f.close()
+	f = open(name + '.json', 'w')
+	json.dump({'standings': rows, 'matches': matches}, f, indent = 1, sort_keys = True)
+	f.close()
+
+############################
+### Main
+
+### Build the nav mesh cache once, so the first matches don't all build it at the same time
+def prebuildProcess():
+	sys.stdout = open(os.devnull, 'w')
+	os.environ['SDL_VIDEODRIVER'] = 'dummy'
+	prebuild(['hero'], APSPNavigator)
+
+def main(argv):
+	parser = argparse.ArgumentParser(description = 'Play a tournament between Hero classes.')
+	parser.add_argument('entrants', nargs = '+', help = 'Hero class names (ClassName, module.ClassName, or hero:minion)')
+	parser.add_argument('--swiss', type = int, default = 0, metavar = 'ROUNDS', help = 'play this many Swiss rounds instead of a round robin')
+	parser.add_argument('--seeds', default = '1', help = 'comma separated world seeds')
+	parser.add_argument('--ticks', type = int, default = 5000, help = 'maximum ticks per match')
+	parser.add_argument('--timeout', type = int, default = 600, help = 'maximum seconds per match')
+	parser.add_argument('--workers', type = int, default = multiprocessing.cpu_count(), help = 'matches played at once')
+	parser.add_argument('--minion', default = 'moba2.Minion', help = 'default Minion class')
+	parser.add_argument('--out', default = 'tournament', help = 'output file name (without .csv/.json)')
+	args = parser.parse_args(argv)
+	seeds = [int(s) for s in args.seeds.split(',')]
+	entrants = args.entrants
+	if len(entrants) < 2:
+		parser.error('need at least two entrants')
+	if len(set(entrants)) != len(entrants):
+		parser.error('entrants must be unique')
+
+	p = multiprocessing.Process(target = prebuildProcess)
+	p.start()
+	p.join()
+
+	start = time.time()
+	byes = []
+	if args.swiss > 0:
+		matches = []
+		played = set()
+		rand = random.Random(seeds[0])
+		for number in xrange(args.swiss):
+			table = makeStandings(entrants, matches, byes)
+			pairs, bye = swissPairs(entrants, table, played, rand)
+			if bye is not None:
+				byes.append(bye)
+				print "Round %d: bye for %s" % (number + 1, bye)
+			roundMatches = []
+			for e1, e2 in pairs:
+				played.add((e1, e2))
+				played.add((e2, e1))
+				for seed in seeds:
+					roundMatches.append(makeMatch(e1, e2, seed, args, number + 1))
+					roundMatches.append(makeMatch(e2, e1, seed, args, number + 1))
+			matches = matches + playMatches(roundMatches, args.workers, args.timeout)
+	else:
+		matches = playMatches(roundRobin(entrants, seeds, args), args.workers, args.timeout)
+	rows = standingRows(makeStandings(entrants, matches, byes))
+	print
+	printStandings(rows)
+	print len(matches), 'matches in %.1fs' % (time.time() - start)
+	writeResults(args.out, rows, matches)
+	print 'Wrote', args.out + '.csv', 'and', args.out + '.json'
+
+
+if __name__ == '__main__':
+	main(sys.argv[1:])
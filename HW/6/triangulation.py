@@ -0,0 +1,409 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+from constants import *
+from utils import *
+
+############################
+### TRIANGULATION
+###
+### Builds nav mesh polygons for a world:
+### 1. Constrained Delaunay triangulation of the world's points, with the obstacle edges and the world border as constraints.
+###    Points are inserted one at a time (Bowyer-Watson) in Hilbert curve order, and each point is located by walking from the
+###    last triangle made, so locating and inserting a point is close to constant time. Constraint edges are then added by
+###    removing the triangles they cross and re-triangulating the holes on each side.
+### 2. Triangles inside obstacles (or outside the world) are dropped.
+### 3. Hertel-Mehlhorn: edges that aren't constraints are removed, shortest first, whenever the polygons on both sides merge
+###    into a convex polygon.
+###
+### Obstacles are assumed not to overlap (they don't on any of the maps). An obstacle edge that crosses another obstacle's edge
+### stops being a constraint where the two cross.
+
+############################
+### Geometric predicates
+### Exact when the coordinates are ints, which they are for every map.
+
+### > 0 if a, b, c turn counterclockwise (in the numeric sense; the screen's y axis points down), 0 if they are collinear
+def orientation(a, b, c):
+	return (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+
+### > 0 if d is inside the circle through a, b, c (which must turn counterclockwise), 0 if it is on the circle
+def inCircle(a, b, c, d):
+	adx = a[0] - d[0]
+	ady = a[1] - d[1]
+	bdx = b[0] - d[0]
+	bdy = b[1] - d[1]
+	cdx = c[0] - d[0]
+	cdy = c[1] - d[1]
+	alift = adx * adx + ady * ady
+	blift = bdx * bdx + bdy * bdy
+	clift = cdx * cdx + cdy * cdy
+	return adx * (bdy * clift - cdy * blift) - ady * (bdx * clift - cdx * blift) + alift * (bdx * cdy - bdy * cdx)
+
+### Position of (x, y) along a Hilbert curve filling an n x n grid (n a power of 2)
+def hilbertKey(x, y, n):
+	d = 0
+	s = n / 2
+	while s > 0:
+		rx = 1 if x & s else 0
+		ry = 1 if y & s else 0
+		d = d + s * s * ((3 * rx) ^ ry)
+		if ry == 0:
+			if rx == 1:
+				x = n - 1 - x
+				y = n - 1 - y
+			x, y = y, x
+		s = s / 2
+	return d
+
+def edgeKey(a, b):
+	if a < b:
+		return (a, b)
+	return (b, a)
+
+
+############################
+### ConstrainedDelaunay
+###
+### A triangulation stored as a dictionary from each directed edge (u, v) to the third vertex w of the triangle (u, v, w).
+### Every triangle turns counterclockwise, so the triangle on the other side of (u, v) is the one holding (v, u).
+### Vertices are indices into points.
+
+class ConstrainedDelaunay(object):
+
+	### points: the vertices
+	### index: dictionary from point to vertex index
+	### apex: dictionary from directed edge (u, v) to the third vertex of its triangle
+	### constrained: set of edgeKey(u, v) for the edges that must stay in the triangulation
+	### around: for each vertex, a vertex it has a directed edge to (where to start going around it)
+	### last: the last triangle made (where point location starts)
+
+	### lo, hi: corners of a box containing every point that will be inserted
+	def __init__(self, lo, hi):
+		self.points = []
+		self.index = {}
+		self.apex = {}
+		self.constrained = set()
+		self.around = {}
+		self.last = None
+		corners = [(lo[0], lo[1]), (hi[0], lo[1]), (hi[0], hi[1]), (lo[0], hi[1])]
+		for p in corners:
+			self.index[p] = len(self.points)
+			self.points.append(p)
+		self.addTriangle(0, 1, 2)
+		self.addTriangle(0, 2, 3)
+
+	def addTriangle(self, a, b, c):
+		self.apex[(a, b)] = c
+		self.apex[(b, c)] = a
+		self.apex[(c, a)] = b
+		self.around[a] = b
+		self.around[b] = c
+		self.around[c] = a
+		self.last = (a, b, c)
+
+	### Adds triangle a, b, c in whichever order turns counterclockwise
+	def addTriangleAnyOrder(self, a, b, c):
+		o = orientation(self.points[a], self.points[b], self.points[c])
+		if o > 0:
+			self.addTriangle(a, b, c)
+		elif o < 0:
+			self.addTriangle(b, a, c)
+
+	def removeTriangle(self, a, b, c):
+		del self.apex[(a, b)]
+		del self.apex[(b, c)]
+		del self.apex[(c, a)]
+
+	### The triangles, each once, as (a, b, c) counterclockwise
+	def getTriangles(self):
+		return [(a, b, c) for (a, b), c in self.apex.iteritems() if a < b and a < c]
+
+	def isConstrained(self, a, b):
+		return edgeKey(a, b) in self.constrained
+
+	### The triangle containing point p (possibly on its edge)
+	def locate(self, p):
+		points = self.points
+		t = self.last
+		if t is None or self.apex.get((t[0], t[1])) != t[2]:
+			(a, b), c = next(self.apex.iteritems())
+			t = (a, b, c)
+		# Walk towards p: cross any edge that p is on the far side of
+		while True:
+			a, b, c = t
+			if orientation(points[a], points[b], p) < 0:
+				t = (b, a, self.apex[(b, a)])
+			elif orientation(points[b], points[c], p) < 0:
+				t = (c, b, self.apex[(c, b)])
+			elif orientation(points[c], points[a], p) < 0:
+				t = (a, c, self.apex[(a, c)])
+			else:
+				return t
+
+	### Adds a vertex at point p and returns its index (or the index of the vertex already there)
+	def insertPoint(self, p):
+		if p in self.index:
+			return self.index[p]
+		points = self.points
+		t = self.locate(p)
+		v = len(points)
+		points.append(p)
+		self.index[p] = v
+		# Remove every triangle whose circumcircle holds p, without crossing constraints
+		self.removeTriangle(*t)
+		removed = set([(t[0], t[1]), (t[1], t[2]), (t[2], t[0])])
+		stack = [t]
+		boundary = []
+		while stack:
+			a, b, c = stack.pop()
+			for u, w in ((a, b), (b, c), (c, a)):
+				if (w, u) in removed:
+					continue
+				d = self.apex.get((w, u))
+				if d is not None and not self.isConstrained(u, w) and inCircle(points[w], points[u], points[d], p) > 0:
+					self.removeTriangle(w, u, d)
+					removed.update([(w, u), (u, d), (d, w)])
+					stack.append((w, u, d))
+				else:
+					boundary.append((u, w))
+		# Connect p to the edges around the hole. An edge p lies on (on the outside of the triangulation) is split instead.
+		for u, w in boundary:
+			if orientation(points[u], points[w], p) > 0:
+				self.addTriangle(u, w, v)
+		return v
+
+	### The triangles that have vertex a, as (a, x, y), in counterclockwise order around a
+	def trianglesAround(self, a):
+		start = self.around.get(a)
+		if start is None or (a, start) not in self.apex:
+			start = None
+			for u, w in self.apex:
+				if u == a:
+					start = w
+					break
+			if start is None:
+				return []
+		fan = []
+		x = start
+		while True:
+			y = self.apex.get((a, x))
+			if y is None:
+				break
+			fan.append((a, x, y))
+			x = y
+			if x == start:
+				return fan
+		# Hit the outside of the triangulation, so go the other way from start too
+		x = start
+		while True:
+			w = self.apex.get((x, a))
+			if w is None:
+				break
+			fan.insert(0, (a, w, x))
+			x = w
+		return fan
+
+	### Makes the edge from vertex a to vertex b part of the triangulation
+	def insertConstraint(self, a, b):
+		points = self.points
+		while a != b:
+			if (a, b) in self.apex or (b, a) in self.apex:
+				self.constrained.add(edgeKey(a, b))
+				return
+			pa = points[a]
+			pb = points[b]
+			# Find where the segment leaves a: either through a vertex on the segment, or through the edge opposite a
+			through = None
+			first = None
+			for t in self.trianglesAround(a):
+				x = t[1]
+				y = t[2]
+				for v in (x, y):
+					if orientation(pa, points[v], pb) == 0 and (points[v][0] - pa[0]) * (pb[0] - pa[0]) + (points[v][1] - pa[1]) * (pb[1] - pa[1]) > 0:
+						through = v
+				if through is not None:
+					break
+				if orientation(pa, points[x], pb) > 0 and orientation(pa, points[y], pb) < 0:
+					first = t
+					break
+			if through is not None:
+				self.constrained.add(edgeKey(a, through))
+				a = through
+				continue
+			if first is None:
+				return
+			# Remove the triangles the segment crosses, keeping the vertices on each side in order from a to b
+			a, x, y = first
+			self.removeTriangle(a, x, y)
+			left = [y]
+			right = [x]
+			while True:
+				self.constrained.discard(edgeKey(x, y))
+				z = self.apex[(y, x)]
+				self.removeTriangle(y, x, z)
+				if z == b:
+					break
+				o = orientation(pa, pb, points[z])
+				if o > 0:
+					left.append(z)
+					y = z
+				elif o < 0:
+					right.append(z)
+					x = z
+				else:
+					# z is on the segment: finish at z and carry on from there
+					break
+			self.fillCavity(a, z, left)
+			self.fillCavity(a, z, right)
+			self.constrained.add(edgeKey(a, z))
+			a = z
+
+	### Triangulates the polygon u, chain..., v (all of the chain on one side of u, v) so that it is constrained Delaunay
+	def fillCavity(self, u, v, chain):
+		points = self.points
+		stack = [(u, v, chain)]
+		while stack:
+			u, v, chain = stack.pop()
+			if len(chain) == 0:
+				continue
+			# The vertex whose circle with u, v holds none of the others
+			c = 0
+			for i in xrange(1, len(chain)):
+				pu = points[u]
+				pv = points[v]
+				if orientation(pu, pv, points[chain[c]]) < 0:
+					pu, pv = pv, pu
+				if inCircle(pu, pv, points[chain[c]], points[chain[i]]) > 0:
+					c = i
+			self.addTriangleAnyOrder(u, v, chain[c])
+			stack.append((u, chain[c], chain[:c]))
+			stack.append((chain[c], v, chain[c+1:]))
+
+
+############################
+### Building the nav mesh
+
+### Constrained Delaunay triangulation of points, with segments (pairs of points) as constraints
+def constrainedDelaunay(points, segments):
+	xs = [p[0] for p in points]
+	ys = [p[1] for p in points]
+	lo = (min(xs), min(ys))
+	hi = (max(xs), max(ys))
+	cdt = ConstrainedDelaunay(lo, hi)
+	# Hilbert curve order keeps consecutive points close together, so point location walks are short
+	n = 1 << 16
+	scale = (n - 1) / float(max(hi[0] - lo[0], hi[1] - lo[1], 1))
+	order = sorted(set(points), key = lambda p: hilbertKey(int((p[0] - lo[0]) * scale), int((p[1] - lo[1]) * scale), n))
+	for p in order:
+		cdt.insertPoint(p)
+	for p, q in segments:
+		cdt.insertConstraint(cdt.index[p], cdt.index[q])
+	return cdt
+
+### The triangles of cdt that are inside the world and outside every obstacle.
+### Triangles are grouped into regions that are connected without crossing a constraint, and one triangle of each region is tested.
+def walkableTriangles(cdt, obstacles, dimensions):
+	points = cdt.points
+	triangles = cdt.getTriangles()
+	boxes = [(min([p[0] for p in o]), min([p[1] for p in o]), max([p[0] for p in o]), max([p[1] for p in o])) for o in obstacles]
+	region = {}
+	walkable = []
+	for t in triangles:
+		if t in region:
+			continue
+		a, b, c = t
+		center = ((points[a][0] + points[b][0] + points[c][0]) / 3.0, (points[a][1] + points[b][1] + points[c][1]) / 3.0)
+		free = 0 <= center[0] <= dimensions[0] and 0 <= center[1] <= dimensions[1]
+		if free:
+			for obstacle, box in zip(obstacles, boxes):
+				if box[0] <= center[0] <= box[2] and box[1] <= center[1] <= box[3] and pointInsidePolygonPoints(center, obstacle):
+					free = False
+					break
+		# Flood the region
+		region[t] = free
+		stack = [t]
+		while stack:
+			a, b, c = stack.pop()
+			if free:
+				walkable.append((a, b, c))
+			for u, w in ((a, b), (b, c), (c, a)):
+				if cdt.isConstrained(u, w):
+					continue
+				d = cdt.apex.get((w, u))
+				if d is None:
+					continue
+				n = min((w, u, d), (u, d, w), (d, w, u))
+				if n not in region:
+					region[n] = free
+					stack.append(n)
+	return walkable
+
+### Hertel-Mehlhorn: merges triangles (counterclockwise vertex index triples) into convex polygons.
+### Edges are removed shortest first (so the edges left between polygons are wide); an edge is removed if the polygons on both sides
+### make a convex polygon and it isn't constrained.
+### Returns lists of vertex indices, counterclockwise.
+def mergeConvex(points, triangles, constrained = set()):
+	polygons = {}
+	owner = {}
+	for i, t in enumerate(triangles):
+		polygons[i] = list(t)
+		for j in xrange(3):
+			owner[(t[j], t[(j + 1) % 3])] = i
+	diagonals = [(a, b) for (a, b) in owner if a < b and (b, a) in owner and (a, b) not in constrained]
+	diagonals.sort(key = lambda e: (distance(points[e[0]], points[e[1]]), e))
+	for a, b in diagonals:
+		p = owner[(a, b)]
+		q = owner[(b, a)]
+		first = polygons[p]
+		second = polygons[q]
+		# first goes b ... a, second goes a ... b
+		i = first.index(b)
+		first = first[i:] + first[:i]
+		i = second.index(a)
+		second = second[i:] + second[:i]
+		# The two corners at the ends of the edge must stay convex (collinear is fine)
+		if orientation(points[first[-2]], points[a], points[second[1]]) < 0:
+			continue
+		if orientation(points[second[-2]], points[b], points[first[1]]) < 0:
+			continue
+		merged = first + second[1:-1]
+		polygons[p] = merged
+		del polygons[q]
+		del owner[(a, b)]
+		del owner[(b, a)]
+		for j in xrange(1, len(second) - 1):
+			owner[(second[j - 1], second[j])] = p
+		owner[(second[-2], b)] = p
+	return [polygons[i] for i in sorted(polygons.keys())]
+
+### Convex polygons (lists of points) covering the parts of the world that aren't obstacles
+def navMeshPolygons(world):
+	dimensions = world.getDimensions()
+	corners = [(0, 0), (dimensions[0], 0), (dimensions[0], dimensions[1]), (0, dimensions[1])]
+	obstacles = [o.getPoints() for o in world.getObstacles()]
+	points = list(corners)
+	segments = [(corners[i], corners[(i + 1) % 4]) for i in xrange(4)]
+	for obstacle in obstacles:
+		points = points + list(obstacle)
+		for i in xrange(len(obstacle)):
+			if obstacle[i] != obstacle[(i + 1) % len(obstacle)]:
+				segments.append((obstacle[i], obstacle[(i + 1) % len(obstacle)]))
+	cdt = constrainedDelaunay(points, segments)
+	triangles = walkableTriangles(cdt, obstacles, dimensions)
+	return [[cdt.points[v] for v in polygon] for polygon in mergeConvex(cdt.points, triangles, cdt.constrained)]
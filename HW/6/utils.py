@@ -145,6 +145,8 @@ def rayTrace(p1, p2, line):
 	#pygame.draw.line(background, (0, 0, 0), p1, p2)
 	
 def rayTraceWorld(p1, p2, worldLines):
+	if isinstance(worldLines, LineArray):
+		return worldLines.rayTrace(p1, p2)
 	for l in worldLines:
 		hit = rayTrace(p1, p2, l)
 		if hit != None:
@@ -167,12 +169,229 @@ def rayTraceNoEndpoints(p1, p2, line):
 
 # Check whether the line between p1 and p2 intersects any line anywhere except an endpoint of any of the lines.
 def rayTraceWorldNoEndPoints(p1, p2, worldLines):
+	if isinstance(worldLines, LineArray):
+		return worldLines.rayTrace(p1, p2, False)
 	for l in worldLines:
 		hit = rayTraceNoEndpoints(p1, p2, l)
 		if hit != None:
 			return hit
 	return None
 
+# Ray trace many rays at once. Ray i goes from starts[i] to ends[i].
+# Returns a list with, for each ray, the same thing rayTraceWorld (or rayTraceWorldNoEndPoints if endpoints is False) would return.
+def rayTraceWorldBatch(starts, ends, worldLines, endpoints = True):
+	if not isinstance(worldLines, LineArray):
+		worldLines = LineArray(worldLines)
+	return worldLines.rayTraceBatch(starts, ends, endpoints)
+
+
+########################
+### LineArray
+###
+### World lines packed into a contiguous numpy array so that rays can be tested against every line in one vectorized pass.
+### Reproduces the slope/intercept math of calculateIntersectPoint exactly, and the first hit is the first line in list order (not the nearest).
+
+# How many rays to test against all lines at once. Bounds the size of the intermediate (rays x lines) matrices.
+RAYBATCHSIZE = 2048
+
+# Point kinds, used to reproduce python's == between points (a tuple is never equal to a list).
+POINTTUPLE = 0
+POINTLIST = 1
+POINTOTHER = 2
+
+def pointKind(p):
+	if isinstance(p, tuple):
+		return POINTTUPLE
+	elif isinstance(p, list):
+		return POINTLIST
+	return POINTOTHER
+
+class LineArray(object):
+
+	### lines: the lines that were packed (in order)
+	### coords: numpy array with one row (x1, y1, x2, y2) per line
+	### kinds: numpy array with one row (kind of first point, kind of second point) per line
+	### vertical, gradients, intercepts, mins, maxs: per-line terms of the intersection math, computed once instead of on every trace
+
+	def __init__(self, lines):
+		self.lines = list(lines)
+		if len(self.lines) > 0:
+			self.coords = numpy.array([(l[0][0], l[0][1], l[1][0], l[1][1]) for l in self.lines], dtype=numpy.float64)
+			self.kinds = numpy.array([(pointKind(l[0]), pointKind(l[1])) for l in self.lines], dtype=numpy.int8)
+		else:
+			self.coords = numpy.zeros((0, 4), dtype=numpy.float64)
+			self.kinds = numpy.zeros((0, 2), dtype=numpy.int8)
+		lx1 = self.coords[:, 0]
+		ly1 = self.coords[:, 1]
+		lx2 = self.coords[:, 2]
+		ly2 = self.coords[:, 3]
+		# Gradients (calculateGradient); None becomes a mask
+		self.vertical = lx1 == lx2
+		with numpy.errstate(divide='ignore', invalid='ignore'):
+			self.gradients = numpy.where(self.vertical, 0.0, (ly1 - ly2) / numpy.where(self.vertical, 1.0, lx1 - lx2))
+		# Y axis intercepts (calculateYAxisIntersect)
+		self.intercepts = ly1 - (self.gradients * lx1)
+		self.mins = (numpy.minimum(lx1, lx2), numpy.minimum(ly1, ly2))
+		self.maxs = (numpy.maximum(lx1, lx2), numpy.maximum(ly1, ly2))
+
+	def __len__(self):
+		return len(self.lines)
+
+	def getLines(self):
+		return self.lines
+
+	### Same as rayTraceWorld (or rayTraceWorldNoEndPoints if endpoints is False) for a single ray
+	def rayTrace(self, p1, p2, endpoints = True):
+		return self.rayTraceBatch([p1], [p2], endpoints)[0]
+
+	### Same as rayTraceWorld (or rayTraceWorldNoEndPoints if endpoints is False) for many rays
+	def rayTraceBatch(self, starts, ends, endpoints = True):
+		starts = list(starts)
+		ends = list(ends)
+		results = []
+		for first in xrange(0, len(starts), RAYBATCHSIZE):
+			results.extend(self.traceChunk(starts[first:first+RAYBATCHSIZE], ends[first:first+RAYBATCHSIZE], endpoints))
+		return results
+
+	def traceChunk(self, starts, ends, endpoints):
+		n = len(starts)
+		if n == 0:
+			return []
+		if len(self.lines) == 0:
+			return [None] * n
+		rays = numpy.array([(s[0], s[1], e[0], e[1]) for s, e in zip(starts, ends)], dtype=numpy.float64)
+		# Rays are rows, lines are columns
+		px1 = rays[:, 0:1]
+		py1 = rays[:, 1:2]
+		px2 = rays[:, 2:3]
+		py2 = rays[:, 3:4]
+		lx1 = self.coords[:, 0]
+		ly1 = self.coords[:, 1]
+		lx2 = self.coords[:, 2]
+		ly2 = self.coords[:, 3]
+		lineVertical = self.vertical
+		m1 = self.gradients
+		b1 = self.intercepts
+		with numpy.errstate(divide='ignore', invalid='ignore'):
+			# Gradients (calculateGradient); None becomes a mask
+			rayVertical = px1 == px2
+			m2 = numpy.where(rayVertical, 0.0, (py1 - py2) / numpy.where(rayVertical, 1.0, px1 - px2))
+			# Y axis intercepts (calculateYAxisIntersect)
+			b2 = py1 - (m2 * px1)
+			# Not parallel if exactly one line is vertical or the gradients differ
+			bothVertical = lineVertical & rayVertical
+			parallel = bothVertical | (~lineVertical & ~rayVertical & (m1 == m2))
+			denom = numpy.where(parallel | lineVertical | rayVertical, 1.0, m1 - m2)
+			x = (b2 - b1) / denom
+			y = (m1 * x) + b1
+			# Line is vertical so use the ray's values
+			x = numpy.where(lineVertical, lx1, x)
+			y = numpy.where(lineVertical, (m2 * lx1) + b2, y)
+			# Ray is vertical so use the line's values
+			x = numpy.where(rayVertical & ~lineVertical, px1, x)
+			y = numpy.where(rayVertical & ~lineVertical, (m1 * px1) + b1, y)
+			# Parallel lines on top of one another intersect at the first point of the line. Otherwise they don't intersect.
+			sameLine = parallel & (bothVertical | (b1 == b2))
+			x = numpy.where(parallel, lx1, x)
+			y = numpy.where(parallel, ly1, y)
+			hits = (~parallel | sameLine) & ((x + EPSILON) >= self.mins[0]) & ((x - EPSILON) <= self.maxs[0]) & ((y + EPSILON) >= self.mins[1]) & ((y - EPSILON) <= self.maxs[1]) & self.between(x, px1, px2) & self.between(y, py1, py2)
+		if not endpoints:
+			# Rays that are the same as a line always hit it. Rays that share an endpoint with a line never hit it.
+			startKinds = numpy.array([pointKind(s) for s in starts], dtype=numpy.int8)[:, None]
+			endKinds = numpy.array([pointKind(e) for e in ends], dtype=numpy.int8)[:, None]
+			startIsFirst = (px1 == lx1) & (py1 == ly1) & (startKinds == self.kinds[:, 0]) & (startKinds != POINTOTHER)
+			startIsSecond = (px1 == lx2) & (py1 == ly2) & (startKinds == self.kinds[:, 1]) & (startKinds != POINTOTHER)
+			endIsFirst = (px2 == lx1) & (py2 == ly1) & (endKinds == self.kinds[:, 0]) & (endKinds != POINTOTHER)
+			endIsSecond = (px2 == lx2) & (py2 == ly2) & (endKinds == self.kinds[:, 1]) & (endKinds != POINTOTHER)
+			same = (startIsFirst & endIsSecond) | (endIsFirst & startIsSecond)
+			shared = startIsFirst | startIsSecond | endIsFirst | endIsSecond
+			hits = same | (hits & ~shared)
+		else:
+			same = None
+		anyHit = hits.any(axis=1)
+		firstHit = hits.argmax(axis=1)
+		results = []
+		for i in xrange(n):
+			if not anyHit[i]:
+				results.append(None)
+				continue
+			j = firstHit[i]
+			if same is not None and same[i, j]:
+				results.append(starts[i])
+			elif sameLine[i, j]:
+				results.append(self.lines[j][0])
+			else:
+				results.append((float(x[i, j]), float(y[i, j])))
+		return results
+
+	### Vectorized between()
+	def between(self, p, p1, p2):
+		return ((p + EPSILON) >= numpy.minimum(p1, p2)) & ((p - EPSILON) <= numpy.maximum(p1, p2))
+
+
+########################
+### PolygonArray
+###
+### Polygons (lists of points, such as obstacles) packed into numpy arrays so that many points can be tested against all of them
+### at once. Each polygon only looks at the points inside its bounding box, and finds which are inside with the winding number
+### of its edges around them, one edge at a time over all of those points.
+### A point within POLYGONEDGEMARGIN of an edge is decided with pointInsidePolygonPoints instead, so points on an edge are
+### inside, as they are for pointInsidePolygonPoints.
+
+# Points closer than this to a polygon edge are tested one at a time
+POLYGONEDGEMARGIN = 0.001
+
+class PolygonArray(object):
+
+	### polygons: the polygons that were packed (in order)
+	### boxes: numpy array with one row (left, top, right, bottom) per polygon
+	### edges: for each polygon, a numpy array with one row (x1, y1, x2, y2) per edge, including the edge from the last point to the first
+
+	def __init__(self, polygons):
+		self.polygons = [list(polygon) for polygon in polygons]
+		self.boxes = numpy.array([(min([p[0] for p in polygon]), min([p[1] for p in polygon]), max([p[0] for p in polygon]), max([p[1] for p in polygon])) for polygon in self.polygons], dtype=numpy.float64).reshape((-1, 4))
+		self.edges = [numpy.array([(polygon[k - 1][0], polygon[k - 1][1], polygon[k][0], polygon[k][1]) for k in xrange(len(polygon))], dtype=numpy.float64).reshape((-1, 4)) for polygon in self.polygons]
+
+	def __len__(self):
+		return len(self.polygons)
+
+	def getPolygons(self):
+		return self.polygons
+
+	### True if point is inside (or on the edge of) any of the polygons
+	def containsPoint(self, point):
+		return bool(self.containsPoints([point])[0])
+
+	### For each point, True if it is inside (or on the edge of) any of the polygons, as a numpy array of booleans
+	def containsPoints(self, points):
+		points = list(points)
+		coords = numpy.array(points, dtype=numpy.float64).reshape((-1, 2))
+		px = coords[:, 0]
+		py = coords[:, 1]
+		result = numpy.zeros(len(points), dtype=bool)
+		unsure = []
+		for k, box in enumerate(self.boxes):
+			candidates = numpy.nonzero(~result & (px >= box[0] - POLYGONEDGEMARGIN) & (px <= box[2] + POLYGONEDGEMARGIN) & (py >= box[1] - POLYGONEDGEMARGIN) & (py <= box[3] + POLYGONEDGEMARGIN))[0]
+			if len(candidates) == 0:
+				continue
+			x = px[candidates]
+			y = py[candidates]
+			winding = numpy.zeros(len(candidates), dtype=numpy.int32)
+			clearance = numpy.empty(len(candidates), dtype=numpy.float64)
+			clearance.fill(INFINITY)
+			for x1, y1, x2, y2 in self.edges[k]:
+				# > 0 if the point is left of the edge
+				cross = ((x2 - x1) * (y - y1)) - ((x - x1) * (y2 - y1))
+				winding = winding + ((y1 <= y) & (y2 > y) & (cross > 0)) - ((y1 > y) & (y2 <= y) & (cross < 0))
+				clearance = numpy.minimum(clearance, segmentDistances(((x1, y1), (x2, y2)), x, y))
+			near = clearance < POLYGONEDGEMARGIN
+			result[candidates[(winding != 0) & ~near]] = True
+			unsure.extend([(i, k) for i in candidates[near]])
+		for i, k in unsure:
+			if not result[i] and pointInsidePolygonPoints(points[i], self.polygons[k]):
+				result[i] = True
+		return result
+
 
 # Return minimum distance between line segment and point
 def minimumDistance(line, point):
@@ -192,6 +411,15 @@ def minimumDistance(line, point):
 	p3 = (line[0][0] + (t * (line[1][0] - line[0][0])), line[0][1] + (t * (line[1][1] - line[0][1]))) # projection falls on the segment
 	return distance(point, p3)
 
+### Distances from the points (x, y) to line, as minimumDistance measures them. x and y are numpy arrays that broadcast together.
+def segmentDistances(line, x, y):
+	(x1, y1), (x2, y2) = line
+	d2 = ((x2 - x1) ** 2.0) + ((y2 - y1) ** 2.0)
+	if d2 == 0.0:
+		return numpy.sqrt(((x - x1) ** 2) + ((y - y1) ** 2))
+	t = numpy.clip((((x - x1) * (x2 - x1)) + ((y - y1) * (y2 - y1))) / d2, 0.0, 1.0)
+	return numpy.sqrt(((x - (x1 + t * (x2 - x1))) ** 2) + ((y - (y1 + t * (y2 - y1))) ** 2))
+
 
 #Polygon is a set of points
 def pointOnPolygon(point, polygon):
@@ -361,8 +589,9 @@ def vectorMagnitude(v):
 def findClosestUnobstructed(p, nodes, worldLines):
 	best = None
 	dist = INFINITY
-	for n in nodes:
-		if rayTraceWorld(p, n, worldLines) == None:
+	hits = rayTraceWorldBatch([p] * len(nodes), nodes, worldLines)
+	for n, hit in zip(nodes, hits):
+		if hit == None:
 			d = distance(p, n)
 			if best == None or d < dist:
 				best = n
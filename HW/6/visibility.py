@@ -0,0 +1,64 @@
+'''
+ * Copyright (c) 2014, 2015 Entertainment Intelligence Lab, Georgia Institute of Technology.
+ * Originally developed by Mark Riedl.
+ * Last edited by Mark Riedl 05/2015
+ *
+ * Licensed under the Apache License, Version 2.0 (the "License");
+ * you may not use this file except in compliance with the License.
+ * You may obtain a copy of the License at
+ *
+ *     http://www.apache.org/licenses/LICENSE-2.0
+ *
+ * Unless required by applicable law or agreed to in writing, software
+ * distributed under the License is distributed on an "AS IS" BASIS,
+ * WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+ * See the License for the specific language governing permissions and
+ * limitations under the License.
+'''
+
+from constants import *
+from utils import *
+
+############################
+### VISIBILITY CACHE
+###
+### Remembers which lines of sight are clear, so that the same ray is only traced once while the world lines stay the same.
+### Results are shared by every observer: towers, bases and agents standing still, or looking at things standing still,
+### ask for the same rays tick after tick.
+### Keys are the exact endpoints (including whether each is a tuple or a list), so answers are identical to tracing the ray.
+
+class VisibilityCache(object):
+
+	### lineArray: the LineArray the cached results were traced against
+	### clear: dictionary from (start, end) to True if nothing is in the way
+	### maxSize: the cache is emptied when it holds this many lines of sight
+	### hits, misses: how many lines of sight were answered from the cache and how many had to be traced
+
+	def __init__(self, maxSize = VISIBILITYCACHESIZE):
+		self.lineArray = None
+		self.clear = {}
+		self.maxSize = maxSize
+		self.hits = 0
+		self.misses = 0
+
+	### For each point, True if the line from position to the point doesn't hit any line in lineArray
+	def linesOfSight(self, position, points, lineArray):
+		if lineArray is not self.lineArray:
+			# The world lines changed (e.g., gates moved)
+			self.clear = {}
+			self.lineArray = lineArray
+		start = (pointKind(position), position[0], position[1])
+		keys = [(start, pointKind(p), p[0], p[1]) for p in points]
+		results = [self.clear.get(key) for key in keys]
+		missing = [i for i in xrange(len(points)) if results[i] is None]
+		self.hits = self.hits + len(points) - len(missing)
+		self.misses = self.misses + len(missing)
+		if len(missing) > 0:
+			if len(self.clear) + len(missing) > self.maxSize:
+				self.clear = {}
+			# Cast all the missing rays at once
+			hits = lineArray.rayTraceBatch([position] * len(missing), [points[i] for i in missing], True)
+			for i, hit in zip(missing, hits):
+				results[i] = hit == None
+				self.clear[keys[i]] = results[i]
+		return results